@@ -0,0 +1,73 @@
+"""
+Стоимость разбора команды на один запрос.
+
+Запуск из backend/:
+    python scripts/bench_command_parsing.py --iterations 2000
+
+Сравнивает прежний путь роутеров (TypeAdapter(Command) на каждый запрос)
+с готовым COMMAND_ADAPTER и пачечным parse_commands.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Any, Callable, Dict, List
+
+from pydantic import TypeAdapter
+
+from dndsim.core.engine.commands import (
+    COMMAND_ADAPTER,
+    Command,
+    parse_command,
+    parse_commands,
+)
+
+# варианты из начала и из конца union'а: без дискриминатора последний
+# перебирается дольше всех
+PAYLOADS: List[Dict[str, Any]] = [
+    {"type": "StartCombat"},
+    {"type": "Attack", "attacker_id": "A", "target_id": "B", "attack_name": "sword"},
+    {
+        "type": "CastSpell",
+        "caster_id": "A",
+        "spell_name": "bless",
+        "target_ids": ["A", "B", "C"],
+    },
+]
+
+
+def _per_call_us(fn: Callable[[], Any], n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--iterations", type=int, default=2000)
+    args = p.parse_args()
+    n = args.iterations
+
+    for payload in PAYLOADS:
+        fresh = _per_call_us(
+            lambda: TypeAdapter(Command).validate_python(payload), max(n // 10, 1)
+        )
+        cached = _per_call_us(lambda: COMMAND_ADAPTER.validate_python(payload), n)
+        print(
+            f"{payload['type']:12s} TypeAdapter per request: {fresh:8.1f} us"
+            f"   cached: {cached:6.1f} us   x{fresh / cached:.0f}"
+        )
+
+    batch = PAYLOADS * 10
+    one_by_one = _per_call_us(lambda: [parse_command(c) for c in batch], n // 10)
+    bulk = _per_call_us(lambda: parse_commands(batch), n // 10)
+    print(
+        f"batch of {len(batch)}: parse_command loop {one_by_one:.1f} us"
+        f"   parse_commands {bulk:.1f} us"
+    )
+
+
+if __name__ == "__main__":
+    main()
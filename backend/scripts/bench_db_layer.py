@@ -0,0 +1,128 @@
+"""
+Сравнение sync (threadpool) и async слоёв БД под конкурентной нагрузкой.
+
+Запуск из backend/:
+    python scripts/bench_db_layer.py --encounters 50 --requests 2000 --concurrency 64
+
+Поднимает in-process FastAPI-приложение с двумя одинаковыми ручками
+(GET /sync/{id} и GET /async/{id}: load_latest_snapshot + encounter_state_to_dict)
+поверх временного SQLite-файла и гоняет их через httpx.ASGITransport.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from dndsim.core.engine.state import CombatantState, EncounterState
+from dndsim.core.persistence.runtime_store import (
+    load_latest_snapshot,
+    load_latest_snapshot_async,
+    save_snapshot,
+)
+from dndsim.core.persistence.state_codec import encounter_state_to_dict
+from dndsim.db.base import Base
+from dndsim.db.models import Encounter
+
+
+def _seed(db_url: str, n_encounters: int) -> list[str]:
+    eng = create_engine(db_url)
+    Base.metadata.create_all(eng)
+    ids: list[str] = []
+    with Session(eng) as db:
+        for i in range(n_encounters):
+            enc = Encounter(name=f"bench-{i}")
+            db.add(enc)
+            db.commit()
+            state = EncounterState()
+            for j in range(8):
+                cid = f"c{j}"
+                state.combatants[cid] = CombatantState(
+                    id=cid, name=cid, ac=12, hp_current=20, hp_max=20
+                )
+            save_snapshot(db, enc.id, "init", state, [])
+            ids.append(enc.id)
+    eng.dispose()
+    return ids
+
+
+def _build_app(path: Path, pool_size: int) -> FastAPI:
+    sync_engine = create_engine(f"sqlite:///{path}", pool_size=pool_size)
+    SyncSession = sessionmaker(bind=sync_engine)
+    async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}", pool_size=pool_size
+    )
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+    def get_sync():
+        db = SyncSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    app = FastAPI()
+
+    @app.get("/sync/{encounter_id}")
+    def sync_state(encounter_id: str, db: Session = Depends(get_sync)):
+        save_id, st, _ = load_latest_snapshot(db, encounter_id)
+        return {"save_id": save_id, "state": encounter_state_to_dict(st)}
+
+    @app.get("/async/{encounter_id}")
+    async def async_state(encounter_id: str, db: AsyncSession = Depends(get_async)):
+        save_id, st, _ = await load_latest_snapshot_async(db, encounter_id)
+        return {"save_id": save_id, "state": encounter_state_to_dict(st)}
+
+    return app
+
+
+async def _run(app: FastAPI, prefix: str, ids: list[str], n: int, conc: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    sem = asyncio.Semaphore(conc)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as cl:
+
+        async def one(i: int) -> None:
+            async with sem:
+                r = await cl.get(f"/{prefix}/{ids[i % len(ids)]}")
+                r.raise_for_status()
+
+        # прогрев
+        await asyncio.gather(*(one(i) for i in range(min(n, conc))))
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(n)))
+        return n / (time.perf_counter() - t0)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--encounters", type=int, default=50)
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=64)
+    ap.add_argument("--pool-size", type=int, default=10)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.sqlite3"
+        ids = _seed(f"sqlite:///{path}", args.encounters)
+        app = _build_app(path, args.pool_size)
+
+        for prefix in ("sync", "async"):
+            rps = asyncio.run(_run(app, prefix, ids, args.requests, args.concurrency))
+            print(f"{prefix:>5}: {rps:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
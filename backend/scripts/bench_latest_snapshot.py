@@ -0,0 +1,137 @@
+"""
+Поиск последнего снапшота encounter'а: три способа на одних и тех же данных.
+
+Запуск из backend/:
+    python scripts/bench_latest_snapshot.py --saves 100000 --encounters 1000
+
+  scan    — ORDER BY id DESC LIMIT 1 без индекса по encounter_id (как было)
+  index   — то же через ix_encounter_saves_listing (encounter_id, id, ...)
+  pointer — Encounter.latest_save_id -> EncounterSave по первичному ключу
+
+Читается то же, что в load_latest_snapshot (id + state_json), но без json.loads —
+видна цена поиска и чтения строки, а не декодирования.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from sqlalchemy import bindparam, create_engine, func, insert, select, text, update
+from sqlalchemy.orm import Session
+
+from dndsim.db.base import Base
+from dndsim.db.models import Encounter, EncounterSave
+
+
+def _seed(db_url: str, n_saves: int, n_encounters: int) -> list[str]:
+    eng = create_engine(db_url)
+    Base.metadata.create_all(eng)
+    ids = [str(uuid.uuid4()) for _ in range(n_encounters)]
+    blob = json.dumps({"state": {"round": 1, "combatants": {}}, "events": []})
+    rng = random.Random(0)
+    with Session(eng) as db:
+        db.execute(insert(Encounter), [{"id": i, "name": i[:8]} for i in ids])
+        # encounter'ы играются в разное время: каждый пишет в своём окне
+        # (с пересечением соседей), последние снапшоты разбросаны по таблице
+        rows = [
+            {
+                "encounter_id": ids[
+                    min(
+                        n_encounters - 1,
+                        (k * n_encounters) // n_saves + rng.randint(0, 3),
+                    )
+                ],
+                "label": "cmd",
+                "state_json": blob,
+                "events_json": "[]",
+            }
+            for k in range(n_saves)
+        ]
+        for i in range(0, len(rows), 10_000):
+            db.execute(insert(EncounterSave), rows[i : i + 10_000])
+        latest = db.execute(
+            select(EncounterSave.encounter_id, func.max(EncounterSave.id)).group_by(
+                EncounterSave.encounter_id
+            )
+        ).all()
+        for eid, sid in latest:
+            db.execute(
+                update(Encounter)
+                .where(Encounter.id == eid)
+                .values(latest_save_id=sid)
+                .execution_options(synchronize_session=False)
+            )
+        db.commit()
+    eng.dispose()
+    return ids
+
+
+def _bench(db: Session, stmt, ids: list[str], n: int) -> float:
+    # SQL компилируется один раз и идёт прямо в драйвер: меряем SQLite, а не ORM
+    compiled = stmt.compile(db.get_bind())
+    sql = str(compiled)
+    cur = db.connection().connection.cursor()
+    rng = random.Random(1)
+    picks = [
+        tuple(compiled.construct_params({"eid": eid})[k] for k in compiled.positiontup)
+        for eid in (rng.choice(ids) for _ in range(n))
+    ]
+    for params in picks[:100]:  # прогрев
+        cur.execute(sql, params).fetchone()
+    t0 = time.perf_counter()
+    for params in picks:
+        cur.execute(sql, params).fetchone()
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+BY_ORDER = (
+    select(EncounterSave.id, EncounterSave.state_json)
+    .where(EncounterSave.encounter_id == bindparam("eid"))
+    .order_by(EncounterSave.id.desc())
+    .limit(1)
+)
+
+BY_POINTER = (
+    select(EncounterSave.id, EncounterSave.state_json)
+    .join(Encounter, Encounter.latest_save_id == EncounterSave.id)
+    .where(Encounter.id == bindparam("eid"))
+)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--saves", type=int, default=100_000)
+    ap.add_argument("--encounters", type=int, default=1_000)
+    ap.add_argument("--lookups", type=int, default=2_000)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.sqlite3"
+        t0 = time.perf_counter()
+        ids = _seed(f"sqlite:///{path}", args.saves, args.encounters)
+        print(
+            f"seeded {args.saves} saves / {args.encounters} encounters "
+            f"in {time.perf_counter() - t0:.1f}s"
+        )
+
+        eng = create_engine(f"sqlite:///{path}")
+        with Session(eng) as db:
+            index_us = _bench(db, BY_ORDER, ids, args.lookups)
+            pointer_us = _bench(db, BY_POINTER, ids, args.lookups)
+            db.execute(text("DROP INDEX ix_encounter_saves_listing"))
+            db.commit()
+            scan_us = _bench(db, BY_ORDER, ids, max(args.lookups // 20, 10))
+        eng.dispose()
+
+    for name, us in (("scan", scan_us), ("index", index_us), ("pointer", pointer_us)):
+        print(f"{name:>8}: {us:10.1f} us/lookup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Пропускная способность SQLite при нескольких одновременных столах:
+профиль "default" (rollback journal, synchronous=FULL) против "tuned"
+(WAL, synchronous=NORMAL, mmap, cache, busy_timeout) — см. db/sqlite.py.
+
+Запуск из backend/:
+    python scripts/bench_sqlite_profile.py --tables 16 --seconds 5
+
+Каждый стол — поток, который крутит load_latest_snapshot + save_snapshot
+(compare-and-swap) по своему encounter'у; ещё столько же потоков только читают
+(GET state у зрителей). Считаются записи и чтения в секунду.
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+
+from dndsim.core.engine.state import CombatantState, EncounterState
+from dndsim.core.persistence.runtime_store import (
+    SnapshotConflict,
+    load_latest_snapshot,
+    save_snapshot,
+)
+from dndsim.db.base import Base
+from dndsim.db.models import Encounter
+from dndsim.db.settings import DatabaseSettings, engine_kwargs
+from dndsim.db.sqlite import configure_sqlite
+
+
+def _state() -> EncounterState:
+    state = EncounterState()
+    for j in range(8):
+        cid = f"c{j}"
+        state.combatants[cid] = CombatantState(
+            id=cid, name=cid, ac=12, hp_current=20, hp_max=20
+        )
+    return state
+
+
+def _run(profile: str, path: Path, tables: int, seconds: float) -> dict[str, float]:
+    url = f"sqlite:///{path}"
+    settings = DatabaseSettings(sqlite_profile=profile, pool_size=2 * tables)
+    engine = create_engine(url, **engine_kwargs(settings, url))
+    configure_sqlite(engine, settings, url)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+
+    ids: list[str] = []
+    with SessionLocal() as db:
+        for i in range(tables):
+            enc = Encounter(name=f"{profile}-{i}")
+            db.add(enc)
+            db.commit()
+            save_snapshot(db, enc.id, "init", _state(), [])
+            ids.append(enc.id)
+
+    counts = {"writes": 0, "reads": 0, "errors": 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + seconds
+
+    def bump(key: str) -> None:
+        with lock:
+            counts[key] += 1
+
+    def writer(eid: str) -> None:
+        with SessionLocal() as db:
+            while time.perf_counter() < stop:
+                try:
+                    enc = db.get(Encounter, eid, populate_existing=True)
+                    _sid, state, _ = load_latest_snapshot(db, eid)
+                    state.round += 1
+                    save_snapshot(
+                        db,
+                        eid,
+                        "cmd",
+                        state,
+                        [],
+                        expected_version=enc.state_version,
+                    )
+                    bump("writes")
+                except (OperationalError, SnapshotConflict):
+                    db.rollback()
+                    bump("errors")
+
+    def reader(eid: str) -> None:
+        while time.perf_counter() < stop:
+            with Session(engine) as db:
+                try:
+                    load_latest_snapshot(db, eid)
+                    bump("reads")
+                except OperationalError:
+                    bump("errors")
+
+    threads = [threading.Thread(target=writer, args=(eid,)) for eid in ids]
+    threads += [threading.Thread(target=reader, args=(eid,)) for eid in ids]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+    return {k: v / seconds for k, v in counts.items()}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tables", type=int, default=16)
+    ap.add_argument("--seconds", type=float, default=5.0)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in ("default", "tuned"):
+            res = _run(
+                profile, Path(tmp) / f"{profile}.sqlite3", args.tables, args.seconds
+            )
+            print(
+                f"{profile:>8}: {res['writes']:8.1f} writes/s  "
+                f"{res['reads']:8.1f} reads/s  {res['errors']:6.1f} errors/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Массовый импорт существ в каталог из JSON-массива или NDJSON.
+
+Запуск из backend/:
+    python scripts/import_creatures.py monsters.ndjson --batch-size 1000
+
+Файл читается потоком; ошибочные записи пропускаются и печатаются в конце.
+БД — из настроек (DNDSIM_DB_URL и т.д., см. dndsim.db.settings).
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+
+from dndsim.core.persistence.creature_import import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MAX_ERRORS,
+    import_creatures,
+    iter_file_records,
+)
+from dndsim.db.init_db import init_db
+from dndsim.db.session import SessionLocal
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("path", help="JSON-массив или NDJSON")
+    ap.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    ap.add_argument("--max-errors", type=int, default=DEFAULT_MAX_ERRORS)
+    args = ap.parse_args()
+
+    init_db()
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        report = import_creatures(
+            db,
+            iter_file_records(args.path),
+            batch_size=args.batch_size,
+            max_errors=args.max_errors,
+        )
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"records={report.total} inserted={report.inserted} "
+        f"failed={report.failed} in {elapsed:.2f}s"
+    )
+    for err in report.errors:
+        label = f" ({err.name})" if err.name else ""
+        print(f"  #{err.index}{label}: {err.error}", file=sys.stderr)
+    if report.failed > len(report.errors):
+        print(f"  ... and {report.failed - len(report.errors)} more", file=sys.stderr)
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
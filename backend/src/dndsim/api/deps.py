@@ -4,6 +4,9 @@ from typing import Generator
 from sqlalchemy.orm import Session
 
 from dndsim.db.session import SessionLocal
+from dndsim.api.event_hub import EncounterEventHub, event_hub
+from dndsim.api.encounter_locks import EncounterLocks, encounter_locks
+from dndsim.core.adapters.templates import CreatureTemplateCache, creature_templates
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -12,3 +15,15 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+def get_event_hub() -> EncounterEventHub:
+    return event_hub
+
+
+def get_encounter_locks() -> EncounterLocks:
+    return encounter_locks
+
+
+def get_creature_templates() -> CreatureTemplateCache:
+    return creature_templates
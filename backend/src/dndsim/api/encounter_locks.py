@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Tuple
+
+
+class EncounterLocks:
+    """
+    Per-encounter asyncio.Lock: команды одного encounter'а применяются строго
+    по очереди (load -> apply -> save), разные encounter'ы не ждут друг друга.
+    Замок удаляется, когда его больше никто не держит и не ждёт.
+
+    Это защита в пределах одного процесса; между воркерами порядок держит
+    compare-and-swap по Encounter.state_version (см. runtime_store.save_snapshot).
+    """
+
+    def __init__(self) -> None:
+        # encounter_id -> (lock, сколько корутин держат/ждут его)
+        self._locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+
+    @asynccontextmanager
+    async def hold(self, encounter_id: Any) -> AsyncIterator[None]:
+        key = str(encounter_id)
+        lock, users = self._locks.get(key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._locks[key] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[key]
+            if users <= 1:
+                self._locks.pop(key, None)
+            else:
+                self._locks[key] = (lock, users - 1)
+
+    def active_count(self) -> int:
+        return len(self._locks)
+
+
+encounter_locks = EncounterLocks()
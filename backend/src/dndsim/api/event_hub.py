@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional
+
+# Сколько сообщений (пачек событий) держим на одного подписчика.
+# Медленный клиент не тормозит публикацию: при переполнении выбрасываем самое старое.
+DEFAULT_SUBSCRIBER_QUEUE_SIZE = 64
+
+
+class Subscription:
+    """
+    Подписка одного клиента на поток событий encounter'а.
+    Очередь ограничена; при переполнении теряются самые старые сообщения,
+    а счётчик dropped сообщает клиенту, что ему надо перечитать state.
+    """
+
+    def __init__(
+        self,
+        encounter_id: str,
+        loop: asyncio.AbstractEventLoop,
+        maxsize: int = DEFAULT_SUBSCRIBER_QUEUE_SIZE,
+    ) -> None:
+        self.encounter_id = encounter_id
+        self.queue: asyncio.Queue[Dict[str, Any]] = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self._loop = loop
+
+    def _offer(self, message: Dict[str, Any]) -> None:
+        # выполняется в потоке event loop'а подписчика
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    def take_dropped(self) -> int:
+        n = self.dropped
+        self.dropped = 0
+        return n
+
+
+class EncounterEventHub:
+    """
+    In-process pub/sub: encounter_id -> подписчики.
+    publish() можно звать из sync-роутеров (threadpool) — доставка идёт
+    через call_soon_threadsafe в loop подписчика и никогда не блокирует.
+    """
+
+    def __init__(self, queue_size: int = DEFAULT_SUBSCRIBER_QUEUE_SIZE) -> None:
+        self._queue_size = queue_size
+        self._subs: Dict[str, List[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(
+        self,
+        encounter_id: Any,
+        *,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ) -> Subscription:
+        sub = Subscription(
+            str(encounter_id),
+            loop or asyncio.get_running_loop(),
+            maxsize=self._queue_size,
+        )
+        with self._lock:
+            self._subs.setdefault(sub.encounter_id, []).append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._subs.get(sub.encounter_id)
+            if not subs:
+                return
+            try:
+                subs.remove(sub)
+            except ValueError:
+                pass
+            if not subs:
+                self._subs.pop(sub.encounter_id, None)
+
+    def subscriber_count(self, encounter_id: Any) -> int:
+        with self._lock:
+            return len(self._subs.get(str(encounter_id), ()))
+
+    def publish(
+        self,
+        encounter_id: Any,
+        *,
+        save_id: Optional[int],
+        events: List[Dict[str, Any]],
+    ) -> int:
+        """
+        Рассылает events_delta всем подписчикам encounter'а.
+        Возвращает число подписчиков, которым сообщение было передано.
+        """
+        key = str(encounter_id)
+        with self._lock:
+            subs = list(self._subs.get(key, ()))
+        if not subs or not events:
+            return 0
+
+        message = {"encounter_id": key, "save_id": save_id, "events": events}
+        delivered = 0
+        for sub in subs:
+            try:
+                sub._loop.call_soon_threadsafe(sub._offer, message)
+            except RuntimeError:
+                # loop подписчика уже закрыт — подписка мёртвая
+                self.unsubscribe(sub)
+                continue
+            delivered += 1
+        return delivered
+
+
+event_hub = EncounterEventHub()
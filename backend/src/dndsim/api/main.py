@@ -1,18 +1,44 @@
+import asyncio
+import contextlib
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 
+from dndsim.core.persistence.retention import RetentionPolicy, SnapshotCompactor
+from dndsim.db import session as db_session
 from dndsim.db.init_db import init_db
+from dndsim.db.settings import get_retention_settings
 from dndsim.api.routers.creatures import router as creatures_router
 from dndsim.api.routers.encounters import router as encounters_router
 from dndsim.api.routers.encounter_saves import router as encounter_saves_router
 from dndsim.api.routers.encounter_runtime import router as encounter_runtime_router
+from dndsim.api.routers.encounter_stream import router as encounter_stream_router
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
+
+    compaction = None
+    rs = get_retention_settings()
+    if rs.enabled:
+        compactor = SnapshotCompactor(
+            # через модуль: тесты подменяют db_session.SessionLocal
+            lambda: db_session.SessionLocal(),
+            RetentionPolicy(
+                keep_latest=rs.keep_latest, keep_every_nth=rs.keep_every_nth
+            ),
+            interval_s=rs.interval_s,
+            batch_size=rs.batch_size,
+        )
+        compaction = asyncio.create_task(compactor.run_forever())
+
     yield
 
+    if compaction is not None:
+        compaction.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await compaction
+
 
 app = FastAPI(title="DnD 5e Combat Simulator", lifespan=lifespan)
 
@@ -26,3 +52,4 @@ app.include_router(creatures_router)
 app.include_router(encounters_router)
 app.include_router(encounter_saves_router)
 app.include_router(encounter_runtime_router)
+app.include_router(encounter_stream_router)
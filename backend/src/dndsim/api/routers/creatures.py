@@ -1,17 +1,36 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
+import base64
+import json
+from dataclasses import asdict
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from dndsim.db.deps import get_db
-from dndsim.db.models import Creature
-from dndsim.api.schemas import CreatureCreate, CreatureUpdate, CreatureOut, CreatureData
+from dndsim.db.deps import get_async_db, get_db
+from dndsim.api.deps import get_creature_templates
+from dndsim.core.adapters.templates import CreatureTemplateCache
+from dndsim.core.persistence.creature_import import import_creatures_async
+from dndsim.db.models import Creature, CreatureTrait
+from dndsim.api.schemas import (
+    CreatureCreate,
+    CreatureUpdate,
+    CreatureOut,
+    CreatureData,
+    CreatureImportReport,
+    CreaturePage,
+    CreatureSummaryOut,
+)
 
 router = APIRouter(prefix="/creatures", tags=["creatures"])
 
 
 @router.get("", response_model=list[CreatureOut])
 def list_creatures(db: Session = Depends(get_db)):
+    # полный список с data_json; для больших каталогов — GET /creatures:page
     items = db.query(Creature).order_by(Creature.created_at.desc()).all()
     return [
         CreatureOut(
@@ -25,6 +44,162 @@ def list_creatures(db: Session = Depends(get_db)):
     ]
 
 
+def _encode_cursor(name: str, creature_id: str) -> str:
+    raw = json.dumps([name, creature_id], ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        name, creature_id = json.loads(raw)
+        return str(name), str(creature_id)
+    except Exception:
+        raise HTTPException(status_code=422, detail="Invalid cursor")
+
+
+_SUMMARY_COLUMNS = (
+    Creature.id,
+    Creature.name,
+    Creature.ac,
+    Creature.hp_max,
+    Creature.is_player_character,
+    Creature.speed_ft,
+    Creature.max_slot_level,
+    Creature.attack_count,
+    Creature.offense_rating,
+    Creature.defense_rating,
+    Creature.updated_at,
+)
+
+
+def _has_trait(kind: str, value: str):
+    return Creature.id.in_(
+        select(CreatureTrait.creature_id).where(
+            CreatureTrait.kind == kind, CreatureTrait.value == value.lower()
+        )
+    )
+
+
+@router.get(":page", response_model=CreaturePage)
+def page_creatures(
+    limit: int = Query(default=50, ge=1, le=500),
+    after: Optional[str] = None,
+    view: Literal["summary", "full"] = "summary",
+    name: Optional[str] = Query(default=None, description="префикс имени"),
+    min_ac: Optional[int] = None,
+    max_ac: Optional[int] = None,
+    min_hp: Optional[int] = None,
+    max_hp: Optional[int] = None,
+    is_player_character: Optional[bool] = None,
+    min_speed: Optional[int] = None,
+    min_slot_level: Optional[int] = None,
+    min_attacks: Optional[int] = None,
+    min_offense: Optional[float] = None,
+    max_offense: Optional[float] = None,
+    min_defense: Optional[float] = None,
+    max_defense: Optional[float] = None,
+    immune_to: list[str] = Query(default=[]),
+    resistant_to: list[str] = Query(default=[]),
+    vulnerable_to: list[str] = Query(default=[]),
+    db: Session = Depends(get_db),
+):
+    """
+    Каталог по страницам: keyset по (name, id), фильтры по индексированным
+    колонкам-сводкам и creature_traits (immune_to=fire&immune_to=poison — оба).
+    view=summary не читает data_json вовсе.
+    """
+    conds = []
+    if name:
+        conds.append(Creature.name.startswith(name, autoescape=True))
+    if min_ac is not None:
+        conds.append(Creature.ac >= min_ac)
+    if max_ac is not None:
+        conds.append(Creature.ac <= max_ac)
+    if min_hp is not None:
+        conds.append(Creature.hp_max >= min_hp)
+    if max_hp is not None:
+        conds.append(Creature.hp_max <= max_hp)
+    if is_player_character is not None:
+        conds.append(Creature.is_player_character == is_player_character)
+    for col, lo, hi in (
+        (Creature.speed_ft, min_speed, None),
+        (Creature.max_slot_level, min_slot_level, None),
+        (Creature.attack_count, min_attacks, None),
+        (Creature.offense_rating, min_offense, max_offense),
+        (Creature.defense_rating, min_defense, max_defense),
+    ):
+        if lo is not None:
+            conds.append(col >= lo)
+        if hi is not None:
+            conds.append(col <= hi)
+    for kind, values in (
+        ("immunity", immune_to),
+        ("resistance", resistant_to),
+        ("vulnerability", vulnerable_to),
+    ):
+        conds.extend(_has_trait(kind, v) for v in values)
+    if after is not None:
+        a_name, a_id = _decode_cursor(after)
+        conds.append(
+            or_(
+                Creature.name > a_name,
+                and_(Creature.name == a_name, Creature.id > a_id),
+            )
+        )
+
+    cols = _SUMMARY_COLUMNS if view == "summary" else (Creature,)
+    # limit + 1: узнать, есть ли следующая страница, без COUNT(*)
+    stmt = (
+        select(*cols)
+        .where(*conds)
+        .order_by(Creature.name, Creature.id)
+        .limit(limit + 1)
+    )
+    rows = db.execute(stmt).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items: list[CreatureSummaryOut | CreatureOut]
+    if view == "summary":
+        items = [CreatureSummaryOut.model_validate(r._asdict()) for r in rows]
+    else:
+        items = [
+            CreatureOut(
+                id=c.id,
+                name=c.name,
+                data=CreatureData.model_validate(c.data_json),
+                created_at=c.created_at,
+                updated_at=c.updated_at,
+            )
+            for (c,) in rows
+        ]
+
+    next_cursor = None
+    if has_more and items:
+        next_cursor = _encode_cursor(items[-1].name, items[-1].id)
+    return CreaturePage(items=items, next_cursor=next_cursor)
+
+
+@router.post(":import", response_model=CreatureImportReport)
+async def import_creatures(
+    request: Request,
+    batch_size: int = Query(default=500, ge=1, le=5000),
+    max_errors: int = Query(default=100, ge=0, le=10000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Массовый импорт: тело — JSON-массив или NDJSON записей вида POST /creatures
+    (или плоских, с полями существа рядом с name). Тело читается потоком,
+    вставка — executemany пачками по batch_size, каждая в своей транзакции.
+    Ошибочные записи пропускаются и попадают в errors.
+    """
+    report = await import_creatures_async(
+        db, request.stream(), batch_size=batch_size, max_errors=max_errors
+    )
+    return CreatureImportReport.model_validate(asdict(report))
+
+
 @router.post("", response_model=CreatureOut)
 def create_creature(payload: CreatureCreate, db: Session = Depends(get_db)):
     obj = Creature(
@@ -60,7 +235,10 @@ def get_creature(creature_id: str, db: Session = Depends(get_db)):
 
 @router.patch("/{creature_id}", response_model=CreatureOut)
 def patch_creature(
-    creature_id: str, payload: CreatureUpdate, db: Session = Depends(get_db)
+    creature_id: str,
+    payload: CreatureUpdate,
+    db: Session = Depends(get_db),
+    templates: CreatureTemplateCache = Depends(get_creature_templates),
 ):
     obj = db.get(Creature, creature_id)
     if not obj:
@@ -74,6 +252,8 @@ def patch_creature(
     db.add(obj)
     db.commit()
     db.refresh(obj)
+    # updated_at может не сдвинуться (точность до секунды) — сбрасываем явно
+    templates.invalidate(obj.id)
 
     return CreatureOut(
         id=obj.id,
@@ -86,7 +266,10 @@ def patch_creature(
 
 @router.put("/{creature_id}", response_model=CreatureOut)
 def update_creature(
-    creature_id: str, payload: CreatureUpdate, db: Session = Depends(get_db)
+    creature_id: str,
+    payload: CreatureUpdate,
+    db: Session = Depends(get_db),
+    templates: CreatureTemplateCache = Depends(get_creature_templates),
 ):
     obj = db.get(Creature, creature_id)
     if not obj:
@@ -100,6 +283,8 @@ def update_creature(
     db.add(obj)
     db.commit()
     db.refresh(obj)
+    # updated_at может не сдвинуться (точность до секунды) — сбрасываем явно
+    templates.invalidate(obj.id)
 
     return CreatureOut(
         id=obj.id,
@@ -1,30 +1,56 @@
 from __future__ import annotations
 
 import uuid
+from functools import partial
 from dataclasses import is_dataclass, asdict
-from typing import Any, Dict, List, Tuple, Optional
+from typing import Any, Callable, Dict, List, Tuple, Optional
 
-from pydantic import TypeAdapter
-from dndsim.core.engine.commands import Command
+from dndsim.core.engine.commands import parse_command, parse_commands
+from dndsim.core.engine.events import materialize_events
 from dndsim.core.engine.rules.apply import apply_command as engine_apply
+from dndsim.core.engine.rules.apply import apply_commands as engine_apply_batch
 from dndsim.core.persistence.state_codec import encounter_state_to_dict
 
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from dndsim.api.schemas import (  # type: ignore
     EncounterInitRequest,
     EncounterRuntimeResponse,
     AddCombatantRequest,
+    AddCombatantsBulkRequest,
     ApplyCommandRequest,
+    ApplyCommandBatchRequest,
+    EncounterBatchResponse,
     GetEncounterStateResponse,
 )
-from dndsim.db.deps import get_db  # type: ignore
+from dndsim.db.deps import get_async_db  # type: ignore
+from dndsim.api.deps import (
+    get_creature_templates,
+    get_event_hub,
+    get_encounter_locks,
+)
+from dndsim.api.event_hub import EncounterEventHub
+from dndsim.api.encounter_locks import EncounterLocks
 from dndsim.db.models import Encounter, Creature  # type: ignore
 
-from dndsim.core.adapters.mapper import combatant_from_creature  # type: ignore
-from dndsim.core.persistence.runtime_store import load_latest_snapshot, save_snapshot  # type: ignore
+from dndsim.core.adapters.mapper import instantiate_combatant  # type: ignore
+from dndsim.core.adapters.templates import CreatureTemplateCache
+from dndsim.core.persistence.live_state import load_live_state_async
+from dndsim.core.persistence.runtime_store import (  # type: ignore
+    SnapshotConflict,
+    _load_history_snapshot_async,
+    live_state_enabled,
+    load_latest_snapshot_async,
+    load_live_snapshot_async,
+    save_snapshot_async,
+)
+
+# сколько раз перечитываем state при конфликте state_version (другой воркер успел записать)
+MAX_COMMIT_ATTEMPTS = 3
 
 
 router = APIRouter(prefix="/encounters", tags=["encounter-runtime"])
@@ -143,91 +169,185 @@ def _extract_creature_payload(creature_row: Any) -> Dict[str, Any]:
     return _to_dict(creature_row)
 
 
-@router.post("/{encounter_id}/state:init", response_model=EncounterRuntimeResponse)
-def init_state(
-    encounter_id: int, req: EncounterInitRequest, db: Session = Depends(get_db)
-):
-    enc = db.query(Encounter).filter(Encounter.id == encounter_id).first()  # type: ignore
+def _parse_overrides(raw: Optional[Dict[str, Any]]) -> Any:
+    # overrides прокидываем в mapper как есть (он уже умеет dict)
+    if not raw:
+        return None
+    # попробуем создать CombatantOverrides, если доступен
+    try:
+        from dndsim.core.adapters.mapper import CombatantOverrides  # type: ignore
+
+        return CombatantOverrides(**raw)
+    except Exception:
+        return None
+
+
+async def _get_encounter_or_404(db: AsyncSession, encounter_id: str) -> Encounter:
+    enc = await db.get(Encounter, encounter_id)
     if not enc:
         raise HTTPException(status_code=404, detail="Encounter not found")
+    return enc
+
+
+async def _current_state_version(db: AsyncSession, encounter_id: str) -> int:
+    # не db.get(): объект из identity map может держать устаревшую версию
+    version = await db.scalar(
+        select(Encounter.state_version).where(Encounter.id == encounter_id)
+    )
+    if version is None:
+        raise HTTPException(status_code=404, detail="Encounter not found")
+    return int(version)
+
+
+StepResult = Optional[Tuple[Any, List[Dict[str, Any]]]]
+
+
+async def _state_dict(state_obj: Any) -> Dict[str, Any]:
+    """encounter_state_to_dict вне event loop'а (на больших state — миллисекунды)."""
+    return await run_in_threadpool(encounter_state_to_dict, state_obj)
+
+
+async def _commit_serialized(
+    db: AsyncSession,
+    locks: EncounterLocks,
+    encounter_id: str,
+    label: str,
+    step: Callable[[Optional[int], Any], StepResult],
+):
+    """
+    load -> step -> save для одного encounter'а без потерянных обновлений:
+    - внутри процесса команды encounter'а идут строго по очереди (EncounterLocks);
+    - между процессами save делает compare-and-swap по state_version,
+      при конфликте перечитываем snapshot и повторяем step.
+
+    step(save_id, state) возвращает (new_state, events_delta) или None,
+    если писать нечего. Результат: (save_id, state_dict, events_delta) или None,
+    state_dict — уже посчитанный при записи encounter_state_to_dict(new_state).
+    """
+    async with locks.hold(encounter_id):
+        for _attempt in range(MAX_COMMIT_ATTEMPTS):
+            live = (
+                await load_live_snapshot_async(db, encounter_id)
+                if live_state_enabled()
+                else None
+            )
+            if live is not None:
+                # документ читается только при совпадении версии: это и есть
+                # ожидаемая state_version, и prev для патча (step меняет state на месте)
+                doc, state_obj = live
+                version, save_id = doc.version, doc.save_id
+            else:
+                doc = None
+                version = await _current_state_version(db, encounter_id)
+                save_id, state_obj, _events = await _load_history_snapshot_async(
+                    db, encounter_id
+                )
+            # движок (и RunUntilDecision на сотни шагов) — в threadpool,
+            # чтобы не держать event loop: другие encounter'ы и SSE идут параллельно
+            result = await run_in_threadpool(step, save_id, state_obj)
+            if result is None:
+                return None
+            new_state, events_delta = result
+            try:
+                save_id, state_dict = await save_snapshot_async(
+                    db,
+                    encounter_id=encounter_id,
+                    label=label,
+                    state=new_state,
+                    events_delta=events_delta,
+                    expected_version=version,
+                    live=doc,
+                )
+            except SnapshotConflict:
+                continue
+            return save_id, state_dict, events_delta
+
+    raise HTTPException(
+        status_code=409,
+        detail="Encounter state changed concurrently, retry the request",
+    )
+
+
+def _require_state(save_id: Optional[int], state_obj: Any) -> Any:
+    if save_id is None or state_obj is None:
+        raise HTTPException(
+            status_code=409,
+            detail="Encounter is not initialized. Call state:init first.",
+        )
+    return state_obj
 
-    latest_id, latest_state_obj, _latest_events = load_latest_snapshot(db, encounter_id)
-    if (
-        latest_id is not None
-        and latest_state_obj is not None
-        and not req.reset_existing
-    ):
+
+@router.post("/{encounter_id}/state:init", response_model=EncounterRuntimeResponse)
+async def init_state(
+    encounter_id: str,
+    req: EncounterInitRequest,
+    db: AsyncSession = Depends(get_async_db),
+    locks: EncounterLocks = Depends(get_encounter_locks),
+):
+    await _get_encounter_or_404(db, encounter_id)
+
+    existing: Dict[str, Any] = {}
+
+    def step(latest_id, latest_state_obj):
+        if (
+            latest_id is not None
+            and latest_state_obj is not None
+            and not req.reset_existing
+        ):
+            existing.update(save_id=latest_id, state=latest_state_obj)
+            return None
+        # создаём пустое состояние
+        state_obj = _make_empty_encounter_state()
+        if req.rng_seed is not None:
+            state_obj.with_seed(req.rng_seed)
+        state_obj.id_strategy = req.id_strategy
+        state_obj.id_scope = encounter_id
+        return state_obj, []
+
+    committed = await _commit_serialized(db, locks, encounter_id, req.label, step)
+    if committed is None:
         return EncounterRuntimeResponse(
             encounter_id=encounter_id,
-            save_id=latest_id,
-            state=encounter_state_to_dict(latest_state_obj),
+            save_id=existing["save_id"],
+            state=await _state_dict(existing["state"]),
             events_delta=[],
         )
 
-    # создаём пустое состояние
-    state_obj = _make_empty_encounter_state()
-    # сохраняем
-    row = save_snapshot(
-        db,
-        encounter_id=encounter_id,
-        label=req.label,
-        state=state_obj,
-        events_delta=[],
-    )
-
+    save_id, state, _events_delta = committed
     return EncounterRuntimeResponse(
         encounter_id=encounter_id,
-        save_id=int(row.id),  # type: ignore
-        state=_to_dict(state_obj),
+        save_id=save_id,
+        state=state,
         events_delta=[],
     )
 
 
 @router.post("/{encounter_id}/combatants:add", response_model=EncounterRuntimeResponse)
-def add_combatant(
-    encounter_id: int, req: AddCombatantRequest, db: Session = Depends(get_db)
+async def add_combatant(
+    encounter_id: str,
+    req: AddCombatantRequest,
+    db: AsyncSession = Depends(get_async_db),
+    hub: EncounterEventHub = Depends(get_event_hub),
+    locks: EncounterLocks = Depends(get_encounter_locks),
+    templates: CreatureTemplateCache = Depends(get_creature_templates),
 ):
-    enc = db.query(Encounter).filter(Encounter.id == encounter_id).first()  # type: ignore
-    if not enc:
-        raise HTTPException(status_code=404, detail="Encounter not found")
-
-    save_id, state_obj, _events = load_latest_snapshot(db, encounter_id)
-    if save_id is None or state_obj is None:
-        state_obj = _make_empty_encounter_state()
+    await _get_encounter_or_404(db, encounter_id)
 
-    creature_row = db.query(Creature).filter(Creature.id == req.creature_id).first()  # type: ignore
+    creature_row = await db.get(Creature, req.creature_id)
     if not creature_row:
         raise HTTPException(status_code=404, detail="Creature not found")
 
-    creature_payload = _extract_creature_payload(creature_row)
+    # разбор существа — из кэша по (id, updated_at), здесь только клон
+    prototype = templates.get(
+        creature_row.id,
+        creature_row.updated_at,
+        lambda: _extract_creature_payload(creature_row),
+    )
 
     combatant_id = req.combatant_id or f"{req.creature_id}-{uuid.uuid4().hex[:8]}"
     pos = (req.position.x, req.position.y)
 
-    # overrides прокидываем в mapper как есть (он уже умеет dict)
-    overrides = None
-    if req.overrides:
-        # попробуем создать CombatantOverrides, если доступен
-        try:
-            from dndsim.core.adapters.mapper import CombatantOverrides  # type: ignore
-
-            overrides = CombatantOverrides(**req.overrides)
-        except Exception:
-            overrides = None
-
-    combatant = combatant_from_creature(
-        creature_payload,
-        combatant_id=combatant_id,
-        side=req.side,
-        position=pos,
-        overrides=overrides,
-    )
-    if combatant_id in state_obj.combatants:
-        raise HTTPException(
-            status_code=409, detail="combatant_id already exists in encounter"
-        )
-
-    state_obj.combatants[combatant_id] = combatant
+    overrides = _parse_overrides(req.overrides)
 
     events_delta = [
         {
@@ -238,72 +358,241 @@ def add_combatant(
         }
     ]
 
-    row = save_snapshot(
-        db,
-        encounter_id=encounter_id,
-        label=req.label,
-        state=state_obj,
-        events_delta=events_delta,
+    def step(save_id, state_obj):
+        if save_id is None or state_obj is None:
+            state_obj = _make_empty_encounter_state()
+        if combatant_id in state_obj.combatants:
+            raise HTTPException(
+                status_code=409, detail="combatant_id already exists in encounter"
+            )
+        state_obj.combatants[combatant_id] = instantiate_combatant(
+            prototype,
+            combatant_id=combatant_id,
+            side=req.side,
+            position=pos,
+            overrides=overrides,
+        )
+        return state_obj, events_delta
+
+    save_id, state, events_delta = await _commit_serialized(
+        db, locks, encounter_id, req.label, step
     )
+    hub.publish(encounter_id, save_id=save_id, events=events_delta)
 
     return EncounterRuntimeResponse(
         encounter_id=encounter_id,
-        save_id=int(row.id),  # type: ignore
-        state=encounter_state_to_dict(state_obj),
+        save_id=save_id,
+        state=state,
         events_delta=[_to_dict(e) for e in events_delta],
     )
 
 
-@router.post("/{encounter_id}/commands:apply", response_model=EncounterRuntimeResponse)
-def apply_command(
-    encounter_id: int, req: ApplyCommandRequest, db: Session = Depends(get_db)
+@router.post(
+    "/{encounter_id}/combatants:add_bulk", response_model=EncounterRuntimeResponse
+)
+async def add_combatants_bulk(
+    encounter_id: str,
+    req: AddCombatantsBulkRequest,
+    db: AsyncSession = Depends(get_async_db),
+    hub: EncounterEventHub = Depends(get_event_hub),
+    locks: EncounterLocks = Depends(get_encounter_locks),
+    templates: CreatureTemplateCache = Depends(get_creature_templates),
 ):
-    enc = db.query(Encounter).filter(Encounter.id == encounter_id).first()  # type: ignore
-    if not enc:
-        raise HTTPException(status_code=404, detail="Encounter not found")
+    """
+    Несколько групп (creature_id, count, side, positions) одним запросом:
+    один SELECT по существам, прототипы из кэша шаблонов,
+    клоны с новыми id/side/position и одна запись snapshot'а.
+    """
+    await _get_encounter_or_404(db, encounter_id)
 
-    save_id, state_obj, _events = load_latest_snapshot(db, encounter_id)
-    if save_id is None or state_obj is None:
+    creature_ids = {g.creature_id for g in req.groups}
+    rows = await db.scalars(select(Creature).where(Creature.id.in_(creature_ids)))
+    prototypes = {
+        str(r.id): templates.get(
+            r.id, r.updated_at, partial(_extract_creature_payload, r)
+        )
+        for r in rows
+    }
+    missing = sorted(creature_ids - prototypes.keys())
+    if missing:
         raise HTTPException(
-            status_code=409,
-            detail="Encounter is not initialized. Call state:init first.",
+            status_code=404, detail={"message": "Creature not found", "ids": missing}
         )
 
+    for i, g in enumerate(req.groups):
+        if len(g.positions) > g.count:
+            raise HTTPException(
+                status_code=422,
+                detail=f"groups[{i}]: more positions than count",
+            )
+
+    overrides = [_parse_overrides(g.overrides) for g in req.groups]
+
+    def step(save_id, state_obj):
+        if save_id is None or state_obj is None:
+            state_obj = _make_empty_encounter_state()
+        combatants = state_obj.combatants
+        added: Dict[str, Any] = {}
+        events_delta = []
+        for g, ov in zip(req.groups, overrides):
+            n = 0
+            for k in range(g.count):
+                if g.id_prefix is None:
+                    cid = f"{g.creature_id}-{uuid.uuid4().hex[:8]}"
+                else:
+                    # пропускаем номера, которые уже заняты
+                    n += 1
+                    while (
+                        f"{g.id_prefix}{n}" in combatants
+                        or f"{g.id_prefix}{n}" in added
+                    ):
+                        n += 1
+                    cid = f"{g.id_prefix}{n}"
+                if cid in combatants or cid in added:
+                    raise HTTPException(
+                        status_code=409,
+                        detail="combatant_id already exists in encounter",
+                    )
+                pos = g.positions[k] if k < len(g.positions) else None
+                added[cid] = instantiate_combatant(
+                    prototypes[g.creature_id],
+                    combatant_id=cid,
+                    side=g.side,
+                    position=(pos.x, pos.y) if pos is not None else (0, 0),
+                    overrides=ov,
+                )
+                events_delta.append(
+                    {
+                        "type": "CombatantAdded",
+                        "combatant_id": cid,
+                        "creature_id": g.creature_id,
+                        "side": g.side,
+                    }
+                )
+        combatants.update(added)
+        return state_obj, events_delta
+
+    save_id, state, events_delta = await _commit_serialized(
+        db, locks, encounter_id, req.label, step
+    )
+    hub.publish(encounter_id, save_id=save_id, events=events_delta)
+
+    return EncounterRuntimeResponse(
+        encounter_id=encounter_id,
+        save_id=save_id,
+        state=state,
+        events_delta=[_to_dict(e) for e in events_delta],
+    )
+
+
+@router.post("/{encounter_id}/commands:apply", response_model=EncounterRuntimeResponse)
+async def apply_command(
+    encounter_id: str,
+    req: ApplyCommandRequest,
+    db: AsyncSession = Depends(get_async_db),
+    hub: EncounterEventHub = Depends(get_event_hub),
+    locks: EncounterLocks = Depends(get_encounter_locks),
+):
+    await _get_encounter_or_404(db, encounter_id)
+
     try:
-        # ✅ правильный способ: Command — Union, парсим через TypeAdapter
-        cmd_obj = TypeAdapter(Command).validate_python(req.command)
-        new_state, events_delta = engine_apply(state_obj, cmd_obj)
+        # Command — discriminated union, адаптер собран один раз в commands.py
+        cmd_obj = parse_command(req.command)
     except Exception as e:
         raise HTTPException(status_code=422, detail=f"Command apply failed: {e}")
 
-    row = save_snapshot(
-        db,
+    def step(save_id, state_obj):
+        state_obj = _require_state(save_id, state_obj)
+        try:
+            new_state, events = engine_apply(state_obj, cmd_obj)
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"Command apply failed: {e}")
+        return new_state, materialize_events(events)
+
+    save_id, state, events_delta = await _commit_serialized(
+        db, locks, encounter_id, req.label, step
+    )
+    hub.publish(encounter_id, save_id=save_id, events=events_delta)
+
+    return EncounterRuntimeResponse(
         encounter_id=encounter_id,
-        label=req.label,
-        state=new_state,
+        save_id=save_id,
+        state=state,
         events_delta=events_delta,
     )
 
-    return EncounterRuntimeResponse(
+
+@router.post(
+    "/{encounter_id}/commands:apply_batch", response_model=EncounterBatchResponse
+)
+async def apply_command_batch(
+    encounter_id: str,
+    req: ApplyCommandBatchRequest,
+    db: AsyncSession = Depends(get_async_db),
+    hub: EncounterEventHub = Depends(get_event_hub),
+    locks: EncounterLocks = Depends(get_encounter_locks),
+):
+    """
+    Несколько команд за один запрос: один load_latest_snapshot, один save_snapshot.
+    Останавливаемся на первом отказе или reaction window — остаток не применяется.
+    """
+    await _get_encounter_or_404(db, encounter_id)
+
+    try:
+        cmd_objs = parse_commands(req.commands)
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Command apply failed: {e}")
+
+    applied = 0
+
+    def step(save_id, state_obj):
+        nonlocal applied
+        state_obj = _require_state(save_id, state_obj)
+        try:
+            new_state, events, applied = engine_apply_batch(state_obj, cmd_objs)
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"Command apply failed: {e}")
+        return new_state, materialize_events(events)
+
+    save_id, state, events_delta = await _commit_serialized(
+        db, locks, encounter_id, req.label, step
+    )
+    hub.publish(encounter_id, save_id=save_id, events=events_delta)
+
+    stopped_reason = None
+    if events_delta and events_delta[-1]["type"] == "CommandRejected":
+        stopped_reason = "rejected"
+    elif applied < len(cmd_objs):
+        stopped_reason = "reaction_window"
+
+    return EncounterBatchResponse(
         encounter_id=encounter_id,
-        save_id=int(row.id),  # type: ignore
-        state=encounter_state_to_dict(new_state),
+        save_id=save_id,
+        state=state,
         events_delta=events_delta,
+        applied=applied,
+        stopped_reason=stopped_reason,
     )
 
 
 @router.get("/{encounter_id}/state", response_model=GetEncounterStateResponse)
-def get_state(encounter_id: int, db: Session = Depends(get_db)):
-    enc = db.query(Encounter).filter(Encounter.id == encounter_id).first()  # type: ignore
-    if not enc:
-        raise HTTPException(status_code=404, detail="Encounter not found")
-
-    save_id, state_obj, _events = load_latest_snapshot(db, encounter_id)
+async def get_state(encounter_id: str, db: AsyncSession = Depends(get_async_db)):
+    await _get_encounter_or_404(db, encounter_id)
+
+    if live_state_enabled():
+        doc = await load_live_state_async(db, encounter_id)
+        if doc is not None:
+            # документ уже dict: без сборки EncounterState и обратного to_dict
+            return GetEncounterStateResponse(
+                encounter_id=encounter_id, save_id=doc.save_id, state=doc.state
+            )
+
+    save_id, state_obj, _events = await load_latest_snapshot_async(db, encounter_id)
     if save_id is None or state_obj is None:
         raise HTTPException(status_code=404, detail="No saved state for encounter")
 
     return GetEncounterStateResponse(
         encounter_id=encounter_id,
         save_id=save_id,
-        state=encounter_state_to_dict(state_obj),
+        state=await _state_dict(state_obj),
     )
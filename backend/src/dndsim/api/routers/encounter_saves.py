@@ -1,11 +1,19 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import json
+from typing import Optional
 
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session, undefer
+
+from dndsim.core.persistence.retention import RetentionPolicy, compact_encounter_saves
+from dndsim.core.persistence.runtime_store import _bump_version_stmt, snapshot_meta
 from dndsim.db.deps import get_db
 from dndsim.db.models import Encounter, EncounterSave
 from dndsim.api.schemas import (
+    CompactSavesReport,
+    CompactSavesRequest,
     EncounterSaveCreate,
     EncounterSaveOut,
     EncounterSaveWithStateOut,
@@ -41,6 +49,40 @@ def _unpack_save_payload(state_json: dict) -> tuple[int, dict, list[dict]]:
 router = APIRouter(prefix="/encounters", tags=["encounter_saves"])
 
 
+# только колонки из ix_encounter_saves_listing: список не трогает blob'ы
+_LISTING_COLUMNS = (
+    EncounterSave.id,
+    EncounterSave.encounter_id,
+    EncounterSave.label,
+    EncounterSave.schema_version,
+    EncounterSave.created_at,
+    EncounterSave.size_bytes,
+    EncounterSave.seq_from,
+    EncounterSave.seq_to,
+    EncounterSave.round,
+)
+
+
+def _save_out(row) -> EncounterSaveOut:
+    out = EncounterSaveOut.model_validate(row, from_attributes=True)
+    out.schema_version = out.schema_version or 1
+    return out
+
+
+def _get_save_with_blobs(db: Session, save_id: str) -> Optional[EncounterSave]:
+    return db.get(EncounterSave, save_id, options=[undefer(EncounterSave.state_json)])
+
+
+def _save_with_state_out(obj: EncounterSave) -> EncounterSaveWithStateOut:
+    schema_version, state, events = _unpack_save_payload(json.loads(obj.state_json))
+    return EncounterSaveWithStateOut(
+        **_save_out(obj).model_dump(exclude={"schema_version"}),
+        schema_version=schema_version,
+        state=state,
+        events=events,
+    )
+
+
 @router.post("/{encounter_id}/saves", response_model=EncounterSaveOut)
 def create_save(
     encounter_id: str, payload: EncounterSaveCreate, db: Session = Depends(get_db)
@@ -49,86 +91,100 @@ def create_save(
     if not enc:
         raise HTTPException(status_code=404, detail="Encounter not found")
 
+    state_json = json.dumps(
+        _pack_save_payload(
+            schema_version=payload.schema_version,
+            state=payload.state,
+            events=payload.events,
+        ),
+        default=str,
+    )
+    events_json = json.dumps(payload.events, default=str)
     obj = EncounterSave(
         encounter_id=encounter_id,
         label=payload.label,
-        state_json=_pack_save_payload(
+        state_json=state_json,
+        events_json=events_json,
+        **snapshot_meta(
+            payload.state,
+            payload.events,
+            state_json=state_json,
+            events_json=events_json,
             schema_version=payload.schema_version,
-            state=payload.state,
-            events=payload.events,
         ),
     )
 
     db.add(obj)
+    db.flush()
+    # ручное сохранение тоже становится последним снапшотом (как и раньше по id);
+    # версия растёт вместе с указателем, иначе runtime-команда, начатая до этого
+    # сохранения, пройдёт CAS и молча перезапишет его
+    db.execute(_bump_version_stmt(encounter_id, None, obj.id))
     db.commit()
     db.refresh(obj)
 
-    return EncounterSaveOut(
-        id=obj.id,
-        encounter_id=obj.encounter_id,
-        label=obj.label,
-        schema_version=payload.schema_version,
-        created_at=obj.created_at,
-    )
+    return _save_out(obj)
 
 
 @router.get("/{encounter_id}/saves", response_model=list[EncounterSaveOut])
-def list_saves(encounter_id: str, db: Session = Depends(get_db)):
+def list_saves(
+    encounter_id: str,
+    limit: int = Query(default=100, ge=1, le=1000),
+    before_id: Optional[int] = Query(default=None, ge=1),
+    db: Session = Depends(get_db),
+):
+    """
+    Сохранения от новых к старым, страницами по limit (keyset по id:
+    следующая страница — before_id=<id последнего элемента>).
+    """
+    enc = db.get(Encounter, encounter_id)
+    if not enc:
+        raise HTTPException(status_code=404, detail="Encounter not found")
+
+    stmt = select(*_LISTING_COLUMNS).where(EncounterSave.encounter_id == encounter_id)
+    if before_id is not None:
+        stmt = stmt.where(EncounterSave.id < before_id)
+    rows = db.execute(stmt.order_by(EncounterSave.id.desc()).limit(limit)).all()
+    return [_save_out(r) for r in rows]
+
+
+@router.post("/{encounter_id}/saves:compact", response_model=CompactSavesReport)
+def compact_saves(
+    encounter_id: str, payload: CompactSavesRequest, db: Session = Depends(get_db)
+):
+    """Ручной прогон политики хранения для одного encounter'а (фоновая — в lifespan)."""
     enc = db.get(Encounter, encounter_id)
     if not enc:
         raise HTTPException(status_code=404, detail="Encounter not found")
 
-    items = (
-        db.query(EncounterSave)
-        .filter(EncounterSave.encounter_id == encounter_id)
-        .order_by(EncounterSave.created_at.desc())
-        .all()
+    policy = RetentionPolicy(
+        keep_latest=payload.keep_latest, keep_every_nth=payload.keep_every_nth
+    )
+    report = compact_encounter_saves(
+        db, encounter_id, policy, batch_size=payload.batch_size
+    )
+    return CompactSavesReport(
+        scanned=report.scanned,
+        deleted=report.deleted,
+        batches=report.batches,
+        reclaimed_bytes=report.reclaimed_bytes,
+        remaining=report.scanned - report.deleted,
     )
-    return [
-        EncounterSaveOut(
-            id=s.id,
-            encounter_id=s.encounter_id,
-            label=s.label,
-            schema_version=_unpack_save_payload(s.state_json)[0],
-            created_at=s.created_at,
-        )
-        for s in items
-    ]
 
 
 @router.get("/{encounter_id}/saves/{save_id}", response_model=EncounterSaveWithStateOut)
 def load_save(encounter_id: str, save_id: str, db: Session = Depends(get_db)):
-    obj = db.get(EncounterSave, save_id)
+    obj = _get_save_with_blobs(db, save_id)
     if not obj or obj.encounter_id != encounter_id:
         raise HTTPException(status_code=404, detail="Save not found")
 
-    schema_version, state, events = _unpack_save_payload(obj.state_json)
-
-    return EncounterSaveWithStateOut(
-        id=obj.id,
-        encounter_id=obj.encounter_id,
-        label=obj.label,
-        schema_version=schema_version,
-        created_at=obj.created_at,
-        state=state,
-        events=events,
-    )
+    return _save_with_state_out(obj)
 
 
 @router.get("/saves/{save_id}", response_model=EncounterSaveWithStateOut)
 def load_save_legacy(save_id: str, db: Session = Depends(get_db)):
-    obj = db.get(EncounterSave, save_id)
+    obj = _get_save_with_blobs(db, save_id)
     if not obj:
         raise HTTPException(status_code=404, detail="Save not found")
 
-    schema_version, state, events = _unpack_save_payload(obj.state_json)
-
-    return EncounterSaveWithStateOut(
-        id=obj.id,
-        encounter_id=obj.encounter_id,
-        label=obj.label,
-        schema_version=schema_version,
-        created_at=obj.created_at,
-        state=state,
-        events=events,
-    )
+    return _save_with_state_out(obj)
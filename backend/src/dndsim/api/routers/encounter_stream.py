@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from dndsim.api.deps import get_event_hub
+from dndsim.api.event_hub import EncounterEventHub, Subscription
+from dndsim.db.deps import get_async_db
+from dndsim.db.models import Encounter
+
+router = APIRouter(prefix="/encounters", tags=["encounter-stream"])
+
+# пустой комментарий раз в N секунд, чтобы прокси не рвали простаивающее соединение
+HEARTBEAT_INTERVAL_S = 15.0
+
+
+def _sse(event: str, data: Dict[str, Any], event_id: Any = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    # default=str: у событий движка event_id/roll_id — UUID
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'), default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def _stream(
+    request: Request, hub: EncounterEventHub, sub: Subscription
+) -> AsyncIterator[str]:
+    try:
+        while True:
+            if await request.is_disconnected():
+                break
+            try:
+                msg = await asyncio.wait_for(
+                    sub.queue.get(), timeout=HEARTBEAT_INTERVAL_S
+                )
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+
+            dropped = sub.take_dropped()
+            if dropped:
+                # клиент отстал: часть дельт потеряна, он должен перечитать /state
+                yield _sse(
+                    "lagged", {"encounter_id": sub.encounter_id, "dropped": dropped}
+                )
+
+            yield _sse("events", msg, event_id=msg.get("save_id"))
+    finally:
+        hub.unsubscribe(sub)
+
+
+@router.get("/{encounter_id}/events:stream")
+async def stream_events(
+    encounter_id: str,
+    request: Request,
+    hub: EncounterEventHub = Depends(get_event_hub),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Server-Sent Events: каждое успешное commands:apply / combatants:add
+    приходит сюда как `event: events` с теми же events_delta, что и в ответе.
+    """
+    exists = await db.get(Encounter, encounter_id) is not None
+    # соединение не держим, пока открыт поток
+    await db.close()
+    if not exists:
+        raise HTTPException(status_code=404, detail="Encounter not found")
+    sub = hub.subscribe(encounter_id)
+    return StreamingResponse(
+        _stream(request, hub, sub),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
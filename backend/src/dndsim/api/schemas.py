@@ -18,17 +18,21 @@ class PosDTO(BaseModel):
 class EncounterInitRequest(BaseModel):
     label: str = "init"
     reset_existing: bool = False
+    # seed броскам; без него rng случайный
+    rng_seed: Optional[int] = None
+    # как выдавать event_id/roll_id (см. dndsim.core.engine.ids)
+    id_strategy: Literal["uuid4", "monotonic", "deterministic"] = "uuid4"
 
 
 class EncounterRuntimeResponse(BaseModel):
-    encounter_id: int
+    encounter_id: str
     save_id: int
     state: Dict[str, Any]
     events_delta: List[Dict[str, Any]] = Field(default_factory=list)
 
 
 class AddCombatantRequest(BaseModel):
-    creature_id: int
+    creature_id: str
     side: str
     position: PosDTO = Field(default_factory=PosDTO)
     combatant_id: Optional[str] = None
@@ -37,13 +41,40 @@ class AddCombatantRequest(BaseModel):
     label: str = "add"
 
 
+class BulkCombatantGroup(BaseModel):
+    creature_id: str
+    count: int = Field(default=1, ge=1, le=500)
+    side: str
+    # позиции по порядку; если их меньше count — остальные в (0, 0)
+    positions: List[PosDTO] = Field(default_factory=list)
+    # id будут f"{id_prefix}{n}"; без префикса — f"{creature_id}-{uuid8}"
+    id_prefix: Optional[str] = None
+    overrides: Optional[Dict[str, Any]] = None
+
+
+class AddCombatantsBulkRequest(BaseModel):
+    groups: List[BulkCombatantGroup] = Field(min_length=1)
+    label: str = "add_bulk"
+
+
 class ApplyCommandRequest(BaseModel):
     command: Dict[str, Any]
     label: str = "cmd"
 
 
+class ApplyCommandBatchRequest(BaseModel):
+    commands: List[Dict[str, Any]] = Field(min_length=1)
+    label: str = "batch"
+
+
+class EncounterBatchResponse(EncounterRuntimeResponse):
+    applied: int = 0
+    # None | "rejected" | "reaction_window"
+    stopped_reason: Optional[str] = None
+
+
 class GetEncounterStateResponse(BaseModel):
-    encounter_id: int
+    encounter_id: str
     save_id: int
     state: Dict[str, Any]
     # для MVP можно не возвращать весь лог, только снапшот
@@ -184,6 +215,43 @@ class CreatureOut(BaseModel):
     updated_at: datetime
 
 
+class CreatureSummaryOut(BaseModel):
+    """Строка каталога без data_json (GET /creatures:page?view=summary)."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    id: str
+    name: str
+    ac: Optional[int] = None
+    hp_max: Optional[int] = None
+    is_player_character: bool = False
+    speed_ft: Optional[int] = None
+    max_slot_level: int = 0
+    attack_count: int = 0
+    offense_rating: float = 0.0
+    defense_rating: Optional[float] = None
+    updated_at: datetime
+
+
+class CreaturePage(BaseModel):
+    items: List[CreatureSummaryOut | CreatureOut]
+    # передать в ?after= за следующей страницей; None — страниц больше нет
+    next_cursor: Optional[str] = None
+
+
+class CreatureImportError(BaseModel):
+    index: int  # номер записи в файле (с 0)
+    name: Optional[str] = None
+    error: str
+
+
+class CreatureImportReport(BaseModel):
+    total: int
+    inserted: int
+    failed: int
+    errors: List[CreatureImportError] = Field(default_factory=list)
+
+
 class EncounterCreate(BaseModel):
     model_config = ConfigDict(extra="forbid")
     name: str
@@ -211,11 +279,30 @@ class EncounterSaveCreate(BaseModel):
 class EncounterSaveOut(BaseModel):
     model_config = ConfigDict(extra="forbid")
 
-    id: str
+    id: int
     encounter_id: str
     label: Optional[str] = None
     schema_version: int = Field(default=1, ge=1)
     created_at: datetime
+    # метаданные из колонок EncounterSave (у старых строк могут быть None)
+    size_bytes: Optional[int] = None
+    seq_from: Optional[int] = None
+    seq_to: Optional[int] = None
+    round: Optional[int] = None
+
+
+class CompactSavesRequest(BaseModel):
+    keep_latest: int = Field(default=20, ge=1)
+    keep_every_nth: int = Field(default=50, ge=1)
+    batch_size: int = Field(default=500, ge=1, le=10000)
+
+
+class CompactSavesReport(BaseModel):
+    scanned: int
+    deleted: int
+    batches: int
+    reclaimed_bytes: int
+    remaining: int
 
 
 class EncounterSaveWithStateOut(EncounterSaveOut):
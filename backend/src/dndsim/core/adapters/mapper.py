@@ -1,4 +1,5 @@
 from __future__ import annotations
+import copy
 import inspect
 
 
@@ -230,8 +231,24 @@ def combatant_from_creature(
     position: tuple[int, int] = (0, 0),
     overrides: CombatantOverrides | None = None,
 ) -> CombatantState:
+    return instantiate_combatant(
+        combatant_prototype(creature),
+        combatant_id=combatant_id,
+        side=side,
+        position=position,
+        overrides=overrides,
+    )
+
+
+def combatant_prototype(
+    creature: CreatureData | ABCMapping[str, Any] | Any,
+) -> CombatantState:
+    """
+    Разбор creature -> CombatantState без id/side/position/overrides.
+    Дорогая часть маппинга; результат можно кэшировать (см. adapters/templates.py)
+    и штамповать комбатантов через instantiate_combatant().
+    """
     c = _as_dict(creature)
-    ov = overrides or CombatantOverrides()
 
     # --- базовые поля ---
     name = _first_present(c, "name", "title", default="Unknown")
@@ -239,31 +256,19 @@ def combatant_from_creature(
 
     hp_max = int(_first_present(c, "hp_max", "hp", "hit_points", default=1))
     hp_current = hp_max
-    if ov.hp_current is not None:
-        hp_current = int(ov.hp_current)
 
     temp_hp = int(_first_present(c, "temp_hp", default=0))
-    if ov.temp_hp is not None:
-        temp_hp = int(ov.temp_hp)
 
     speed_ft = int(_first_present(c, "speed_ft", "speed", default=30))
-    if ov.speed_ft is not None:
-        speed_ft = int(ov.speed_ft)
 
     attacks_per_action = int(_first_present(c, "attacks_per_action", default=1))
-    if ov.attacks_per_action is not None:
-        attacks_per_action = int(ov.attacks_per_action)
 
     initiative_bonus = int(_first_present(c, "initiative_bonus", default=0))
-    if ov.initiative_bonus is not None:
-        initiative_bonus = int(ov.initiative_bonus)
 
     # --- is_pc -> is_player_character ---
     is_player_character = bool(
         _first_present(c, "is_player_character", "is_pc", default=False)
     )
-    if ov.is_player_character is not None:
-        is_player_character = bool(ov.is_player_character)
 
     # --- resist/vuln/immune -> damage_* sets ---
     resistances = _first_present(
@@ -319,11 +324,6 @@ def combatant_from_creature(
     if resources_max is None and isinstance(resources, dict):
         resources_max = resources
 
-    if ov.resources_current is not None:
-        resources_current = ov.resources_current
-    if ov.resources_max is not None:
-        resources_max = ov.resources_max
-
     resources_current = resources_current if isinstance(resources_current, dict) else {}
     resources_max = resources_max if isinstance(resources_max, dict) else {}
 
@@ -351,18 +351,15 @@ def combatant_from_creature(
     if not isinstance(multiattacks, dict):
         multiattacks = {}
 
-    # position у вас: Pos = (x, y)
-    pos = (int(position[0]), int(position[1]))
-
     data: dict[str, Any] = {
-        "id": combatant_id,
+        "id": "",
         "name": name,
         "ac": ac,
         "hp_current": hp_current,
         "hp_max": hp_max,
         "temp_hp": temp_hp,
         "speed_ft": speed_ft,
-        "side": side,
+        "side": None,
         "save_bonuses": save_bonuses,
         "damage_resistances": damage_resistances,
         "damage_vulnerabilities": damage_vulnerabilities,
@@ -370,7 +367,7 @@ def combatant_from_creature(
         "is_player_character": is_player_character,
         "attacks_per_action": attacks_per_action,
         "multiattacks": multiattacks,
-        "position": pos,
+        "position": (0, 0),
         "initiative_bonus": initiative_bonus,
         "resources_current": resources_current,
         "resources_max": resources_max,
@@ -387,6 +384,61 @@ def combatant_from_creature(
     return _build_model(CombatantState, data)
 
 
+def _clone(v: Any) -> Any:
+    # контейнеры копируем рекурсивно (в них пишет движок), скаляры — общие
+    if isinstance(v, dict):
+        return {k: _clone(x) for k, x in v.items()}
+    if isinstance(v, list):
+        return [_clone(x) for x in v]
+    if isinstance(v, set):
+        return set(v)
+    return v
+
+
+def instantiate_combatant(
+    prototype: CombatantState,
+    *,
+    combatant_id: str,
+    side: str,
+    position: tuple[int, int] = (0, 0),
+    overrides: CombatantOverrides | None = None,
+) -> CombatantState:
+    """
+    Дешёвый клон прототипа + id/side/position/overrides.
+    Прототип не меняется: все dict/list/set у копии свои.
+    """
+    c = copy.copy(prototype)
+    for k, v in vars(c).items():
+        if isinstance(v, (dict, list, set)):
+            setattr(c, k, _clone(v))
+
+    c.id = combatant_id
+    c.side = side
+    # position у вас: Pos = (x, y)
+    c.position = (int(position[0]), int(position[1]))
+
+    ov = overrides
+    if ov is None:
+        return c
+    if ov.hp_current is not None:
+        c.hp_current = int(ov.hp_current)
+    if ov.temp_hp is not None:
+        c.temp_hp = int(ov.temp_hp)
+    if ov.speed_ft is not None:
+        c.speed_ft = int(ov.speed_ft)
+    if ov.attacks_per_action is not None:
+        c.attacks_per_action = int(ov.attacks_per_action)
+    if ov.initiative_bonus is not None:
+        c.initiative_bonus = int(ov.initiative_bonus)
+    if ov.is_player_character is not None:
+        c.is_player_character = bool(ov.is_player_character)
+    if ov.resources_current is not None:
+        c.resources_current = _clone(ov.resources_current)
+    if ov.resources_max is not None:
+        c.resources_max = _clone(ov.resources_max)
+    return c
+
+
 def creature_data_from_combatant(combatant: CombatantState) -> dict[str, Any]:
     """
     Опционально (на будущее).
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Tuple
+
+from dndsim.core.adapters.mapper import combatant_prototype
+from dndsim.core.engine.state import CombatantState
+
+
+class CreatureTemplateCache:
+    """
+    Кэш готовых прототипов CombatantState по (creature_id, updated_at).
+
+    На существо хранится одна версия: другой updated_at — пересборка.
+    updated_at у SQLite с точностью до секунды, поэтому роутеры существ
+    ещё и явно зовут invalidate() после PATCH/PUT.
+
+    Прототип никому не отдаётся на изменение: комбатанты получаются через
+    mapper.instantiate_combatant() (клон + overrides).
+    Замок — потому что sync-роутеры работают из threadpool.
+    """
+
+    def __init__(self, maxsize: int = 512) -> None:
+        self.maxsize = maxsize
+        self._items: "OrderedDict[str, Tuple[Any, CombatantState]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self, creature_id: Any, version: Any, load: Callable[[], Any]
+    ) -> CombatantState:
+        """Прототип для версии version; load() отдаёт данные существа при промахе."""
+        key = str(creature_id)
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[0] == version:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return item[1]
+
+        proto = combatant_prototype(load())
+
+        with self._lock:
+            self.misses += 1
+            self._items[key] = (version, proto)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return proto
+
+    def invalidate(self, creature_id: Any) -> None:
+        with self._lock:
+            self._items.pop(str(creature_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+creature_templates = CreatureTemplateCache()
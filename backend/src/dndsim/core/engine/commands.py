@@ -1,7 +1,7 @@
 # backend/src/dndsim/core/engine/commands.py
 
-from typing import Literal, Union
-from pydantic import BaseModel, ConfigDict
+from typing import Annotated, Any, Iterable, List, Literal, Union
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 
 
 class CommandBase(BaseModel):
@@ -19,6 +19,28 @@ class EndTurn(CommandBase):
     combatant_id: str
 
 
+class AdvanceTurn(CommandBase):
+    """
+    EndTurn текущего владельца (если ход начат) + BeginTurn следующего,
+    кто может ходить: мёртвые/убранные (и, по state.skip_unconscious_npcs,
+    NPC на 0 hp) пропускаются с событием TurnSkipped.
+    """
+
+    type: Literal["AdvanceTurn"] = "AdvanceTurn"
+    combatant_id: str | None = None  # если задан — должен быть владельцем хода
+
+
+class RunUntilDecision(CommandBase):
+    """
+    Прокручивает автоматические шаги (начало/конец хода, пропуски, death saves,
+    ходы тех, кто не может действовать) до точки, где нужен выбор: ход
+    дееспособного комбатанта, reaction window или конец боя.
+    """
+
+    type: Literal["RunUntilDecision"] = "RunUntilDecision"
+    max_steps: int = 1000  # страховка от бесконечного цикла
+
+
 class Attack(CommandBase):
     type: Literal["Attack"] = "Attack"
     attacker_id: str
@@ -79,6 +101,23 @@ class RollInitiative(CommandBase):
     bonus: int = 0  # обычно Dex mod, но в MVP передаём явно
 
 
+class RollAllInitiative(CommandBase):
+    """
+    Инициатива всем (или всем, у кого её ещё нет) одной командой.
+    Бонус: bonuses[combatant_id] > side_bonuses[side] > CombatantState.initiative_bonus.
+    group_identical: одинаковые NPC (та же side и name) бросают один раз на группу.
+    """
+
+    type: Literal["RollAllInitiative"] = "RollAllInitiative"
+    bonuses: dict[str, int] = {}
+    side_bonuses: dict[str, int] = {}
+    only_missing: bool = (
+        True  # не трогать уже выставленные SetInitiative/RollInitiative
+    )
+    group_identical: bool = False
+    finalize: bool = False  # сразу FinalizeInitiative
+
+
 class FinalizeInitiative(CommandBase):
     type: Literal["FinalizeInitiative"] = "FinalizeInitiative"
 
@@ -157,26 +196,54 @@ class CastSpell(CommandBase):
     slot_level: int = 1  # 0 = cantrip
 
 
-Command = Union[
-    StartCombat,
-    SetInitiative,
-    RollInitiative,
-    FinalizeInitiative,
-    BeginTurn,
-    EndTurn,
-    Attack,
-    Multiattack,
-    Disengage,
-    Move,
-    UseReaction,
-    DeclineReaction,
-    ApplyCondition,
-    RemoveCondition,
-    SaveEffect,
-    RollDeathSave,
-    Stabilize,
-    Heal,
-    StartConcentration,
-    EndConcentration,
-    CastSpell,
+# discriminated union: pydantic сразу выбирает модель по полю "type",
+# а не перебирает все 24 варианта по очереди
+Command = Annotated[
+    Union[
+        StartCombat,
+        SetInitiative,
+        RollInitiative,
+        RollAllInitiative,
+        FinalizeInitiative,
+        BeginTurn,
+        EndTurn,
+        AdvanceTurn,
+        RunUntilDecision,
+        Attack,
+        Multiattack,
+        Disengage,
+        Move,
+        UseReaction,
+        DeclineReaction,
+        ApplyCondition,
+        RemoveCondition,
+        SaveEffect,
+        RollDeathSave,
+        Stabilize,
+        Heal,
+        StartConcentration,
+        EndConcentration,
+        CastSpell,
+    ],
+    Field(discriminator="type"),
 ]
+
+# Схема union'а строится один раз при импорте: TypeAdapter(Command) на каждый
+# запрос стоит ~0.5 мс, готовый адаптер валидирует команду за десятки мкс.
+COMMAND_ADAPTER: TypeAdapter[Command] = TypeAdapter(Command)
+_COMMAND_LIST_ADAPTER: TypeAdapter[List[Command]] = TypeAdapter(List[Command])
+
+
+def parse_command(data: Any) -> Command:
+    """dict (из JSON) -> конкретная модель команды. Ошибки — pydantic.ValidationError."""
+    return COMMAND_ADAPTER.validate_python(data)
+
+
+def parse_commands(items: Iterable[Any]) -> List[Command]:
+    """
+    Пачка команд за один вызов валидатора (batch, replay из лога).
+    В ValidationError путь ошибки начинается с индекса команды.
+    """
+    if not isinstance(items, list):
+        items = list(items)
+    return _COMMAND_LIST_ADAPTER.validate_python(items)
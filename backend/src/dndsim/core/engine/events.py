@@ -1,10 +1,18 @@
 from __future__ import annotations
 
-from typing import Any, Literal, Optional
-from uuid import UUID, uuid4
+from collections.abc import Mapping
+from typing import Any, Iterable, Iterator, Literal, NamedTuple, Optional, Union
+from uuid import UUID
 
 from pydantic import BaseModel, Field, ConfigDict
 
+from dndsim.core.engine.ids import (
+    eager_event_id,
+    eager_roll_id,
+    new_event_id,
+    new_roll_id,
+)
+
 
 class RollMod(BaseModel):
     name: str
@@ -12,7 +20,7 @@ class RollMod(BaseModel):
 
 
 class Roll(BaseModel):
-    roll_id: UUID = Field(default_factory=uuid4)
+    roll_id: UUID = Field(default_factory=new_roll_id)
     kind: Literal["d20", "damage", "other"]
     formula: str
     dice: list[int]
@@ -24,11 +32,156 @@ class Roll(BaseModel):
     is_critical: bool = False
 
 
+class RollModRecord(NamedTuple):
+    """Модификатор броска на горячем пути (кортеж вместо pydantic RollMod)."""
+
+    name: str
+    value: int
+
+
+# порядок ключей как у Roll.model_dump()
+ROLL_KEYS: tuple[str, ...] = (
+    "roll_id",
+    "kind",
+    "formula",
+    "dice",
+    "kept",
+    "mods",
+    "total",
+    "adv_state",
+    "nat",
+    "is_critical",
+)
+
+
+class RollRecord(Mapping):
+    """
+    Внутренний бросок движка: slots, без валидации и без uuid4.
+    _roll_d20/_roll_save/_roll_damage и middleware работают с ним.
+    В payload события кладётся как есть и читается как dict
+    (e["payload"]["roll"]["total"]); в dict превращается только в
+    EventRecord.to_dict(), roll_id (uuid4) выдаётся тогда же.
+    """
+
+    __slots__ = (
+        "_roll_id",
+        "kind",
+        "formula",
+        "dice",
+        "kept",
+        "mods",
+        "total",
+        "adv_state",
+        "nat",
+        "is_critical",
+    )
+
+    def __init__(
+        self,
+        kind: Literal["d20", "damage", "other"],
+        formula: str,
+        dice: list[int],
+        kept: list[int],
+        mods: list[RollModRecord],
+        total: int,
+        adv_state: Literal["normal", "advantage", "disadvantage"] = "normal",
+        nat: Optional[int] = None,
+        is_critical: bool = False,
+    ) -> None:
+        self.kind = kind
+        self.formula = formula
+        self.dice = dice
+        self.kept = kept
+        self.mods = mods
+        self.total = total
+        self.adv_state = adv_state
+        self.nat = nat
+        self.is_critical = is_critical
+        self._roll_id: Optional[UUID] = None
+
+    @property
+    def roll_id(self) -> UUID:
+        # как EventRecord.event_id: uuid4 — лениво, при сериализации
+        if self._roll_id is None:
+            self._roll_id = new_roll_id()
+        return self._roll_id
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "mods":
+            return [{"name": m.name, "value": m.value} for m in self.mods]
+        if key in ROLL_KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(ROLL_KEYS)
+
+    def __len__(self) -> int:
+        return len(ROLL_KEYS)
+
+    def __repr__(self) -> str:
+        return f"RollRecord({self.kind!r}, {self.formula!r}, total={self.total})"
+
+    def to_roll(self) -> Roll:
+        return Roll(
+            roll_id=self.roll_id,
+            kind=self.kind,
+            formula=self.formula,
+            dice=list(self.dice),
+            kept=list(self.kept),
+            mods=[RollMod(name=m.name, value=m.value) for m in self.mods],
+            total=self.total,
+            adv_state=self.adv_state,
+            nat=self.nat,
+            is_critical=self.is_critical,
+        )
+
+    def to_payload(self) -> dict[str, Any]:
+        # то же, что to_roll().model_dump(), но без промежуточной модели
+        return {
+            "roll_id": self.roll_id,
+            "kind": self.kind,
+            "formula": self.formula,
+            "dice": list(self.dice),
+            "kept": list(self.kept),
+            "mods": [{"name": m.name, "value": m.value} for m in self.mods],
+            "total": self.total,
+            "adv_state": self.adv_state,
+            "nat": self.nat,
+            "is_critical": self.is_critical,
+        }
+
+
+AnyRoll = Union[Roll, RollRecord]
+
+
+def roll_payload(roll: AnyRoll) -> Mapping[str, Any]:
+    """
+    Значение payload["roll"]. RollRecord кладётся ссылкой и разворачивается
+    в dict в EventRecord.to_dict(); для стратегий monotonic/deterministic
+    roll_id выдаём сразу (пока state привязан), как eager_event_id.
+    """
+    if isinstance(roll, RollRecord):
+        if roll._roll_id is None:
+            roll._roll_id = eager_roll_id()
+        return roll
+    return roll.model_dump()
+
+
+def _payload_dict(payload: dict[str, Any]) -> dict[str, Any]:
+    out = dict(payload)
+    roll = out.get("roll")
+    if isinstance(roll, RollRecord):
+        out["roll"] = roll.to_payload()
+    return out
+
+
 class EventEnvelope(BaseModel):
     model_config = ConfigDict(extra="forbid")
 
-    event_id: UUID = Field(default_factory=uuid4)
     seq: int
+    # после seq: фабрике id нужен seq (стратегии monotonic/deterministic, см. ids.py)
+    event_id: UUID = Field(default_factory=lambda data: new_event_id(data.get("seq")))
     t: int
     type: str
 
@@ -39,6 +192,140 @@ class EventEnvelope(BaseModel):
     payload: dict[str, Any] = Field(default_factory=dict)
 
 
+# порядок ключей как у EventEnvelope.model_dump()
+EVENT_KEYS: tuple[str, ...] = (
+    "seq",
+    "event_id",
+    "t",
+    "type",
+    "round",
+    "turn_owner_id",
+    "actor_id",
+    "payload",
+)
+# позиции полей в EventRecord.raw
+_RAW_INDEX = {
+    "type": 0,
+    "seq": 1,
+    "t": 2,
+    "round": 3,
+    "turn_owner_id": 4,
+    "actor_id": 5,
+    "payload": 6,
+}
+
+
+class EventRecord(Mapping):
+    """
+    Событие, как его пишет движок: кортеж raw =
+    (type, seq, t, round, turn_owner_id, actor_id, payload) без валидации.
+
+    Читается как dict (e["type"], e["payload"]["roll"], ...), так что код,
+    который только смотрит на события, ничего не материализует.
+    to_dict()/to_envelope() — только на границе (API, persistence, SSE).
+    Внутренние потребители (аналитика) могут читать raw напрямую.
+    """
+
+    __slots__ = ("raw", "_event_id")
+
+    def __init__(
+        self,
+        raw: tuple[str, int, int, int, Optional[str], Optional[str], dict[str, Any]],
+        event_id: Optional[UUID] = None,
+    ) -> None:
+        self.raw = raw
+        self._event_id = event_id
+
+    @property
+    def type(self) -> str:
+        return self.raw[0]
+
+    @property
+    def seq(self) -> int:
+        return self.raw[1]
+
+    @property
+    def payload(self) -> dict[str, Any]:
+        return self.raw[6]
+
+    @property
+    def event_id(self) -> UUID:
+        # uuid4 выдаём лениво: событие, которое никто не сериализует, его не тратит
+        if self._event_id is None:
+            self._event_id = new_event_id(self.raw[1])
+        return self._event_id
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "event_id":
+            return self.event_id
+        return self.raw[_RAW_INDEX[key]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(EVENT_KEYS)
+
+    def __len__(self) -> int:
+        return len(EVENT_KEYS)
+
+    def __repr__(self) -> str:
+        return f"EventRecord({self.raw[0]!r}, seq={self.raw[1]})"
+
+    def to_dict(self) -> dict[str, Any]:
+        type_, seq, t, round_, turn_owner_id, actor_id, payload = self.raw
+        return {
+            "seq": seq,
+            "event_id": self.event_id,
+            "t": t,
+            "type": type_,
+            "round": round_,
+            "turn_owner_id": turn_owner_id,
+            "actor_id": actor_id,
+            "payload": _payload_dict(payload),
+        }
+
+    # совместимость с кодом, который звал ev_*(...).model_dump()
+    model_dump = to_dict
+
+    def to_envelope(self) -> EventEnvelope:
+        return EventEnvelope(**self.to_dict())
+
+
+def make_event(
+    *,
+    seq: int,
+    t: int,
+    type: str,
+    round: int,
+    turn_owner_id: Optional[str] = None,
+    actor_id: Optional[str] = None,
+    payload: Optional[dict[str, Any]] = None,
+) -> EventRecord:
+    return EventRecord(
+        (
+            type,
+            seq,
+            t,
+            round,
+            turn_owner_id,
+            actor_id,
+            payload if payload is not None else {},
+        ),
+        eager_event_id(seq),
+    )
+
+
+def event_to_dict(event: Mapping) -> dict[str, Any]:
+    if isinstance(event, EventRecord):
+        return event.to_dict()
+    if isinstance(event, dict):
+        return event
+    return dict(event)
+
+
+def materialize_events(events: Iterable[Mapping]) -> list[dict[str, Any]]:
+    """События движка -> обычные dict'ы (для JSON, БД, SSE)."""
+    return [event_to_dict(e) for e in events]
+
+
 def ev_command_rejected(
     *,
     seq: int,
@@ -50,8 +337,8 @@ def ev_command_rejected(
     code: str,
     message: str,
     meta: dict,
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="CommandRejected",
@@ -67,8 +354,8 @@ def ev_command_rejected(
     )
 
 
-def ev_combat_started(*, seq: int, t: int, round_: int) -> EventEnvelope:
-    return EventEnvelope(
+def ev_combat_started(*, seq: int, t: int, round_: int) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="CombatStarted",
@@ -81,8 +368,8 @@ def ev_combat_started(*, seq: int, t: int, round_: int) -> EventEnvelope:
 
 def ev_initiative_set(
     *, seq: int, t: int, round_: int, combatant_id: str, initiative: int
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="InitiativeSet",
@@ -94,9 +381,9 @@ def ev_initiative_set(
 
 
 def ev_initiative_rolled(
-    *, seq: int, t: int, round_: int, combatant_id: str, roll: Roll, bonus: int
-) -> EventEnvelope:
-    return EventEnvelope(
+    *, seq: int, t: int, round_: int, combatant_id: str, roll: AnyRoll, bonus: int
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="InitiativeRolled",
@@ -105,7 +392,7 @@ def ev_initiative_rolled(
         actor_id=combatant_id,
         payload={
             "combatant_id": combatant_id,
-            "roll": roll.model_dump(),
+            "roll": roll_payload(roll),
             "bonus": bonus,
             "initiative": roll.total,
         },
@@ -114,9 +401,9 @@ def ev_initiative_rolled(
 
 def ev_initiative_order_finalized(
     *, seq: int, t: int, round_: int, order: list[dict]
-) -> EventEnvelope:
+) -> EventRecord:
     # order: [{"combatant_id": "...", "initiative": 12}, ...]
-    return EventEnvelope(
+    return make_event(
         seq=seq,
         t=t,
         type="InitiativeOrderFinalized",
@@ -129,8 +416,8 @@ def ev_initiative_order_finalized(
 
 def ev_round_started(
     *, seq: int, t: int, round_: int, turn_owner_id: str
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="RoundStarted",
@@ -141,10 +428,31 @@ def ev_round_started(
     )
 
 
+def ev_combat_ended(
+    *,
+    seq: int,
+    t: int,
+    round_: int,
+    turn_owner_id: Optional[str],
+    winner_side: Optional[str],
+    reason: str,
+    sides: dict[str, dict[str, int]],
+) -> EventRecord:
+    return make_event(
+        seq=seq,
+        t=t,
+        type="CombatEnded",
+        round=round_,
+        turn_owner_id=turn_owner_id,
+        actor_id=None,
+        payload={"winner_side": winner_side, "reason": reason, "sides": sides},
+    )
+
+
 def ev_turn_started(
     *, seq: int, t: int, round_: int, turn_owner_id: str
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="TurnStarted",
@@ -165,8 +473,8 @@ def ev_turn_resources_reset(
     bonus: bool,
     reaction: bool,
     movement_ft: int,
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="TurnResourcesReset",
@@ -185,8 +493,8 @@ def ev_turn_resources_reset(
 
 def ev_disengage_applied(
     *, seq: int, t: int, round_: int, turn_owner_id: str, combatant_id: str
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="DisengageApplied",
@@ -199,8 +507,8 @@ def ev_disengage_applied(
 
 def ev_movement_started(
     *, seq: int, t: int, round_: int, turn_owner_id: str, mover_id: str, from_pos, path
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="MovementStarted",
@@ -221,8 +529,8 @@ def ev_moved_step(
     from_pos,
     to_pos,
     cost_ft: int,
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="MovedStep",
@@ -241,8 +549,8 @@ def ev_moved_step(
 
 def ev_movement_stopped(
     *, seq: int, t: int, round_: int, turn_owner_id: str, mover_id: str, reason: str
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="MovementStopped",
@@ -262,8 +570,8 @@ def ev_opportunity_attack_triggered(
     mover_id: str,
     threatened_by_id: str,
     reach_ft: int,
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="OpportunityAttackTriggered",
@@ -288,8 +596,8 @@ def ev_reaction_window_opened(
     trigger: str,
     eligible_reactors: list[str],
     context: dict,
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="ReactionWindowOpened",
@@ -307,8 +615,8 @@ def ev_reaction_window_opened(
 
 def ev_reaction_window_closed(
     *, seq: int, t: int, round_: int, turn_owner_id: str, window_id: str, closed_by: str
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="ReactionWindowClosed",
@@ -331,8 +639,8 @@ def ev_attack_declared(
     attack_kind: Literal["melee", "ranged"] = "melee",
     context: Literal["action", "reaction"] = "action",
     economy: Literal["action", "bonus", "reaction"] = "action",
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="AttackDeclared",
@@ -360,8 +668,8 @@ def ev_multiattack_declared(
     target_id: str,
     multiattack_name: str,
     attacks: list[str],
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="MultiattackDeclared",
@@ -385,11 +693,11 @@ def ev_attack_rolled(
     turn_owner_id: str,
     attacker_id: str,
     target_id: str,
-    roll: Roll,
+    roll: AnyRoll,
     to_hit_bonus: int,
     target_ac: int,
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="AttackRolled",
@@ -399,7 +707,7 @@ def ev_attack_rolled(
         payload={
             "attacker_id": attacker_id,
             "target_id": target_id,
-            "roll": roll.model_dump(),
+            "roll": roll_payload(roll),
             "to_hit_bonus": to_hit_bonus,
             "target_ac": target_ac,
         },
@@ -416,8 +724,8 @@ def ev_hit_confirmed(
     target_id: str,
     is_critical: bool,
     margin: int,
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="HitConfirmed",
@@ -442,8 +750,8 @@ def ev_miss_confirmed(
     attacker_id: str,
     target_id: str,
     margin: int,
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="MissConfirmed",
@@ -462,10 +770,10 @@ def ev_damage_rolled(
     turn_owner_id: str,
     attacker_id: str,
     target_id: str,
-    roll: Roll,
+    roll: AnyRoll,
     damage_type: str,
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="DamageRolled",
@@ -475,7 +783,7 @@ def ev_damage_rolled(
         payload={
             "attacker_id": attacker_id,
             "target_id": target_id,
-            "roll": roll.model_dump(),
+            "roll": roll_payload(roll),
             "damage_type": damage_type,
         },
     )
@@ -496,8 +804,8 @@ def ev_damage_applied(
     hp_after: int,
     is_critical: bool = False,  # ✅ добавили
     modifier: str | None = None,  # (опционально)
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="DamageApplied",
@@ -518,10 +826,8 @@ def ev_damage_applied(
     )
 
 
-def ev_turn_ended(
-    *, seq: int, t: int, round_: int, turn_owner_id: str
-) -> EventEnvelope:
-    return EventEnvelope(
+def ev_turn_ended(*, seq: int, t: int, round_: int, turn_owner_id: str) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="TurnEnded",
@@ -532,6 +838,40 @@ def ev_turn_ended(
     )
 
 
+def ev_turn_skipped(
+    *, seq: int, t: int, round_: int, combatant_id: str, reason: str
+) -> EventRecord:
+    return make_event(
+        seq=seq,
+        t=t,
+        type="TurnSkipped",
+        round=round_,
+        turn_owner_id=combatant_id,
+        actor_id=combatant_id,
+        payload={"combatant_id": combatant_id, "reason": reason},
+    )
+
+
+def ev_decision_required(
+    *,
+    seq: int,
+    t: int,
+    round_: int,
+    turn_owner_id: Optional[str],
+    reason: str,
+    steps: int,
+) -> EventRecord:
+    return make_event(
+        seq=seq,
+        t=t,
+        type="DecisionRequired",
+        round=round_,
+        turn_owner_id=turn_owner_id,
+        actor_id=None,
+        payload={"reason": reason, "steps": steps},
+    )
+
+
 def ev_condition_applied(
     *,
     seq: int,
@@ -542,8 +882,8 @@ def ev_condition_applied(
     target_id: str,
     condition: str,
     reason: str = "effect",
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="ConditionApplied",
@@ -564,8 +904,8 @@ def ev_condition_removed(
     target_id: str,
     condition: str,
     reason: str = "effect",
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="ConditionRemoved",
@@ -584,8 +924,8 @@ def ev_unconscious_state_changed(
     target_id: str,
     became_unconscious: bool,
     reason: str,
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="UnconsciousStateChanged",
@@ -617,8 +957,8 @@ def ev_save_effect_declared(
     damage_type: str,
     damage_formula: str,
     economy: str,
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="SaveEffectDeclared",
@@ -650,12 +990,12 @@ def ev_saving_throw_rolled(
     source_id: str,
     target_id: str,
     effect_name: str,
-    roll: Roll,
+    roll: AnyRoll,
     save_ability: str,
     dc: int,
     bonus: int,
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="SavingThrowRolled",
@@ -669,7 +1009,7 @@ def ev_saving_throw_rolled(
             "save_ability": save_ability,
             "dc": dc,
             "bonus": bonus,
-            "roll": roll.model_dump(),
+            "roll": roll_payload(roll),
         },
     )
 
@@ -685,8 +1025,8 @@ def ev_saving_throw_succeeded(
     target_id: str,
     effect_name: str,
     margin: int,
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="SavingThrowSucceeded",
@@ -713,8 +1053,8 @@ def ev_saving_throw_failed(
     target_id: str,
     effect_name: str,
     margin: int,
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="SavingThrowFailed",
@@ -740,10 +1080,10 @@ def ev_effect_damage_rolled(
     source_id: str,
     target_id: str,
     effect_name: str,
-    roll: Roll,
+    roll: AnyRoll,
     damage_type: str,
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="EffectDamageRolled",
@@ -755,7 +1095,7 @@ def ev_effect_damage_rolled(
             "target_id": target_id,
             "effect_name": effect_name,
             "damage_type": damage_type,
-            "roll": roll.model_dump(),
+            "roll": roll_payload(roll),
         },
     )
 
@@ -775,8 +1115,8 @@ def ev_effect_damage_applied(
     damage_type: str,
     hp_before: int,
     hp_after: int,
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="EffectDamageApplied",
@@ -806,8 +1146,8 @@ def ev_save_effect_negated(
     source_id: str,
     target_id: str,
     effect_name: str,
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="SaveEffectNegated",
@@ -824,8 +1164,8 @@ def ev_save_effect_negated(
 
 def ev_death_save_required(
     *, seq: int, t: int, round_: int, combatant_id: str
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="DeathSaveRequired",
@@ -837,16 +1177,16 @@ def ev_death_save_required(
 
 
 def ev_death_save_rolled(
-    *, seq: int, t: int, round_: int, combatant_id: str, roll: Roll
-) -> EventEnvelope:
-    return EventEnvelope(
+    *, seq: int, t: int, round_: int, combatant_id: str, roll: AnyRoll
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="DeathSaveRolled",
         round=round_,
         turn_owner_id=combatant_id,
         actor_id=combatant_id,
-        payload={"combatant_id": combatant_id, "roll": roll.model_dump()},
+        payload={"combatant_id": combatant_id, "roll": roll_payload(roll)},
     )
 
 
@@ -859,9 +1199,9 @@ def ev_death_save_result(
     successes: int,
     failures: int,
     outcome: str,
-) -> EventEnvelope:
+) -> EventRecord:
     # outcome: "success"|"fail"|"crit_success"|"crit_fail"|"stabilized"|"dead"|"revived"
-    return EventEnvelope(
+    return make_event(
         seq=seq,
         t=t,
         type="DeathSaveResult",
@@ -879,8 +1219,8 @@ def ev_death_save_result(
 
 def ev_stabilized(
     *, seq: int, t: int, round_: int, healer_id: str | None, target_id: str, reason: str
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="Stabilized",
@@ -893,8 +1233,8 @@ def ev_stabilized(
 
 def ev_died(
     *, seq: int, t: int, round_: int, target_id: str, reason: str
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="Died",
@@ -915,8 +1255,8 @@ def ev_healed(
     amount: int,
     hp_before: int,
     hp_after: int,
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="Healed",
@@ -941,8 +1281,8 @@ def ev_concentration_started(
     combatant_id: str,
     effect_name: str,
     source_id: str,
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="ConcentrationStarted",
@@ -965,8 +1305,8 @@ def ev_concentration_ended(
     combatant_id: str,
     effect_name: str | None,
     reason: str,
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="ConcentrationEnded",
@@ -992,8 +1332,8 @@ def ev_concentration_check_triggered(
     damage_type: str | None,
     cause: str,
     source_id: str | None,
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="ConcentrationCheckTriggered",
@@ -1012,9 +1352,16 @@ def ev_concentration_check_triggered(
 
 
 def ev_concentration_check_rolled(
-    *, seq: int, t: int, round_: int, combatant_id: str, dc: int, roll: Roll, bonus: int
-) -> EventEnvelope:
-    return EventEnvelope(
+    *,
+    seq: int,
+    t: int,
+    round_: int,
+    combatant_id: str,
+    dc: int,
+    roll: AnyRoll,
+    bonus: int,
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="ConcentrationCheckRolled",
@@ -1025,15 +1372,15 @@ def ev_concentration_check_rolled(
             "combatant_id": combatant_id,
             "dc": dc,
             "bonus": bonus,
-            "roll": roll.model_dump(),
+            "roll": roll_payload(roll),
         },
     )
 
 
 def ev_concentration_maintained(
     *, seq: int, t: int, round_: int, combatant_id: str, dc: int, total: int
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="ConcentrationMaintained",
@@ -1053,8 +1400,8 @@ def ev_concentration_broken(
     dc: int,
     total: int,
     reason: str,
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="ConcentrationBroken",
@@ -1080,8 +1427,8 @@ def ev_spell_cast_declared(
     spell_name: str,
     slot_level: int,
     target_ids: list[str],
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="SpellCastDeclared",
@@ -1106,8 +1453,8 @@ def ev_spell_slot_spent(
     slot_level: int,
     before: int,
     after: int,
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="SpellSlotSpent",
@@ -1136,8 +1483,8 @@ def ev_effect_applied(
     concentration_owner_id: str | None,
     concentration_effect_name: str | None,
     conditions: list[str],
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="EffectApplied",
@@ -1167,8 +1514,8 @@ def ev_effect_ended(
     target_id: str,
     reason: str,
     removed_conditions: list[str],
-) -> EventEnvelope:
-    return EventEnvelope(
+) -> EventRecord:
+    return make_event(
         seq=seq,
         t=t,
         type="EffectEnded",
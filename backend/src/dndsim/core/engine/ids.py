@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import hashlib
+from functools import lru_cache
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Iterator, Literal, Optional
+from uuid import UUID, uuid4, uuid5
+
+if TYPE_CHECKING:
+    from dndsim.core.engine.state import EncounterState
+
+# Как выдаются event_id / roll_id:
+#   uuid4         — случайные (по умолчанию, os.urandom на каждый id)
+#   monotonic     — (encounter, seq): старшие 64 бита — хэш id_scope, младшие — счётчик
+#   deterministic — uuid5 от (rng_seed, id_scope, seq): реплей с тем же seed даёт те же id
+IdStrategy = Literal["uuid4", "monotonic", "deterministic"]
+ID_STRATEGIES: tuple[str, ...] = ("uuid4", "monotonic", "deterministic")
+
+DNDSIM_ID_NAMESPACE = UUID("6f1c2a3e-5d0b-4c5e-9a7e-3b1f0d2c8e41")
+
+# старший бит младшей половины разделяет пространства событий и бросков
+_ROLL_BIT = 1 << 63
+_LOW_MASK = _ROLL_BIT - 1
+
+# state, для которого apply_command сейчас генерирует события
+_current_state: ContextVar[Optional["EncounterState"]] = ContextVar(
+    "dndsim_id_state", default=None
+)
+
+
+@contextmanager
+def bind_ids(state: "EncounterState") -> Iterator[None]:
+    """Пока активен, event_id/roll_id берутся по стратегии этого state."""
+    token = _current_state.set(state)
+    try:
+        yield
+    finally:
+        _current_state.reset(token)
+
+
+@lru_cache(maxsize=1024)
+def _scope_prefix(id_scope: str, rng_seed: int) -> int:
+    key = f"{id_scope}:{rng_seed}".encode()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big") << 64
+
+
+def _make_id(state: "EncounterState", kind: str, n: int) -> UUID:
+    if state.id_strategy == "monotonic":
+        low = n & _LOW_MASK
+        if kind == "r":
+            low |= _ROLL_BIT
+        return UUID(int=_scope_prefix(state.id_scope, state.rng_seed) | low)
+    return uuid5(DNDSIM_ID_NAMESPACE, f"{state.rng_seed}:{state.id_scope}:{kind}{n}")
+
+
+def new_event_id(seq: Optional[int] = None) -> UUID:
+    state = _current_state.get()
+    if state is None or state.id_strategy == "uuid4" or seq is None:
+        return uuid4()
+    return _make_id(state, "e", seq)
+
+
+def new_roll_id() -> UUID:
+    state = _current_state.get()
+    if state is None or state.id_strategy == "uuid4":
+        return uuid4()
+    state._roll_seq += 1
+    return _make_id(state, "r", state._roll_seq)
+
+
+def eager_event_id(seq: int) -> Optional[UUID]:
+    """
+    id, который нужно выдать прямо сейчас (пока state привязан), или None,
+    если стратегия uuid4 и id можно сгенерировать позже, при материализации.
+    """
+    state = _current_state.get()
+    if state is None or state.id_strategy == "uuid4":
+        return None
+    return _make_id(state, "e", seq)
+
+
+def eager_roll_id() -> Optional[UUID]:
+    """То же для roll_id: monotonic/deterministic берут номер броска сейчас, по порядку."""
+    state = _current_state.get()
+    if state is None or state.id_strategy == "uuid4":
+        return None
+    state._roll_seq += 1
+    return _make_id(state, "r", state._roll_seq)
@@ -1,15 +1,17 @@
 from __future__ import annotations
 
 import re
-from typing import List, Tuple, Literal, cast
+from dataclasses import asdict
+from typing import Any, Callable, List, Optional, Sequence, Tuple, Literal, cast
 
 from dndsim.core.engine.spells.registry import get_spell
 
 from dndsim.core.engine.spells.resolve import resolve_save_spell, resolve_attack_spell
 from dndsim.core.engine.spells.definitions import SaveSpell, AttackSpell
 
+from dndsim.core.engine.ids import bind_ids
 from dndsim.core.engine.rules.middleware import (
-    DEFAULT_ROLL_MIDDLEWARES,
+    DEFAULT_ROLL_PIPELINE,
     AttackRollContext,
     SaveRollContext,
     DamageRollContext,
@@ -20,11 +22,14 @@ from dndsim.core.engine.commands import (
     StartCombat,
     SetInitiative,
     RollInitiative,
+    RollAllInitiative,
     FinalizeInitiative,
     Attack,
     Multiattack,
     BeginTurn,
     EndTurn,
+    AdvanceTurn,
+    RunUntilDecision,
     Move,
     UseReaction,
     DeclineReaction,
@@ -40,12 +45,15 @@ from dndsim.core.engine.commands import (
 )
 
 from dndsim.core.engine.events import (
-    Roll,
-    RollMod,
+    EventRecord,
+    RollModRecord,
+    RollRecord,
     ev_command_rejected,
     ev_turn_started,
     ev_turn_resources_reset,
     ev_turn_ended,
+    ev_turn_skipped,
+    ev_decision_required,
     ev_disengage_applied,
     ev_movement_started,
     ev_moved_step,
@@ -65,6 +73,7 @@ from dndsim.core.engine.events import (
     ev_initiative_rolled,
     ev_initiative_order_finalized,
     ev_round_started,
+    ev_combat_ended,
     ev_save_effect_declared,
     ev_saving_throw_rolled,
     ev_saving_throw_succeeded,
@@ -94,9 +103,12 @@ from dndsim.core.engine.state import (
     ReactionWindow,
     Pos,
     effective_speed_ft,
+    can_act,
     are_hostile,
     CombatantState,
     EffectRef,
+    TIMING_TURN_START,
+    TIMING_TURN_END,
 )
 
 from dndsim.core.engine.commands import ApplyCondition, RemoveCondition
@@ -129,15 +141,101 @@ def _end_effects_by_concentration(
     concentration_owner_id: str,
     concentration_effect_name: str,
     reason: str,
-) -> list[dict]:
-    evs: list[dict] = []
+) -> list[EventRecord]:
     to_end = [
         ef
-        for ef in state.effects.values()
-        if ef.concentration_owner_id == concentration_owner_id
-        and ef.concentration_effect_name == concentration_effect_name
+        for ef in state.effects.by_concentration_owner(concentration_owner_id)
+        if ef.concentration_effect_name == concentration_effect_name
     ]
+    return _end_effects(state, to_end, reason=reason)
 
+
+def _expire_due_effects(
+    state: EncounterState, owner_id: str, timing: int
+) -> list[EventRecord]:
+    """
+    Срабатывание таймеров duration_rounds на границе хода owner_id.
+    Стоимость — O(истекающих эффектов), а не O(всех эффектов).
+    Если истёк последний эффект концентрации — концентрация тоже заканчивается.
+    """
+    if not state.effect_timers:
+        return []
+    if owner_id == state.turn_owner_id:
+        owner_idx = state.turn_position()
+    else:
+        try:
+            owner_idx = state.initiative_order.index(owner_id)
+        except ValueError:
+            owner_idx = 0
+    due = state.pop_due_effects(owner_idx, timing)
+    if not due:
+        return []
+
+    evs = _end_effects(state, due, reason="expired")
+
+    for conc_owner_id, conc_name in {
+        (ef.concentration_owner_id, ef.concentration_effect_name)
+        for ef in due
+        if ef.concentration_owner_id is not None
+    }:
+        if any(
+            ef.concentration_effect_name == conc_name
+            for ef in state.effects.by_concentration_owner(conc_owner_id)
+        ):
+            continue
+        owner = state.combatants.get(conc_owner_id)
+        conc = getattr(owner, "concentration", None)
+        if owner is None or conc is None or conc.effect_name != conc_name:
+            continue
+        owner.concentration = None
+        seq, t = _bump(state)
+        evs.append(
+            ev_concentration_ended(
+                seq=seq,
+                t=t,
+                round_=state.round,
+                combatant_id=owner.id,
+                effect_name=conc_name,
+                reason="expired",
+            )
+        )
+    return evs
+
+
+def _advance_turn_owner(state: EncounterState) -> list[EventRecord]:
+    """
+    Передаёт ход следующему по initiative_order, кто может ходить
+    (см. state.turn_skip_reason); за каждого пропущенного — TurnSkipped.
+    Переход через конец списка — новый раунд. Не больше одного круга.
+    """
+    order = state.initiative_order
+    n = len(order)
+    idx = state.turn_position()
+    evs: list[EventRecord] = []
+    for _ in range(n):
+        idx += 1
+        if idx >= n:
+            idx = 0
+            state.round += 1
+        reason = state.turn_skip_reason(order[idx])
+        if reason is None:
+            break
+        seq, t = _bump(state)
+        evs.append(
+            ev_turn_skipped(
+                seq=seq, t=t, round_=state.round, combatant_id=order[idx], reason=reason
+            )
+        )
+    state.turn_index = idx
+    state.turn_owner_id = order[idx]
+    return evs
+
+
+def _end_effects(
+    state: EncounterState, to_end: Sequence[Any], *, reason: str
+) -> list[EventRecord]:
+    """Снимает эффекты: conditions с целей, запись из state.effects, EffectEnded."""
+    evs: list[EventRecord] = []
     for ef in to_end:
         target = state.combatants.get(ef.target_id)
         removed: list[str] = []
@@ -157,7 +255,7 @@ def _end_effects_by_concentration(
                             target_id=target.id,
                             condition=cond,
                             reason=f"effect_end:{ef.name}",
-                        ).model_dump()
+                        )
                     )
 
         # удаляем эффект
@@ -175,7 +273,7 @@ def _end_effects_by_concentration(
                 target_id=ef.target_id,
                 reason=reason,
                 removed_conditions=removed,
-            ).model_dump()
+            )
         )
 
     return evs
@@ -207,16 +305,16 @@ def _roll_d20(
     state: EncounterState,
     bonus: int,
     adv_state: AdvState,
-) -> Roll:
+) -> RollRecord:
     if adv_state == "normal":
         nat = state.rng.randint(1, 20)
         total = nat + bonus
-        return Roll(
+        return RollRecord(
             kind="d20",
             formula=f"1d20+{bonus}",
             dice=[nat],
             kept=[nat],
-            mods=[RollMod(name="to_hit_bonus", value=bonus)],
+            mods=[RollModRecord("to_hit_bonus", bonus)],
             total=total,
             nat=nat,
             is_critical=(nat == 20),
@@ -228,12 +326,12 @@ def _roll_d20(
     kept = max(a, b) if adv_state == "advantage" else min(a, b)
     total = kept + bonus
 
-    return Roll(
+    return RollRecord(
         kind="d20",
         formula=f"2d20+{bonus} ({adv_state})",
         dice=[a, b],
         kept=[kept],
-        mods=[RollMod(name="to_hit_bonus", value=bonus)],
+        mods=[RollModRecord("to_hit_bonus", bonus)],
         total=total,
         nat=kept,
         is_critical=(kept == 20),
@@ -249,13 +347,13 @@ def _maybe_run_concentration_check(
     damage_type: str | None,
     cause: str,  # "attack" | "effect"
     source_id: str | None,
-) -> list[dict]:
+) -> list[EventRecord]:
     """
     Если target.concentration есть и он получил урон > 0:
       - если стал unconscious (hp==0) -> концентрация ломается без сейва (incapacitated)
       - иначе: CON save DC=max(10, dmg//2)
     """
-    evs: list[dict] = []
+    evs: list[EventRecord] = []
     if target.concentration is None:
         return evs
     if damage_taken <= 0:
@@ -278,7 +376,7 @@ def _maybe_run_concentration_check(
                 dc=0,
                 total=0,
                 reason="incapacitated",
-            ).model_dump()
+            )
         )
 
         seq, t = _bump(state)
@@ -290,7 +388,7 @@ def _maybe_run_concentration_check(
                 combatant_id=target.id,
                 effect_name=effect_name,
                 reason="incapacitated",
-            ).model_dump()
+            )
         )
         return evs
 
@@ -308,7 +406,7 @@ def _maybe_run_concentration_check(
             damage_type=damage_type,
             cause=cause,
             source_id=source_id,
-        ).model_dump()
+        )
     )
 
     bonus = int(target.save_bonuses.get("con", 0))
@@ -324,7 +422,7 @@ def _maybe_run_concentration_check(
             dc=dc,
             roll=roll,
             bonus=bonus,
-        ).model_dump()
+        )
     )
 
     if roll.total >= dc:
@@ -337,7 +435,7 @@ def _maybe_run_concentration_check(
                 combatant_id=target.id,
                 dc=dc,
                 total=roll.total,
-            ).model_dump()
+            )
         )
         return evs
 
@@ -355,7 +453,7 @@ def _maybe_run_concentration_check(
             dc=dc,
             total=roll.total,
             reason="failed_save",
-        ).model_dump()
+        )
     )
 
     seq, t = _bump(state)
@@ -367,7 +465,7 @@ def _maybe_run_concentration_check(
             combatant_id=target.id,
             effect_name=effect_name,
             reason="failed_save",
-        ).model_dump()
+        )
     )
     return evs
 
@@ -379,8 +477,11 @@ def _before_attack_roll(
     target: CombatantState,
     attack_name: str,
     source: str,  # "weapon"|"spell"
-    roll: Roll,
-) -> Roll:
+    roll: RollRecord,
+) -> RollRecord:
+    active = DEFAULT_ROLL_PIPELINE.active(state, attacker, "attack")
+    if not active:
+        return roll
     ctx = AttackRollContext(
         attacker_id=attacker.id,
         target_id=target.id,
@@ -388,7 +489,7 @@ def _before_attack_roll(
         source=cast(Literal["weapon", "spell"], source),
     )
     mods = []
-    for mw in DEFAULT_ROLL_MIDDLEWARES:
+    for mw in active:
         mods.extend(mw.before_attack_roll(state, attacker, target, ctx, roll))
     return apply_roll_mods(roll, mods)
 
@@ -400,8 +501,11 @@ def _before_save_roll(
     save_ability: str,
     source_id: str | None,
     effect_name: str,
-    roll: Roll,
-) -> Roll:
+    roll: RollRecord,
+) -> RollRecord:
+    active = DEFAULT_ROLL_PIPELINE.active(state, roller, "save")
+    if not active:
+        return roll
     ctx = SaveRollContext(
         roller_id=roller.id,
         save_ability=save_ability,
@@ -409,7 +513,7 @@ def _before_save_roll(
         effect_name=effect_name,
     )
     mods = []
-    for mw in DEFAULT_ROLL_MIDDLEWARES:
+    for mw in active:
         mods.extend(mw.before_save_roll(state, roller, ctx, roll))
     return apply_roll_mods(roll, mods)
 
@@ -421,8 +525,11 @@ def _before_damage_roll(
     target: CombatantState,
     damage_type: str,
     source_kind: str,  # "weapon"|"spell"|"effect"
-    roll: Roll,
-) -> Roll:
+    roll: RollRecord,
+) -> RollRecord:
+    active = DEFAULT_ROLL_PIPELINE.active(state, source, "damage")
+    if not active:
+        return roll
     ctx = DamageRollContext(
         source_id=source.id,
         target_id=target.id,
@@ -430,7 +537,7 @@ def _before_damage_roll(
         source=cast(Literal["weapon", "spell", "effect"], source_kind),
     )
     mods = []
-    for mw in DEFAULT_ROLL_MIDDLEWARES:
+    for mw in active:
         mods.extend(mw.before_damage_roll(state, source, target, ctx, roll))
     return apply_roll_mods(roll, mods)
 
@@ -439,17 +546,17 @@ def _roll_save(
     state: EncounterState,
     bonus: int,
     adv_state: Literal["normal", "advantage", "disadvantage"],
-) -> Roll:
+) -> RollRecord:
     # как d20, но мод называется "save_bonus"
     if adv_state == "normal":
         nat = state.rng.randint(1, 20)
         total = nat + bonus
-        return Roll(
+        return RollRecord(
             kind="d20",
             formula=f"1d20+{bonus} (save)",
             dice=[nat],
             kept=[nat],
-            mods=[RollMod(name="save_bonus", value=bonus)],
+            mods=[RollModRecord("save_bonus", bonus)],
             total=total,
             nat=nat,
             is_critical=False,
@@ -460,12 +567,12 @@ def _roll_save(
     b = state.rng.randint(1, 20)
     kept = max(a, b) if adv_state == "advantage" else min(a, b)
     total = kept + bonus
-    return Roll(
+    return RollRecord(
         kind="d20",
         formula=f"2d20+{bonus} ({adv_state} save)",
         dice=[a, b],
         kept=[kept],
-        mods=[RollMod(name="save_bonus", value=bonus)],
+        mods=[RollModRecord("save_bonus", bonus)],
         total=total,
         nat=kept,
         is_critical=False,
@@ -508,7 +615,7 @@ def _adjust_damage_for_target(
     return raw, None
 
 
-def _roll_damage(state: EncounterState, formula: str, crit: bool) -> Roll:
+def _roll_damage(state: EncounterState, formula: str, crit: bool) -> RollRecord:
     n, d, k = _parse_dice(formula)
     dice_count = n * 2 if crit else n
     rolls = [state.rng.randint(1, d) for _ in range(dice_count)]
@@ -516,9 +623,9 @@ def _roll_damage(state: EncounterState, formula: str, crit: bool) -> Roll:
 
     mods = []
     if k != 0:
-        mods.append(RollMod(name="flat_mod", value=k))
+        mods.append(RollModRecord("flat_mod", k))
 
-    return Roll(
+    return RollRecord(
         kind="damage",
         formula=formula + (" (CRIT x2 dice)" if crit else ""),
         dice=rolls,
@@ -581,8 +688,8 @@ def _resolve_attack(
     economy: Economy,
     spend_action: bool,
     spend_reaction: bool,
-) -> List[dict]:
-    events: List[dict] = []
+) -> List[EventRecord]:
+    events: List[EventRecord] = []
     attacker = state.combatants[attacker_id]
     target = state.combatants[target_id]
     profile = attacker.attacks[attack_name]
@@ -627,7 +734,7 @@ def _resolve_attack(
             attack_kind=attack_kind,
             context=context,
             economy=economy,
-        ).model_dump()
+        )
     )
 
     atk_roll = _roll_d20(state, profile.to_hit_bonus, adv_state=final_adv)
@@ -652,7 +759,7 @@ def _resolve_attack(
             roll=atk_roll,
             to_hit_bonus=profile.to_hit_bonus,
             target_ac=target.ac,
-        ).model_dump()
+        )
     )
 
     # auto miss on nat1
@@ -668,7 +775,7 @@ def _resolve_attack(
                 attacker_id=attacker_id,
                 target_id=target_id,
                 margin=margin,
-            ).model_dump()
+            )
         )
         return events
 
@@ -693,7 +800,7 @@ def _resolve_attack(
                 attacker_id=attacker_id,
                 target_id=target_id,
                 margin=margin,
-            ).model_dump()
+            )
         )
         return events
 
@@ -708,7 +815,7 @@ def _resolve_attack(
             target_id=target_id,
             is_critical=atk_roll.is_critical,
             margin=margin,
-        ).model_dump()
+        )
     )
 
     dmg_roll = _roll_damage(state, profile.damage_formula, crit=final_crit)
@@ -731,13 +838,14 @@ def _resolve_attack(
             target_id=target_id,
             roll=dmg_roll,
             damage_type=profile.damage_type,
-        ).model_dump()
+        )
     )
 
     raw = dmg_roll.total
     adjusted, mod = _adjust_damage_for_target(target, raw, profile.damage_type)
 
     temp_before, hp_before, hp_after = _apply_damage_with_temp_hp(target, adjusted)
+    state.note_vitals(target)
 
     if hp_after == 0 and "unconscious" not in target.conditions:
         target.conditions.add("unconscious")
@@ -762,7 +870,7 @@ def _resolve_attack(
                 target_id=target.id,
                 condition="unconscious",
                 reason="hp_0",
-            ).model_dump()
+            )
         )
 
         seq, t = _bump(state)
@@ -774,7 +882,7 @@ def _resolve_attack(
                 target_id=target.id,
                 became_unconscious=True,
                 reason="hp_0",
-            ).model_dump()
+            )
         )
 
     seq, t = _bump(state)
@@ -791,7 +899,7 @@ def _resolve_attack(
             damage_type=profile.damage_type,
             hp_before=hp_before,
             hp_after=hp_after,
-        ).model_dump()
+        )
     )
     events[-1]["payload"]["modifier"] = mod
     events[-1]["payload"]["is_critical"] = final_crit  # <-- вместо параметра
@@ -822,8 +930,8 @@ def _resolve_spell_attack(
     damage_type: str,
     attack_kind: Literal["melee", "ranged"],
     economy: Economy,
-) -> list[dict]:
-    events: list[dict] = []
+) -> list[EventRecord]:
+    events: list[EventRecord] = []
     turn_owner = state.turn_owner_id or caster_id
     target = state.combatants[target_id]
 
@@ -841,7 +949,7 @@ def _resolve_spell_attack(
             attack_kind=attack_kind,
             context="action",
             economy=economy,
-        ).model_dump()
+        )
     )
 
     atk_roll = _roll_d20(state, to_hit_bonus, adv_state="normal")
@@ -858,7 +966,7 @@ def _resolve_spell_attack(
             roll=atk_roll,
             to_hit_bonus=to_hit_bonus,
             target_ac=target.ac,
-        ).model_dump()
+        )
     )
 
     # auto miss nat1
@@ -874,7 +982,7 @@ def _resolve_spell_attack(
                 attacker_id=caster_id,
                 target_id=target_id,
                 margin=margin,
-            ).model_dump()
+            )
         )
         return events
 
@@ -892,7 +1000,7 @@ def _resolve_spell_attack(
                 attacker_id=caster_id,
                 target_id=target_id,
                 margin=margin,
-            ).model_dump()
+            )
         )
         return events
 
@@ -910,7 +1018,7 @@ def _resolve_spell_attack(
             target_id=target_id,
             is_critical=final_crit,
             margin=margin,
-        ).model_dump()
+        )
     )
 
     dmg_roll = _roll_damage(state, damage_formula, crit=final_crit)
@@ -925,13 +1033,14 @@ def _resolve_spell_attack(
             target_id=target_id,
             roll=dmg_roll,
             damage_type=damage_type,
-        ).model_dump()
+        )
     )
 
     raw = int(dmg_roll.total)
     adjusted, mod = _adjust_damage_for_target(target, raw, damage_type)
 
     temp_before, hp_before, hp_after = _apply_damage_with_temp_hp(target, adjusted)
+    state.note_vitals(target)
 
     # unconscious
     if hp_after == 0 and "unconscious" not in target.conditions:
@@ -954,7 +1063,7 @@ def _resolve_spell_attack(
                 target_id=target.id,
                 condition="unconscious",
                 reason="hp_0",
-            ).model_dump()
+            )
         )
 
         seq, t = _bump(state)
@@ -966,7 +1075,7 @@ def _resolve_spell_attack(
                 target_id=target.id,
                 became_unconscious=True,
                 reason="hp_0",
-            ).model_dump()
+            )
         )
 
     # damage applied
@@ -984,7 +1093,7 @@ def _resolve_spell_attack(
             damage_type=damage_type,
             hp_before=hp_before,
             hp_after=hp_after,
-        ).model_dump()
+        )
     )
     events[-1]["payload"]["modifier"] = mod
     events[-1]["payload"]["is_critical"] = final_crit
@@ -1006,11 +1115,64 @@ def _resolve_spell_attack(
 
 def apply_command(
     state: EncounterState, cmd: Command
-) -> Tuple[EncounterState, List[dict]]:
+) -> Tuple[EncounterState, List[EventRecord]]:
     """
-    Возвращаем (state, events_as_dicts).
+    Возвращаем (state, events). События — EventRecord: читаются как dict,
+    в обычные dict'ы их превращает materialize_events() на границе (API/БД).
     При ошибке валидации возвращаем CommandRejected и НЕ меняем state.
+    event_id/roll_id выдаются по state.id_strategy.
+    """
+    with bind_ids(state):
+        return _apply_checked(state, cmd)
+
+
+def _apply_checked(
+    state: EncounterState, cmd: Command
+) -> Tuple[EncounterState, List[EventRecord]]:
+    """_apply_command + проверка конца боя (один шаг для apply_command и автопрогона)."""
+    state, events = _apply_command(state, cmd)
+    if (
+        state.combat_started
+        and state.initiative_finalized
+        and state.phase != "finished"
+    ):
+        events.extend(_check_combat_end(state))
+    return state, events
+
+
+def _check_combat_end(state: EncounterState) -> List[EventRecord]:
     """
+    O(число сторон): бой окончен, когда на ногах осталось не больше одной стороны.
+    Счётчики сторон ведёт state.note_vitals(), пересчитывать комбатантов не нужно.
+    """
+    sides = state.side_stats()
+    if len(sides) < 2:
+        return []
+    standing = state.standing_sides()
+    if len(standing) > 1:
+        return []
+
+    state.phase = "finished"
+    state.reaction_window = None
+    winner = standing[0] if standing else None
+
+    seq, t = _bump(state)
+    return [
+        ev_combat_ended(
+            seq=seq,
+            t=t,
+            round_=state.round,
+            turn_owner_id=state.turn_owner_id,
+            winner_side=winner,
+            reason="side_defeated" if winner is not None else "mutual_defeat",
+            sides={k: asdict(st) for k, st in sides.items()},
+        )
+    ]
+
+
+def _apply_command(
+    state: EncounterState, cmd: Command
+) -> Tuple[EncounterState, List[EventRecord]]:
     vr = validate_command(state, cmd)
     if not vr.ok:
         e = vr.errors[0]
@@ -1028,10 +1190,10 @@ def apply_command(
             code=e.code,
             message=e.message,
             meta=e.meta,
-        ).model_dump()
+        )
         return state, [rej]
 
-    events: List[dict] = []
+    events: List[EventRecord] = []
 
     if isinstance(cmd, StartCombat):
         state.combat_started = True
@@ -1043,7 +1205,7 @@ def apply_command(
         state.phase = "setup_initiative"
 
         seq, t = _bump(state)
-        events.append(ev_combat_started(seq=seq, t=t, round_=state.round).model_dump())
+        events.append(ev_combat_started(seq=seq, t=t, round_=state.round))
         return state, events
 
     if isinstance(cmd, SetInitiative):
@@ -1057,7 +1219,7 @@ def apply_command(
                 round_=state.round,
                 combatant_id=cmd.combatant_id,
                 initiative=int(cmd.initiative),
-            ).model_dump()
+            )
         )
         return state, events
 
@@ -1075,10 +1237,66 @@ def apply_command(
                 combatant_id=cmd.combatant_id,
                 roll=roll,
                 bonus=cmd.bonus,
-            ).model_dump()
+            )
         )
         return state, events
 
+    if isinstance(cmd, RollAllInitiative):
+        # группы: одинаковые NPC бросают один раз, остальные — каждый сам
+        groups: dict[Any, list[CombatantState]] = {}
+        for c in state.combatants.values():
+            if cmd.only_missing and c.id in state.initiatives:
+                continue
+            key: Any = c.id
+            if cmd.group_identical and not c.is_player_character:
+                key = ("group", c.side, c.name)
+            groups.setdefault(key, []).append(c)
+
+        for members in groups.values():
+            lead = members[0]
+            if lead.id in cmd.bonuses:
+                bonus = cmd.bonuses[lead.id]
+            elif lead.side is not None and lead.side in cmd.side_bonuses:
+                bonus = cmd.side_bonuses[lead.side]
+            else:
+                bonus = lead.initiative_bonus
+            roll = _roll_d20(state, bonus=bonus, adv_state="normal")
+            state.initiatives[lead.id] = roll.total
+
+            seq, t = _bump(state)
+            events.append(
+                ev_initiative_rolled(
+                    seq=seq,
+                    t=t,
+                    round_=state.round,
+                    combatant_id=lead.id,
+                    roll=roll,
+                    bonus=bonus,
+                )
+            )
+            for c in members[1:]:
+                state.initiatives[c.id] = roll.total
+                seq, t = _bump(state)
+                events.append(
+                    ev_initiative_set(
+                        seq=seq,
+                        t=t,
+                        round_=state.round,
+                        combatant_id=c.id,
+                        initiative=roll.total,
+                    )
+                )
+
+        if cmd.finalize:
+            state, evs = _apply_command(state, FinalizeInitiative())
+            events.extend(evs)
+        return state, events
+
+    if isinstance(cmd, RunUntilDecision):
+        state, evs, _reason = _run_until_decision(state, None, cmd.max_steps)
+        events.extend(evs)
+        return state, events
+
     if isinstance(cmd, FinalizeInitiative):
         # детерминированная сортировка: initiative desc, tie-breaker по combatant_id
         items = sorted(
@@ -1087,6 +1305,7 @@ def apply_command(
         )
         state.initiative_order = [cid for cid, _ in items]
         state.turn_owner_id = state.initiative_order[0]
+        state.turn_index = 0
         state.initiative_finalized = True
         state.phase = "idle"
         state.round = 1
@@ -1098,14 +1317,14 @@ def apply_command(
                 t=t,
                 round_=state.round,
                 order=[{"combatant_id": cid, "initiative": ini} for cid, ini in items],
-            ).model_dump()
+            )
         )
 
         seq, t = _bump(state)
         events.append(
             ev_round_started(
                 seq=seq, t=t, round_=state.round, turn_owner_id=state.turn_owner_id
-            ).model_dump()
+            )
         )
 
         return state, events
@@ -1130,7 +1349,7 @@ def apply_command(
                     target_id=cmd.target_id,
                     condition=cmd.condition,
                     reason="effect",
-                ).model_dump()
+                )
             )
         return state, events
 
@@ -1150,7 +1369,7 @@ def apply_command(
                     target_id=cmd.target_id,
                     condition=cmd.condition,
                     reason="effect",
-                ).model_dump()
+                )
             )
         return state, events
 
@@ -1171,7 +1390,7 @@ def apply_command(
                     combatant_id=c.id,
                     effect_name=prev,
                     reason="replaced",
-                ).model_dump()
+                )
             )
 
         c.concentration = EffectRef(
@@ -1187,7 +1406,7 @@ def apply_command(
                 combatant_id=c.id,
                 effect_name=cmd.effect_name,
                 source_id=source_id,
-            ).model_dump()
+            )
         )
         return state, events
 
@@ -1205,7 +1424,7 @@ def apply_command(
                 combatant_id=c.id,
                 effect_name=prev,
                 reason=cmd.reason,
-            ).model_dump()
+            )
         )
 
         if prev:
@@ -1251,7 +1470,7 @@ def apply_command(
                 damage_type=cmd.damage_type,
                 damage_formula=cmd.damage_formula,
                 economy=cmd.economy,
-            ).model_dump()
+            )
         )
 
         for tid in cmd.target_ids:
@@ -1283,7 +1502,7 @@ def apply_command(
                     save_ability=cmd.save_ability,
                     dc=cmd.dc,
                     bonus=bonus,
-                ).model_dump()
+                )
             )
 
             success = save_roll.total >= cmd.dc
@@ -1302,7 +1521,7 @@ def apply_command(
                         target_id=tid,
                         effect_name=cmd.effect_name,
                         margin=margin,
-                    ).model_dump()
+                    )
                 )
 
                 if cmd.on_success == "none":
@@ -1317,7 +1536,7 @@ def apply_command(
                             source_id=cmd.source_id,
                             target_id=tid,
                             effect_name=cmd.effect_name,
-                        ).model_dump()
+                        )
                     )
                     continue
             else:
@@ -1333,7 +1552,7 @@ def apply_command(
                         target_id=tid,
                         effect_name=cmd.effect_name,
                         margin=margin,
-                    ).model_dump()
+                    )
                 )
 
             # Урон бросаем (и логируем) независимо от успеха/провала (кроме on_success="none")
@@ -1360,7 +1579,7 @@ def apply_command(
                     effect_name=cmd.effect_name,
                     roll=dmg_roll,
                     damage_type=cmd.damage_type,
-                ).model_dump()
+                )
             )
 
             raw = int(dmg_roll.total)
@@ -1381,6 +1600,7 @@ def apply_command(
             temp_before, hp_before, hp_after = _apply_damage_with_temp_hp(
                 target, adjusted_final
             )
+            state.note_vitals(target)
 
             seq, t = _bump(state)
             events.append(
@@ -1398,7 +1618,7 @@ def apply_command(
                     damage_type=cmd.damage_type,
                     hp_before=hp_before,
                     hp_after=hp_after,
-                ).model_dump()
+                )
             )
 
             # доп. поля (если фабрика не поддерживает их параметрами)
@@ -1445,7 +1665,7 @@ def apply_command(
                         target_id=target.id,
                         condition="unconscious",
                         reason="hp_0",
-                    ).model_dump()
+                    )
                 )
 
                 seq, t = _bump(state)
@@ -1457,7 +1677,7 @@ def apply_command(
                         target_id=target.id,
                         became_unconscious=True,
                         reason="hp_0",
-                    ).model_dump()
+                    )
                 )
 
         return state, events
@@ -1466,18 +1686,22 @@ def apply_command(
         c = state.combatants[cmd.combatant_id]
         state.phase = "in_turn"
 
+        # эффекты, истекающие в начале этого хода (до сброса ресурсов: speed зависит от conditions)
+        events.extend(_expire_due_effects(state, c.id, TIMING_TURN_START))
+
         # если PC на 0 hp, не stable и не dead — в этот ход нужен death save
-        if (
+        c.death_save_pending = (
             c.is_player_character
             and c.hp_current == 0
             and (not c.is_dead)
             and (not c.is_stable)
-        ):
+        )
+        if c.death_save_pending:
             seq, t = _bump(state)
             events.append(
                 ev_death_save_required(
                     seq=seq, t=t, round_=state.round, combatant_id=c.id
-                ).model_dump()
+                )
             )
 
         c.action_available = True
@@ -1493,7 +1717,7 @@ def apply_command(
         events.append(
             ev_turn_started(
                 seq=seq, t=t, round_=state.round, turn_owner_id=cmd.combatant_id
-            ).model_dump()
+            )
         )
 
         seq, t = _bump(state)
@@ -1507,7 +1731,7 @@ def apply_command(
                 bonus=c.bonus_available,
                 reaction=c.reaction_available,
                 movement_ft=c.movement_remaining_ft,
-            ).model_dump()
+            )
         )
 
         return state, events
@@ -1525,7 +1749,7 @@ def apply_command(
                 round_=state.round,
                 turn_owner_id=state.turn_owner_id or cmd.combatant_id,
                 combatant_id=cmd.combatant_id,
-            ).model_dump()
+            )
         )
         return state, events
 
@@ -1556,7 +1780,7 @@ def apply_command(
                 spell_name=cmd.spell_name,
                 slot_level=cmd.slot_level,
                 target_ids=cmd.target_ids,
-            ).model_dump()
+            )
         )
 
         # тратим слот (если не cantrip)
@@ -1575,7 +1799,7 @@ def apply_command(
                     slot_level=cmd.slot_level,
                     before=before,
                     after=after,
-                ).model_dump()
+                )
             )
 
         # концентрация (если нужно)
@@ -1594,7 +1818,7 @@ def apply_command(
                         combatant_id=caster.id,
                         effect_name=prev_effect_name,
                         reason="replaced",
-                    ).model_dump()
+                    )
                 )
 
                 # ✅ NEW: снять все эффекты, которые привязаны к этой концентрации
@@ -1623,7 +1847,7 @@ def apply_command(
                     combatant_id=caster.id,
                     effect_name=spell.name,
                     source_id=caster.id,
-                ).model_dump()
+                )
             )
 
         # --- резолв спелла (вынесено) ---
@@ -1750,7 +1974,7 @@ def apply_command(
                 target_id=target_id,
                 multiattack_name=cmd.multiattack_name,
                 attacks=ma.attacks,
-            ).model_dump()
+            )
         )
 
         # Каждая атака внутри multiattack — отдельный набор событий атаки
@@ -1786,7 +2010,7 @@ def apply_command(
                 mover_id=cmd.mover_id,
                 from_pos=mover.position,
                 path=cmd.path,
-            ).model_dump()
+            )
         )
 
         cur = mover.position
@@ -1837,7 +2061,7 @@ def apply_command(
                                 mover_id=mover.id,
                                 threatened_by_id=enemy.id,
                                 reach_ft=reach,
-                            ).model_dump()
+                            )
                         )
 
                         seq, t = _bump(state)
@@ -1855,7 +2079,7 @@ def apply_command(
                                     "threatened_by_id": enemy.id,
                                     "reach_ft": reach,
                                 },
-                            ).model_dump()
+                            )
                         )
 
                         seq, t = _bump(state)
@@ -1867,7 +2091,7 @@ def apply_command(
                                 turn_owner_id=turn_owner,
                                 mover_id=mover.id,
                                 reason="reaction_window",
-                            ).model_dump()
+                            )
                         )
 
                         return state, events
@@ -1887,7 +2111,7 @@ def apply_command(
                     from_pos=cur,
                     to_pos=nxt,
                     cost_ft=step_cost,
-                ).model_dump()
+                )
             )
 
             cur = nxt
@@ -1901,7 +2125,7 @@ def apply_command(
                 turn_owner_id=turn_owner,
                 mover_id=mover.id,
                 reason="command_end",
-            ).model_dump()
+            )
         )
 
         return state, events
@@ -1943,7 +2167,7 @@ def apply_command(
                 turn_owner_id=state.turn_owner_id or reactor_id,
                 window_id=window_id,
                 closed_by="reaction_used",
-            ).model_dump()
+            )
         )
 
         return state, events
@@ -1965,16 +2189,17 @@ def apply_command(
                 turn_owner_id=state.turn_owner_id or cmd.reactor_id,
                 window_id=window_id,
                 closed_by="declined",
-            ).model_dump()
+            )
         )
 
         return state, events
 
     if isinstance(cmd, RollDeathSave):
         c = state.combatants[cmd.combatant_id]
+        c.death_save_pending = False
 
         nat = state.rng.randint(1, 20)
-        roll = Roll(
+        roll = RollRecord(
             kind="d20",
             formula="1d20 (death save)",
             dice=[nat],
@@ -1990,13 +2215,14 @@ def apply_command(
         events.append(
             ev_death_save_rolled(
                 seq=seq, t=t, round_=state.round, combatant_id=c.id, roll=roll
-            ).model_dump()
+            )
         )
 
         # nat 20: приходит в сознание с 1 HP
         if nat == 20:
             hp_before = c.hp_current
             c.hp_current = 1
+            state.note_vitals(c)
             c.death_save_successes = 0
             c.death_save_failures = 0
             c.is_stable = False
@@ -2014,7 +2240,7 @@ def apply_command(
                     successes=c.death_save_successes,
                     failures=c.death_save_failures,
                     outcome="revived",
-                ).model_dump()
+                )
             )
             return state, events
 
@@ -2032,6 +2258,7 @@ def apply_command(
         # dead?
         if c.death_save_failures >= 3:
             c.is_dead = True
+            state.note_vitals(c)
             outcome2 = "dead"
             seq, t = _bump(state)
             events.append(
@@ -2043,7 +2270,7 @@ def apply_command(
                     successes=c.death_save_successes,
                     failures=c.death_save_failures,
                     outcome=outcome,
-                ).model_dump()
+                )
             )
             seq, t = _bump(state)
             events.append(
@@ -2053,13 +2280,14 @@ def apply_command(
                     round_=state.round,
                     target_id=c.id,
                     reason="death_saves",
-                ).model_dump()
+                )
             )
             return state, events
 
         # stabilized?
         if c.death_save_successes >= 3:
             c.is_stable = True
+            state.note_vitals(c)
             c.death_save_successes = 0
             c.death_save_failures = 0
 
@@ -2073,7 +2301,7 @@ def apply_command(
                     successes=3,
                     failures=0,
                     outcome="stabilized",
-                ).model_dump()
+                )
             )
             seq, t = _bump(state)
             events.append(
@@ -2084,7 +2312,7 @@ def apply_command(
                     healer_id=None,
                     target_id=c.id,
                     reason="death_saves",
-                ).model_dump()
+                )
             )
             return state, events
 
@@ -2098,7 +2326,7 @@ def apply_command(
                 successes=c.death_save_successes,
                 failures=c.death_save_failures,
                 outcome=outcome,
-            ).model_dump()
+            )
         )
         return state, events
 
@@ -2109,6 +2337,7 @@ def apply_command(
         healer.action_available = False
 
         target.is_stable = True
+        state.note_vitals(target)
         target.death_save_successes = 0
         target.death_save_failures = 0
 
@@ -2121,7 +2350,7 @@ def apply_command(
                 healer_id=cmd.healer_id,
                 target_id=cmd.target_id,
                 reason="stabilize_action",
-            ).model_dump()
+            )
         )
         return state, events
 
@@ -2135,6 +2364,7 @@ def apply_command(
         hp_before = target.hp_current
         target.hp_current = min(target.hp_max, target.hp_current + max(0, cmd.amount))
         hp_after = target.hp_current
+        state.note_vitals(target)
 
         # если подняли выше 0 — снимаем dying-статус
         if hp_after > 0:
@@ -2155,7 +2385,7 @@ def apply_command(
                 amount=cmd.amount,
                 hp_before=hp_before,
                 hp_after=hp_after,
-            ).model_dump()
+            )
         )
         return state, events
 
@@ -2166,23 +2396,49 @@ def apply_command(
         c.has_taken_first_turn = True
         c.no_opportunity_attacks_until_turn_end = False
 
+        events.extend(_expire_due_effects(state, owner, TIMING_TURN_END))
+
         seq, t = _bump(state)
         events.append(
-            ev_turn_ended(
-                seq=seq, t=t, round_=state.round, turn_owner_id=owner
-            ).model_dump()
+            ev_turn_ended(seq=seq, t=t, round_=state.round, turn_owner_id=owner)
         )
 
         state.phase = "idle"
 
         if state.initiative_order:
-            idx = state.initiative_order.index(owner)
-            next_idx = idx + 1
-            if next_idx >= len(state.initiative_order):
-                state.round += 1
-                next_idx = 0
-            state.turn_owner_id = state.initiative_order[next_idx]
+            events.extend(_advance_turn_owner(state))
+
+        return state, events
+
+    if isinstance(cmd, AdvanceTurn):
+        owner = cast(str, state.turn_owner_id)
+        if state.phase == "in_turn":
+            state, evs = _apply_command(state, EndTurn(combatant_id=owner))
+            events.extend(evs)
+            if evs and evs[-1]["type"] == "CommandRejected":
+                return state, events
+        else:
+            # владелец умер/выбыл между ходами — его ход тоже пропускаем
+            reason = state.turn_skip_reason(owner)
+            if reason is not None:
+                seq, t = _bump(state)
+                events.append(
+                    ev_turn_skipped(
+                        seq=seq,
+                        t=t,
+                        round_=state.round,
+                        combatant_id=owner,
+                        reason=reason,
+                    )
+                )
+                events.extend(_advance_turn_owner(state))
+
+        nxt = cast(str, state.turn_owner_id)
+        if state.turn_skip_reason(nxt) is not None:
+            return state, events  # ходить некому — бой закончит _check_combat_end
 
+        state, evs = _apply_command(state, BeginTurn(combatant_id=nxt))
+        events.extend(evs)
         return state, events
 
     # На всякий случай (хотя валидатор уже ловит)
@@ -2198,6 +2454,119 @@ def apply_command(
             code="UNKNOWN_COMMAND",
             message="Unhandled command",
             meta={},
-        ).model_dump()
+        )
     )
     return state, events
+
+
+# policy(state, turn_owner) -> команды за этого комбатанта или None (решает человек)
+DecisionPolicy = Callable[[EncounterState, CombatantState], Optional[Sequence[Command]]]
+
+
+def run_until_decision(
+    state: EncounterState,
+    *,
+    policy: Optional[DecisionPolicy] = None,
+    max_steps: int = 1000,
+) -> Tuple[EncounterState, List[EventRecord], str]:
+    """
+    Python-API для RunUntilDecision: прокручивает автоматические шаги боя
+    до точки, где нужен выбор, и возвращает (state, events, reason).
+
+    reason: "turn_action" | "reaction_window" | "combat_ended" | "no_eligible"
+    | "rejected" | "max_steps". Последнее событие — DecisionRequired.
+    policy (например, ИИ монстров) может сама отвечать за ход: её команды
+    применяются, пока она не вернёт None/пусто; ход она должна завершать EndTurn.
+    """
+    with bind_ids(state):
+        return _run_until_decision(state, policy, max_steps)
+
+
+def _next_auto_command(state: EncounterState) -> Optional[Command]:
+    """Шаг, который не требует ничьего решения, или None."""
+    if state.phase != "in_turn":
+        return AdvanceTurn()
+    c = state.combatants[cast(str, state.turn_owner_id)]
+    if c.death_save_pending and c.hp_current == 0 and not c.is_stable:
+        return RollDeathSave(combatant_id=c.id)
+    if not can_act(c):
+        return EndTurn(combatant_id=c.id)
+    return None
+
+
+def _run_until_decision(
+    state: EncounterState, policy: Optional[DecisionPolicy], max_steps: int
+) -> Tuple[EncounterState, List[EventRecord], str]:
+    events: List[EventRecord] = []
+    reason = "max_steps"
+    steps = 0
+    while steps < max_steps:
+        if state.phase == "finished":
+            reason = "combat_ended"
+            break
+        if state.reaction_window is not None:
+            reason = "reaction_window"
+            break
+
+        auto = _next_auto_command(state)
+        if auto is not None:
+            cmds: Sequence[Command] = [auto]
+        else:
+            owner = state.combatants[cast(str, state.turn_owner_id)]
+            cmds = (policy(state, owner) if policy is not None else None) or []
+            if not cmds:
+                reason = "turn_action"
+                break
+
+        steps += 1
+        rejected = False
+        for cmd in cmds:
+            state, evs = _apply_checked(state, cmd)
+            events.extend(evs)
+            if evs and evs[-1]["type"] == "CommandRejected":
+                rejected = True
+                break
+            if state.reaction_window is not None or state.phase == "finished":
+                break
+        if rejected:
+            reason = "rejected"
+            break
+        if isinstance(auto, AdvanceTurn) and state.phase == "idle":
+            reason = "no_eligible"  # все в очереди пропускают ход
+            break
+
+    seq, t = _bump(state)
+    events.append(
+        ev_decision_required(
+            seq=seq,
+            t=t,
+            round_=state.round,
+            turn_owner_id=state.turn_owner_id,
+            reason=reason,
+            steps=steps,
+        )
+    )
+    return state, events, reason
+
+
+def apply_commands(
+    state: EncounterState, cmds: Sequence[Command]
+) -> Tuple[EncounterState, List[EventRecord], int]:
+    """
+    Применяет команды по очереди к одному и тому же state.
+    Останавливается на первом CommandRejected или на открытом reaction window
+    (дальше решает другой игрок/клиент).
+    Возвращаем (state, events, applied), где applied — сколько команд
+    реально применено (отклонённая команда не считается).
+    """
+    events: List[EventRecord] = []
+    applied = 0
+    for cmd in cmds:
+        state, evs = apply_command(state, cmd)
+        events.extend(evs)
+        if evs and evs[-1]["type"] == "CommandRejected":
+            break
+        applied += 1
+        if state.reaction_window is not None:
+            break
+    return state, events, applied
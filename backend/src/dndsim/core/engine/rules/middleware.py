@@ -1,9 +1,22 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List, Optional, Protocol, Literal
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Protocol,
+    Sequence,
+    SupportsIndex,
+    Tuple,
+)
 
-from dndsim.core.engine.events import Roll, RollMod
+from dndsim.core.engine.events import Roll, RollMod, RollModRecord, RollRecord
 from dndsim.core.engine.state import EncounterState, CombatantState
 
 
@@ -37,23 +50,36 @@ class DamageRollContext:
 # --- middleware протокол ---
 
 
+RollHook = Literal["attack", "save", "damage"]
+ALL_HOOKS: FrozenSet[str] = frozenset({"attack", "save", "damage"})
+
+
 class RollMiddleware(Protocol):
+    # От чего зависит middleware (проверяется на владельце броска:
+    # attacker / roller / source). Пустые множества — активна всегда.
+    #   effect_names  — ActiveEffect.name, висящие на владельце ("bless", "bane")
+    #   feature_names — ключи resources_max владельца ("rage", "sneak_attack")
+    effect_names: FrozenSet[str]
+    feature_names: FrozenSet[str]
+    # какие before_* хуки реально что-то делают
+    hooks: FrozenSet[str]
+
     def before_attack_roll(
         self,
         state: EncounterState,
         attacker: CombatantState,
         target: CombatantState,
         ctx: AttackRollContext,
-        roll: Roll,
-    ) -> List[RollMod]: ...
+        roll: RollRecord,
+    ) -> List[RollModRecord]: ...
 
     def before_save_roll(
         self,
         state: EncounterState,
         roller: CombatantState,
         ctx: SaveRollContext,
-        roll: Roll,
-    ) -> List[RollMod]: ...
+        roll: RollRecord,
+    ) -> List[RollModRecord]: ...
 
     def before_damage_roll(
         self,
@@ -61,15 +87,20 @@ class RollMiddleware(Protocol):
         source: CombatantState,
         target: CombatantState,
         ctx: DamageRollContext,
-        roll: Roll,
-    ) -> List[RollMod]: ...
+        roll: RollRecord,
+    ) -> List[RollModRecord]: ...
 
 
-# --- утилита: применить модификаторы к Roll ---
-def apply_roll_mods(roll: Roll, mods: List[RollMod]) -> Roll:
+# --- утилита: применить модификаторы к броску ---
+def apply_roll_mods(
+    roll: RollRecord | Roll, mods: List[RollModRecord]
+) -> RollRecord | Roll:
     if not mods:
         return roll
-    roll.mods.extend(mods)
+    if isinstance(roll, Roll):
+        roll.mods.extend(RollMod(name=m.name, value=m.value) for m in mods)
+    else:
+        roll.mods.extend(mods)
     roll.total += sum(m.value for m in mods)
     # nat / is_critical не трогаем (Bless не влияет на nat20)
     return roll
@@ -77,12 +108,13 @@ def apply_roll_mods(roll: Roll, mods: List[RollMod]) -> Roll:
 
 # --- пример middleware: Bless (+1d4 к атакам/сейвам) ---
 class BlessMiddleware:
+    effect_names: FrozenSet[str] = frozenset({"bless"})
+    feature_names: FrozenSet[str] = frozenset()
+    hooks: FrozenSet[str] = frozenset({"attack", "save"})
+
     def _has_bless(self, state: EncounterState, combatant_id: str) -> bool:
         # считаем, что Bless висит как ActiveEffect.name == "bless" на target_id
-        for eff in state.effects.values():
-            if eff.target_id == combatant_id and eff.name == "bless":
-                return True
-        return False
+        return state.effects.has(combatant_id, "bless")
 
     def before_attack_roll(
         self,
@@ -90,24 +122,24 @@ class BlessMiddleware:
         attacker: CombatantState,
         target: CombatantState,
         ctx: AttackRollContext,
-        roll: Roll,
-    ) -> List[RollMod]:
+        roll: RollRecord,
+    ) -> List[RollModRecord]:
         if not self._has_bless(state, attacker.id):
             return []
         d4 = state.rng.randint(1, 4)
-        return [RollMod(name="bless", value=d4)]
+        return [RollModRecord("bless", d4)]
 
     def before_save_roll(
         self,
         state: EncounterState,
         roller: CombatantState,
         ctx: SaveRollContext,
-        roll: Roll,
-    ) -> List[RollMod]:
+        roll: RollRecord,
+    ) -> List[RollModRecord]:
         if not self._has_bless(state, roller.id):
             return []
         d4 = state.rng.randint(1, 4)
-        return [RollMod(name="bless", value=d4)]
+        return [RollModRecord("bless", d4)]
 
     def before_damage_roll(
         self,
@@ -115,11 +147,148 @@ class BlessMiddleware:
         source: CombatantState,
         target: CombatantState,
         ctx: DamageRollContext,
-        roll: Roll,
-    ) -> List[RollMod]:
+        roll: RollRecord,
+    ) -> List[RollModRecord]:
         return []
 
 
-DEFAULT_ROLL_MIDDLEWARES: List[RollMiddleware] = [
-    BlessMiddleware(),
-]
+class MiddlewareList(List[RollMiddleware]):
+    """
+    list middleware со счётчиком изменений: MiddlewarePipeline сверяет
+    version за O(1) вместо поэлементного сравнения списка на каждом броске.
+    """
+
+    version = 0
+
+    def _changed(self) -> None:
+        self.version += 1
+
+    def append(self, mw: RollMiddleware) -> None:
+        super().append(mw)
+        self._changed()
+
+    def extend(self, mws: Iterable[RollMiddleware]) -> None:
+        super().extend(mws)
+        self._changed()
+
+    def insert(self, index: SupportsIndex, mw: RollMiddleware) -> None:
+        super().insert(index, mw)
+        self._changed()
+
+    def remove(self, mw: RollMiddleware) -> None:
+        super().remove(mw)
+        self._changed()
+
+    def pop(self, index: SupportsIndex = -1) -> RollMiddleware:
+        self._changed()
+        return super().pop(index)
+
+    def clear(self) -> None:
+        super().clear()
+        self._changed()
+
+    def sort(self, *args: Any, **kwargs: Any) -> None:
+        super().sort(*args, **kwargs)
+        self._changed()
+
+    def reverse(self) -> None:
+        super().reverse()
+        self._changed()
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        super().__setitem__(index, value)
+        self._changed()
+
+    def __delitem__(self, index: Any) -> None:
+        super().__delitem__(index)
+        self._changed()
+
+    def __iadd__(self, mws: Iterable[RollMiddleware]) -> "MiddlewareList":
+        self.extend(mws)
+        return self
+
+
+DEFAULT_ROLL_MIDDLEWARES: MiddlewareList = MiddlewareList(
+    [
+        BlessMiddleware(),
+    ]
+)
+
+
+class MiddlewarePipeline:
+    """
+    "Скомпилированный" список middleware.
+    Для каждого комбатанта держим уже отфильтрованные по хукам списки
+    активных middleware; пересчитываем их только когда меняются эффекты
+    на этом комбатанте (EffectStore.derived) или его features (FeatureMap.version).
+    Проверка на бросок — сравнение нескольких чисел, без обхода списков.
+    Если ничего не активно — роллы не строят контекст и не зовут ни одного hook'а.
+    """
+
+    def __init__(self, middlewares: Sequence[RollMiddleware]) -> None:
+        self._source = middlewares
+        self._compile()
+
+    def _source_stamp(self) -> Tuple[int, int]:
+        # MiddlewareList считает все изменения; у обычного списка
+        # замечаем только добавление/удаление (длину)
+        return getattr(self._source, "version", 0), len(self._source)
+
+    def _compile(self) -> None:
+        self._stamp = self._source_stamp()
+        self._compiled_from = tuple(self._source)
+        self._uses_features = any(
+            getattr(mw, "feature_names", frozenset()) for mw in self._compiled_from
+        )
+
+    def active(
+        self, state: EncounterState, combatant: CombatantState, hook: RollHook
+    ) -> Tuple[RollMiddleware, ...]:
+        # список middleware могли поменять на лету (тесты, плагины)
+        if self._source_stamp() != self._stamp:
+            self._compile()
+
+        if self._uses_features:
+            features = combatant.features()
+            version = features.version
+        else:
+            features, version = None, 0
+        cache = state.effects.derived(combatant.id)
+        hit = cache.get(self)
+        if (
+            hit is None
+            or hit[0] is not self._compiled_from
+            or hit[1] is not features
+            or hit[2] != version
+        ):
+            hit = (
+                self._compiled_from,
+                features,
+                version,
+                self._build(state, combatant, features or {}),
+            )
+            cache[self] = hit
+        return hit[3].get(hook, ())
+
+    def _build(
+        self,
+        state: EncounterState,
+        combatant: CombatantState,
+        features: Mapping[str, int],
+    ) -> Dict[str, Tuple[RollMiddleware, ...]]:
+        by_hook: Dict[str, List[RollMiddleware]] = {}
+        for mw in self._compiled_from:
+            effect_names = getattr(mw, "effect_names", frozenset())
+            feature_names = getattr(mw, "feature_names", frozenset())
+            if effect_names or feature_names:
+                relevant = any(
+                    state.effects.has(combatant.id, n) for n in effect_names
+                ) or any(n in features for n in feature_names)
+                if not relevant:
+                    continue
+            for hook in getattr(mw, "hooks", ALL_HOOKS):
+                by_hook.setdefault(hook, []).append(mw)
+        return {hook: tuple(mws) for hook, mws in by_hook.items()}
+
+
+DEFAULT_ROLL_PIPELINE = MiddlewarePipeline(DEFAULT_ROLL_MIDDLEWARES)
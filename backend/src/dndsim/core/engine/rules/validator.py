@@ -11,10 +11,13 @@ from dndsim.core.engine.commands import (
     StartCombat,
     SetInitiative,
     RollInitiative,
+    RollAllInitiative,
     FinalizeInitiative,
     Attack,
     BeginTurn,
     EndTurn,
+    AdvanceTurn,
+    RunUntilDecision,
     Move,
     UseReaction,
     DeclineReaction,
@@ -59,6 +62,12 @@ def _err(code: str, message: str, **meta: Any) -> ValidationResult:
     )
 
 
+# После CombatEnded ходов больше нет, но победители ещё разбираются с последствиями:
+# поднять/стабилизировать умирающего, докинуть спасброски от смерти, снять состояния.
+# Эти команды идут вне хода и без экономии действий.
+AFTERMATH_COMMANDS = (Heal, Stabilize, RollDeathSave, ApplyCondition, RemoveCondition)
+
+
 def _adjacent(a: tuple[int, int], b: tuple[int, int]) -> bool:
     dx = abs(a[0] - b[0])
     dy = abs(a[1] - b[1])
@@ -66,6 +75,10 @@ def _adjacent(a: tuple[int, int], b: tuple[int, int]) -> bool:
 
 
 def validate_command(state: EncounterState, cmd: Command) -> ValidationResult:
+    aftermath = state.phase == "finished"
+    if aftermath and not isinstance(cmd, AFTERMATH_COMMANDS):
+        return _err("COMBAT_FINISHED", "Combat is over", phase=state.phase)
+
     # --- Reaction window gating ---
     if state.reaction_window is not None:
         # Пока окно открыто — разрешены только UseReaction / DeclineReaction
@@ -111,6 +124,18 @@ def validate_command(state: EncounterState, cmd: Command) -> ValidationResult:
             )
         return ValidationResult(ok=True)
 
+    if isinstance(cmd, RollAllInitiative):
+        if not state.combat_started:
+            return _err("COMBAT_NOT_STARTED", "Call StartCombat first")
+        if state.initiative_finalized:
+            return _err("INITIATIVE_FINALIZED", "Initiative already finalized")
+        unknown = [cid for cid in cmd.bonuses if cid not in state.combatants]
+        if unknown:
+            return _err(
+                "UNKNOWN_COMBATANT", "Unknown combatant_id in bonuses", missing=unknown
+            )
+        return ValidationResult(ok=True)
+
     if isinstance(cmd, FinalizeInitiative):
         if not state.combat_started:
             return _err("COMBAT_NOT_STARTED", "Call StartCombat first")
@@ -173,6 +198,27 @@ def validate_command(state: EncounterState, cmd: Command) -> ValidationResult:
             )
         return ValidationResult(ok=True)
 
+    if isinstance(cmd, AdvanceTurn):
+        if not state.initiative_finalized or not state.initiative_order:
+            return _err("INITIATIVE_NOT_FINALIZED", "Finalize initiative first")
+        if cmd.combatant_id is not None and cmd.combatant_id != state.turn_owner_id:
+            return _err(
+                "NOT_YOUR_TURN",
+                "AdvanceTurn only by turn owner",
+                turn_owner_id=state.turn_owner_id,
+                combatant_id=cmd.combatant_id,
+            )
+        return ValidationResult(ok=True)
+
+    if isinstance(cmd, RunUntilDecision):
+        if not state.initiative_finalized or not state.initiative_order:
+            return _err("INITIATIVE_NOT_FINALIZED", "Finalize initiative first")
+        if cmd.max_steps < 1:
+            return _err(
+                "BAD_MAX_STEPS", "max_steps must be positive", max_steps=cmd.max_steps
+            )
+        return ValidationResult(ok=True)
+
     if isinstance(cmd, Disengage):
         if cmd.combatant_id != state.turn_owner_id:
             return _err(
@@ -248,8 +294,8 @@ def validate_command(state: EncounterState, cmd: Command) -> ValidationResult:
         return ValidationResult(ok=True, cost_preview={"bonus": 1})
 
     if isinstance(cmd, RollDeathSave):
-        # ход этого существа
-        if cmd.combatant_id != state.turn_owner_id:
+        # ход этого существа (после боя — в любой момент)
+        if not aftermath and cmd.combatant_id != state.turn_owner_id:
             return _err(
                 "NOT_YOUR_TURN",
                 "Death save can be rolled only by the turn owner",
@@ -265,7 +311,7 @@ def validate_command(state: EncounterState, cmd: Command) -> ValidationResult:
                 combatant_id=cmd.combatant_id,
             )
 
-        if state.phase != "in_turn":
+        if not aftermath and state.phase != "in_turn":
             return _err(
                 "NOT_IN_TURN", "Death save requires in_turn phase", phase=state.phase
             )
@@ -303,8 +349,8 @@ def validate_command(state: EncounterState, cmd: Command) -> ValidationResult:
         return ValidationResult(ok=True, cost_preview={"death_save": 1})
 
     if isinstance(cmd, Stabilize):
-        # лечащий должен быть владельцем хода
-        if cmd.healer_id != state.turn_owner_id:
+        # лечащий должен быть владельцем хода (после боя — любой)
+        if not aftermath and cmd.healer_id != state.turn_owner_id:
             return _err(
                 "NOT_YOUR_TURN",
                 "Stabilize can be used only by the turn owner",
@@ -322,7 +368,7 @@ def validate_command(state: EncounterState, cmd: Command) -> ValidationResult:
                 target_id=cmd.target_id,
             )
 
-        if state.phase != "in_turn":
+        if not aftermath and state.phase != "in_turn":
             return _err(
                 "NOT_IN_TURN", "Stabilize requires in_turn phase", phase=state.phase
             )
@@ -336,7 +382,7 @@ def validate_command(state: EncounterState, cmd: Command) -> ValidationResult:
             )
 
         # экономия: нужен Action
-        if not healer.action_available:
+        if not aftermath and not healer.action_available:
             return _err(
                 "NO_ACTION", "No action available this turn", healer_id=healer.id
             )
@@ -382,8 +428,8 @@ def validate_command(state: EncounterState, cmd: Command) -> ValidationResult:
         if cmd.healer_id is None:
             return ValidationResult(ok=True, cost_preview={"heal": cmd.amount})
 
-        # healer_id задан: это действие в ход
-        if cmd.healer_id != state.turn_owner_id:
+        # healer_id задан: это действие в ход (после боя — вне хода)
+        if not aftermath and cmd.healer_id != state.turn_owner_id:
             return _err(
                 "NOT_YOUR_TURN",
                 "Heal can be used only by the turn owner",
@@ -397,7 +443,7 @@ def validate_command(state: EncounterState, cmd: Command) -> ValidationResult:
                 "UNKNOWN_COMBATANT", "Healer not found", healer_id=cmd.healer_id
             )
 
-        if state.phase != "in_turn":
+        if not aftermath and state.phase != "in_turn":
             return _err(
                 "NOT_IN_TURN",
                 "Heal (with healer) requires in_turn phase",
@@ -411,7 +457,7 @@ def validate_command(state: EncounterState, cmd: Command) -> ValidationResult:
                 healer_id=healer.id,
             )
 
-        if not healer.action_available:
+        if not aftermath and not healer.action_available:
             return _err(
                 "NO_ACTION", "No action available this turn", healer_id=healer.id
             )
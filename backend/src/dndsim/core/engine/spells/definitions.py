@@ -19,6 +19,9 @@ class SpellBase(BaseModel):
     range_ft: int = 60
     requires_los: bool = False
 
+    # длительность наложенного эффекта в раундах (None — без таймера)
+    duration_rounds: Optional[int] = None
+
 
 class SaveSpell(SpellBase):
     kind: Literal["save"] = "save"
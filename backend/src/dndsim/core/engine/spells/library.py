@@ -76,6 +76,7 @@ def register_core_spells() -> None:
             damage_formula="",
             damage_type="",
             on_fail_conditions={"paralyzed"},
+            duration_rounds=10,  # 1 минута
         )
     )
 
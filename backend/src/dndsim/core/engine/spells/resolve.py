@@ -3,6 +3,7 @@ from __future__ import annotations
 from typing import Literal, cast
 
 from dndsim.core.engine.events import (
+    EventRecord,
     ev_attack_declared,
     ev_attack_rolled,
     ev_hit_confirmed,
@@ -26,7 +27,7 @@ from dndsim.core.engine.state import (
     EffectRef,
     ActiveEffect,
 )
-from dndsim.core.engine.events import Roll
+from dndsim.core.engine.events import RollRecord
 from dndsim.core.engine.spells.definitions import SaveSpell, AttackSpell
 
 
@@ -51,8 +52,8 @@ def resolve_save_spell(
     maybe_run_concentration_check,
     before_save_roll,  # ✅ NEW
     before_damage_roll,  # ✅ NEW
-) -> list[dict]:
-    events: list[dict] = []
+) -> list[EventRecord]:
+    events: list[EventRecord] = []
 
     seq, t = bump(state)
     events.append(
@@ -72,7 +73,7 @@ def resolve_save_spell(
             damage_type=spell.damage_type,
             damage_formula=spell.damage_formula,
             economy=spell.economy,
-        ).model_dump()
+        )
     )
 
     has_damage = bool(spell.damage_formula and spell.damage_formula.strip())
@@ -98,7 +99,7 @@ def resolve_save_spell(
         target = state.combatants[tid]
 
         bonus = int(target.save_bonuses.get(spell.save_ability, 0))
-        save_roll: Roll = roll_save(state, bonus=bonus, adv_state="normal")
+        save_roll: RollRecord = roll_save(state, bonus=bonus, adv_state="normal")
         save_roll = before_save_roll(
             state,
             roller=target,
@@ -123,7 +124,7 @@ def resolve_save_spell(
                 save_ability=spell.save_ability,
                 dc=dc,
                 bonus=bonus,
-            ).model_dump()
+            )
         )
 
         success = save_roll.total >= dc
@@ -142,7 +143,7 @@ def resolve_save_spell(
                     target_id=tid,
                     effect_name=spell.name,
                     margin=margin,
-                ).model_dump()
+                )
             )
 
             if spell.on_success == "none":
@@ -157,7 +158,7 @@ def resolve_save_spell(
                         source_id=caster.id,
                         target_id=tid,
                         effect_name=spell.name,
-                    ).model_dump()
+                    )
                 )
                 continue
         else:
@@ -173,7 +174,7 @@ def resolve_save_spell(
                     target_id=tid,
                     effect_name=spell.name,
                     margin=margin,
-                ).model_dump()
+                )
             )
 
         # --- NEW: apply conditions/effect on FAIL ---
@@ -184,15 +185,18 @@ def resolve_save_spell(
             conc_owner = caster.id if spell.concentration else None
             conc_name = spell.name if spell.concentration else None
 
-            state.effects[eff_id] = ActiveEffect(
-                id=eff_id,
-                name=spell.name,
-                source_id=caster.id,
-                target_id=tid,
-                started_round=state.round,
-                concentration_owner_id=conc_owner,
-                concentration_effect_name=conc_name,
-                applies_conditions=set(spell.on_fail_conditions),
+            state.add_effect(
+                ActiveEffect(
+                    id=eff_id,
+                    name=spell.name,
+                    source_id=caster.id,
+                    target_id=tid,
+                    started_round=state.round,
+                    duration_rounds=spell.duration_rounds,
+                    concentration_owner_id=conc_owner,
+                    concentration_effect_name=conc_name,
+                    applies_conditions=set(spell.on_fail_conditions),
+                )
             )
 
             seq, t = bump(state)
@@ -209,7 +213,7 @@ def resolve_save_spell(
                     concentration_owner_id=conc_owner,
                     concentration_effect_name=conc_name,
                     conditions=list(spell.on_fail_conditions),
-                ).model_dump()
+                )
             )
 
             for cond in spell.on_fail_conditions:
@@ -226,7 +230,7 @@ def resolve_save_spell(
                             target_id=tid,
                             condition=cond,
                             reason=f"spell:{spell.name}",
-                        ).model_dump()
+                        )
                     )
 
         # 5.2.2: если у спелла нет урона (например hold_person) — пропускаем урон целиком
@@ -234,7 +238,7 @@ def resolve_save_spell(
             continue
 
         # --- DAMAGE (AoE: общий roll, single: можно тоже общий — MVP) ---
-        dmg_roll: Roll = shared_damage_roll or roll_damage(
+        dmg_roll: RollRecord = shared_damage_roll or roll_damage(
             state, spell.damage_formula, crit=False
         )
 
@@ -263,7 +267,7 @@ def resolve_save_spell(
                 effect_name=spell.name,
                 roll=dmg_roll,
                 damage_type=spell.damage_type,
-            ).model_dump()
+            )
         )
 
         raw = int(dmg_roll.total)
@@ -281,6 +285,7 @@ def resolve_save_spell(
         hp_before = target.hp_current
         target.hp_current = max(0, target.hp_current - max(0, adjusted_final))
         hp_after = target.hp_current
+        state.note_vitals(target)
 
         seq, t = bump(state)
         events.append(
@@ -298,7 +303,7 @@ def resolve_save_spell(
                 damage_type=spell.damage_type,
                 hp_before=hp_before,
                 hp_after=hp_after,
-            ).model_dump()
+            )
         )
         events[-1]["payload"].update(
             {"adjusted_final": adjusted_final, "modifier": mod}
@@ -337,7 +342,7 @@ def resolve_save_spell(
                     target_id=target.id,
                     condition="unconscious",
                     reason="hp_0",
-                ).model_dump()
+                )
             )
 
             seq, t = bump(state)
@@ -349,7 +354,7 @@ def resolve_save_spell(
                     target_id=target.id,
                     became_unconscious=True,
                     reason="hp_0",
-                ).model_dump()
+                )
             )
 
     return events
@@ -371,8 +376,8 @@ def resolve_attack_spell(
     maybe_run_concentration_check,
     before_attack_roll,  # ✅ NEW
     before_damage_roll,  # ✅ NEW
-) -> list[dict]:
-    events: list[dict] = []
+) -> list[EventRecord]:
+    events: list[EventRecord] = []
     target = state.combatants[target_id]
 
     seq, t = bump(state)
@@ -388,10 +393,10 @@ def resolve_attack_spell(
             attack_kind=spell.attack_kind,
             context="action",
             economy=spell.economy,
-        ).model_dump()
+        )
     )
 
-    atk_roll: Roll = roll_d20(state, to_hit_bonus, adv_state="normal")
+    atk_roll: RollRecord = roll_d20(state, to_hit_bonus, adv_state="normal")
     atk_roll = before_attack_roll(
         state,
         attacker=caster,
@@ -413,7 +418,7 @@ def resolve_attack_spell(
             roll=atk_roll,
             to_hit_bonus=to_hit_bonus,
             target_ac=target.ac,
-        ).model_dump()
+        )
     )
 
     # nat1 auto miss
@@ -429,7 +434,7 @@ def resolve_attack_spell(
                 attacker_id=caster.id,
                 target_id=target_id,
                 margin=margin,
-            ).model_dump()
+            )
         )
         return events
 
@@ -447,7 +452,7 @@ def resolve_attack_spell(
                 attacker_id=caster.id,
                 target_id=target_id,
                 margin=margin,
-            ).model_dump()
+            )
         )
         return events
 
@@ -464,10 +469,10 @@ def resolve_attack_spell(
             target_id=target_id,
             is_critical=final_crit,
             margin=margin,
-        ).model_dump()
+        )
     )
 
-    dmg_roll: Roll = roll_damage(state, spell.damage_formula, crit=final_crit)
+    dmg_roll: RollRecord = roll_damage(state, spell.damage_formula, crit=final_crit)
     dmg_roll = before_damage_roll(
         state,
         source=caster,
@@ -488,7 +493,7 @@ def resolve_attack_spell(
             target_id=target_id,
             roll=dmg_roll,
             damage_type=spell.damage_type,
-        ).model_dump()
+        )
     )
 
     raw = int(dmg_roll.total)
@@ -497,6 +502,7 @@ def resolve_attack_spell(
     hp_before = target.hp_current
     target.hp_current = max(0, target.hp_current - max(0, adjusted))
     hp_after = target.hp_current
+    state.note_vitals(target)
 
     # unconscious
     if hp_after == 0 and "unconscious" not in target.conditions:
@@ -519,7 +525,7 @@ def resolve_attack_spell(
                 target_id=target.id,
                 condition="unconscious",
                 reason="hp_0",
-            ).model_dump()
+            )
         )
 
         seq, t = bump(state)
@@ -531,7 +537,7 @@ def resolve_attack_spell(
                 target_id=target.id,
                 became_unconscious=True,
                 reason="hp_0",
-            ).model_dump()
+            )
         )
 
     # DamageApplied — без is_critical параметром (у тебя фабрика его не принимает)
@@ -549,7 +555,7 @@ def resolve_attack_spell(
             damage_type=spell.damage_type,
             hp_before=hp_before,
             hp_after=hp_after,
-        ).model_dump()
+        )
     )
     events[-1]["payload"]["modifier"] = mod
     events[-1]["payload"]["is_critical"] = final_crit
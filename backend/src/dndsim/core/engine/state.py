@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import heapq
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional, Tuple
 from random import Random
@@ -33,6 +34,9 @@ class ActiveEffect(BaseModel):
     # MVP: какие conditions он включает
     applies_conditions: Set[str] = Field(default_factory=set)
 
+    # когда истекает duration_rounds: в начале или в конце хода source_id
+    expires_on: Literal["turn_start", "turn_end"] = "turn_start"
+
 
 @dataclass
 class AttackProfile:
@@ -62,6 +66,48 @@ class ReactionWindow:
     reach_ft: int = 5
 
 
+class FeatureMap(dict):
+    """
+    resources_max: имя ресурса/feature -> максимум.
+    version растёт при каждом изменении, поэтому кэши, зависящие от набора
+    features (MiddlewarePipeline), сверяют одно число, а не пересобирают frozenset.
+    """
+
+    version = 0
+
+    def __setitem__(self, key: str, value: int) -> None:
+        super().__setitem__(key, value)
+        self.version += 1
+
+    def __delitem__(self, key: str) -> None:
+        super().__delitem__(key)
+        self.version += 1
+
+    def pop(self, *args: Any) -> Any:
+        self.version += 1
+        return super().pop(*args)
+
+    def popitem(self) -> Tuple[str, int]:
+        self.version += 1
+        return super().popitem()
+
+    def setdefault(self, key: str, default: int = 0) -> int:
+        self.version += 1
+        return super().setdefault(key, default)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        super().update(*args, **kwargs)
+        self.version += 1
+
+    def clear(self) -> None:
+        super().clear()
+        self.version += 1
+
+    def __ior__(self, other: Any) -> "FeatureMap":
+        self.update(other)
+        return self
+
+
 @dataclass
 class CombatantState:
     id: str
@@ -102,6 +148,7 @@ class CombatantState:
     death_save_failures: int = 0
     is_stable: bool = False  # stabilized (не умирает, но unconscious)
     is_dead: bool = False  # мёртв
+    death_save_pending: bool = False  # BeginTurn потребовал death save, ещё не брошен
 
     # NEW: Extra Attack: сколько атак даёт Attack action
     attacks_per_action: int = 1
@@ -130,7 +177,8 @@ class CombatantState:
 
     # NEW: resources (универсальные ресурсы)
     resources_current: dict[str, int] = field(default_factory=dict)
-    resources_max: dict[str, int] = field(default_factory=dict)
+    # FeatureMap: ключи — features комбатанта, см. MiddlewarePipeline
+    resources_max: dict[str, int] = field(default_factory=FeatureMap)
 
     # статусы (минимум)
     surprised: bool = False
@@ -141,6 +189,170 @@ class CombatantState:
 
     attacks: Dict[str, AttackProfile] = field(default_factory=dict)
 
+    def features(self) -> FeatureMap:
+        """resources_max как FeatureMap (обычный dict из mapper'а оборачивается один раз)."""
+        rm = self.resources_max
+        if not isinstance(rm, FeatureMap):
+            rm = self.resources_max = FeatureMap(rm or {})
+        return rm
+
+
+@dataclass
+class SideStats:
+    """Счётчики стороны (side). Поддерживаются инкрементально, см. EncounterState.note_vitals."""
+
+    alive: int = 0  # не мертвы (PC на 0 hp ещё жив — умирает)
+    conscious: int = 0  # hp > 0 и не мертвы — могут действовать
+    hp_total: int = 0
+
+
+def side_key(c: "CombatantState") -> str:
+    # side=None враждебен всем (are_hostile) — такой комбатант сам себе сторона
+    return c.side if c.side is not None else f"#{c.id}"
+
+
+def _vitals(c: "CombatantState") -> Tuple[str, int, int, int]:
+    hp = max(0, c.hp_current)
+    # монстр на 0 hp выбывает; PC на 0 hp умирает, но ещё жив
+    dead = c.is_dead or (hp == 0 and not c.is_player_character)
+    if dead:
+        return side_key(c), 0, 0, 0
+    return side_key(c), 1, int(hp > 0), hp
+
+
+TIMING_TURN_START = 0
+TIMING_TURN_END = 1
+
+
+class EffectStore(dict):
+    """
+    state.effects: effect_id -> ActiveEffect плюс вторичные индексы
+    (по target_id, по (target_id, name), по владельцу концентрации).
+    Индексы обновляются в тех же операциях, что и сам dict, поэтому
+    state.effects[eid] = eff / pop(eid) держат их в согласии автоматически.
+    Поля target_id/name/concentration_owner_id у эффекта после добавления не меняются.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__()
+        self._by_target: Dict[str, Dict[str, Any]] = {}
+        self._by_target_name: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._by_concentration: Dict[str, Dict[str, Any]] = {}
+        # производные данные по цели (например, активные middleware);
+        # сбрасываются при любом изменении эффектов этой цели
+        self._derived: Dict[Any, Dict[Any, Any]] = {}
+        self.update(*args, **kwargs)
+
+    # --- индексы ---
+
+    @staticmethod
+    def _bucket_add(
+        index: Dict[Any, Dict[str, Any]], key: Any, eid: str, eff: Any
+    ) -> None:
+        index.setdefault(key, {})[eid] = eff
+
+    @staticmethod
+    def _bucket_discard(index: Dict[Any, Dict[str, Any]], key: Any, eid: str) -> None:
+        bucket = index.get(key)
+        if bucket is None:
+            return
+        bucket.pop(eid, None)
+        if not bucket:
+            del index[key]
+
+    def _index(self, eid: str, eff: Any) -> None:
+        target_id = getattr(eff, "target_id", None)
+        self._derived.pop(target_id, None)
+        self._bucket_add(self._by_target, target_id, eid, eff)
+        self._bucket_add(
+            self._by_target_name, (target_id, getattr(eff, "name", None)), eid, eff
+        )
+        owner = getattr(eff, "concentration_owner_id", None)
+        if owner is not None:
+            self._bucket_add(self._by_concentration, owner, eid, eff)
+
+    def _unindex(self, eid: str, eff: Any) -> None:
+        target_id = getattr(eff, "target_id", None)
+        self._derived.pop(target_id, None)
+        self._bucket_discard(self._by_target, target_id, eid)
+        self._bucket_discard(
+            self._by_target_name, (target_id, getattr(eff, "name", None)), eid
+        )
+        owner = getattr(eff, "concentration_owner_id", None)
+        if owner is not None:
+            self._bucket_discard(self._by_concentration, owner, eid)
+
+    # --- запросы O(1) / O(эффектов на цели) ---
+
+    def for_target(self, target_id: str) -> List[Any]:
+        return list(self._by_target.get(target_id, {}).values())
+
+    def has(self, target_id: str, name: str) -> bool:
+        return (target_id, name) in self._by_target_name
+
+    def named(self, target_id: str, name: str) -> List[Any]:
+        return list(self._by_target_name.get((target_id, name), {}).values())
+
+    def by_concentration_owner(self, owner_id: str) -> List[Any]:
+        return list(self._by_concentration.get(owner_id, {}).values())
+
+    def derived(self, target_id: str) -> Dict[Any, Any]:
+        """Кэш, живущий, пока эффекты на target_id не менялись."""
+        return self._derived.setdefault(target_id, {})
+
+    # --- изменения dict ---
+
+    def __setitem__(self, eid: str, eff: Any) -> None:
+        old = dict.get(self, eid)
+        if old is not None:
+            self._unindex(eid, old)
+        super().__setitem__(eid, eff)
+        self._index(eid, eff)
+
+    def __delitem__(self, eid: str) -> None:
+        eff = dict.__getitem__(self, eid)
+        super().__delitem__(eid)
+        self._unindex(eid, eff)
+
+    _MISSING = object()
+
+    def pop(self, eid: str, default: Any = _MISSING) -> Any:
+        if eid in self:
+            eff = super().pop(eid)
+            self._unindex(eid, eff)
+            return eff
+        if default is EffectStore._MISSING:
+            raise KeyError(eid)
+        return default
+
+    def popitem(self) -> Tuple[str, Any]:
+        eid, eff = super().popitem()
+        self._unindex(eid, eff)
+        return eid, eff
+
+    def clear(self) -> None:
+        super().clear()
+        self._derived.clear()
+        self._by_target.clear()
+        self._by_target_name.clear()
+        self._by_concentration.clear()
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        for eid, eff in dict(*args, **kwargs).items():
+            self[eid] = eff
+
+    def setdefault(self, eid: str, default: Any = None) -> Any:
+        if eid not in self:
+            self[eid] = default
+        return dict.__getitem__(self, eid)
+
+    def copy(self) -> "EffectStore":
+        return EffectStore(self)
+
+    def __reduce__(self):
+        # copy/deepcopy/pickle: пересобираем индексы из элементов
+        return (EffectStore, (dict(self),))
+
 
 @dataclass
 class EncounterState:
@@ -148,6 +360,10 @@ class EncounterState:
     round: int = 1
     turn_owner_id: Optional[str] = None
     initiative_order: List[str] = field(default_factory=list)
+    # позиция turn_owner_id в initiative_order (EndTurn/AdvanceTurn без .index())
+    turn_index: int = 0
+    # пропускать ли ход NPC на 0 hp (мёртвые и убранные пропускаются всегда)
+    skip_unconscious_npcs: bool = False
 
     phase: str = (
         "idle"  # idle | in_turn | reaction_window | finished | setup_initiative
@@ -168,10 +384,32 @@ class EncounterState:
     initiative_finalized: bool = False
     initiatives: Dict[str, int] = field(default_factory=dict)
 
-    effects: dict[str, ActiveEffect] = field(default_factory=dict)
+    effects: EffectStore = field(default_factory=EffectStore)
+
+    # min-heap таймеров истечения эффектов: (round, индекс source в initiative_order,
+    # timing 0=turn_start/1=turn_end, effect_id). См. add_effect / pop_due_effects.
+    effect_timers: List[Tuple[int, int, int, str]] = field(default_factory=list)
 
     _effect_seq: int = 1
 
+    # выдача event_id/roll_id: "uuid4" | "monotonic" | "deterministic" (см. engine/ids.py)
+    id_strategy: str = "uuid4"
+    id_scope: str = ""  # обычно encounter_id; входит в monotonic/deterministic id
+    _roll_seq: int = 0
+
+    def __post_init__(self) -> None:
+        # производные счётчики сторон: не поля dataclass'а, в снапшот не попадают,
+        # после загрузки пересобираются лениво (side_stats())
+        self._side_stats: Dict[str, SideStats] = {}
+        self._vitals: Dict[str, Tuple[str, int, int, int]] = {}
+        self._vitals_ready = False
+
+        # из codec'а / конструктора может прийти обычный dict
+        if not isinstance(self.effects, EffectStore):
+            self.effects = EffectStore(self.effects or {})
+        # после JSON таймеры приходят списками; heapq не сравнивает list с tuple
+        self.effect_timers = [tuple(x) for x in self.effect_timers]  # type: ignore[misc]
+
     def with_seed(self, seed: int) -> "EncounterState":
         self.rng_seed = seed
         self.rng = Random(seed)
@@ -180,6 +418,111 @@ class EncounterState:
     def new_window_id(self) -> str:
         return str(uuid4())
 
+    # --- очередь ходов ---
+
+    def turn_position(self) -> int:
+        """
+        Индекс turn_owner_id в initiative_order за O(1).
+        Если turn_owner_id выставили мимо движка (тесты, старые снапшоты) —
+        один раз ищем линейно и запоминаем.
+        """
+        order = self.initiative_order
+        i = self.turn_index
+        if 0 <= i < len(order) and order[i] == self.turn_owner_id:
+            return i
+        try:
+            i = order.index(self.turn_owner_id)  # type: ignore[arg-type]
+        except ValueError:
+            i = 0
+        self.turn_index = i
+        return i
+
+    def turn_skip_reason(self, combatant_id: str) -> Optional[str]:
+        """Почему ход комбатанта надо пропустить, или None, если он ходит."""
+        c = self.combatants.get(combatant_id)
+        if c is None:
+            return "removed"
+        if c.is_dead:
+            return "dead"
+        if (
+            self.skip_unconscious_npcs
+            and not c.is_player_character
+            and c.hp_current <= 0
+        ):
+            return "unconscious"
+        return None
+
+    # --- счётчики сторон ---
+
+    def note_vitals(self, c: CombatantState) -> None:
+        """
+        O(1): пересчитать вклад комбатанта в счётчики его стороны.
+        Зовётся движком после урона / лечения / смерти / стабилизации.
+        """
+        if not self._vitals_ready:
+            return  # соберём целиком при первом запросе
+        new = _vitals(c)
+        old = self._vitals.get(c.id)
+        if old == new:
+            return
+        if old is not None:
+            st = self._side_stats[old[0]]
+            st.alive -= old[1]
+            st.conscious -= old[2]
+            st.hp_total -= old[3]
+        st = self._side_stats.setdefault(new[0], SideStats())
+        st.alive += new[1]
+        st.conscious += new[2]
+        st.hp_total += new[3]
+        self._vitals[c.id] = new
+
+    def rebuild_side_stats(self) -> None:
+        self._side_stats = {}
+        self._vitals = {}
+        self._vitals_ready = True
+        for c in self.combatants.values():
+            self.note_vitals(c)
+
+    def side_stats(self) -> Dict[str, SideStats]:
+        # комбатанты могли добавить/убрать мимо движка (API, тесты)
+        if not self._vitals_ready or len(self._vitals) != len(self.combatants):
+            self.rebuild_side_stats()
+        return self._side_stats
+
+    def standing_sides(self) -> List[str]:
+        """Стороны, у которых есть хотя бы один комбатант в сознании."""
+        return [k for k, st in self.side_stats().items() if st.conscious > 0]
+
+    def add_effect(self, eff: ActiveEffect) -> None:
+        """Кладёт эффект в state.effects и, если есть duration_rounds, ставит таймер."""
+        self.effects[eff.id] = eff
+        if eff.duration_rounds is None:
+            return
+        try:
+            owner_idx = self.initiative_order.index(eff.source_id)
+        except ValueError:
+            owner_idx = 0  # источник вне инициативы — истекает в начале раунда
+        timing = TIMING_TURN_END if eff.expires_on == "turn_end" else TIMING_TURN_START
+        heapq.heappush(
+            self.effect_timers,
+            (eff.started_round + eff.duration_rounds, owner_idx, timing, eff.id),
+        )
+
+    def pop_due_effects(self, owner_idx: int, timing: int) -> List[ActiveEffect]:
+        """
+        Снимает с кучи все таймеры, наступившие к (round, owner_idx, timing).
+        O(истекающих * log n); эффекты, удалённые раньше (концентрация), пропускаем.
+        """
+        due: List[ActiveEffect] = []
+        now = (self.round, owner_idx, timing)
+        timers = self.effect_timers
+        while timers and timers[0][:3] <= now:
+            _r, _i, _tm, eid = heapq.heappop(timers)
+            eff = self.effects.get(eid)
+            if eff is not None:
+                due.append(eff)
+        return due
+
     def new_effect_id(self) -> str:
         eid = f"E{self._effect_seq}"
         self._effect_seq += 1
@@ -196,6 +539,19 @@ def effective_speed_ft(c: CombatantState) -> int:
     return c.speed_ft
 
 
+# conditions, при которых существо не может действовать в свой ход (5e: incapacitated)
+INCAPACITATING_CONDITIONS = frozenset(
+    {"incapacitated", "paralyzed", "petrified", "stunned", "unconscious"}
+)
+
+
+def can_act(c: CombatantState) -> bool:
+    """Может ли комбатант что-то делать в свой ход (иначе ход завершается сам)."""
+    if c.is_dead or c.hp_current <= 0:
+        return False
+    return not (c.conditions & INCAPACITATING_CONDITIONS)
+
+
 def are_hostile(a: CombatantState, b: CombatantState) -> bool:
     """
     Если side не задан (None) — сохраняем старое поведение: считаем всех враждебными.
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import codecs
+import json
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, Iterable, List, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from dndsim.api.schemas import CreatureCreate
+from dndsim.db.creature_index import creature_summary, creature_traits
+from dndsim.db.models import Creature, CreatureTrait
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_MAX_ERRORS = 100
+_READ_SIZE = 256 * 1024
+
+
+@dataclass
+class RecordError:
+    index: int
+    error: str
+    name: Optional[str] = None
+
+
+@dataclass
+class ImportReport:
+    total: int = 0
+    inserted: int = 0
+    failed: int = 0
+    # подробности — по первым max_errors ошибкам, failed считает все
+    errors: List[RecordError] = field(default_factory=list)
+
+
+class _ParseError:
+    """Запись, которую не удалось разобрать как JSON (NDJSON: одна строка)."""
+
+    def __init__(self, message: str) -> None:
+        self.message = message
+
+
+class JsonRecordStream:
+    """
+    Потоковый разбор JSON-массива объектов или NDJSON: кормим кусками байт
+    (feed), получаем готовые записи. В памяти — только недочитанный хвост.
+
+    Формат определяется по первому непробельному символу: '[' — массив,
+    иначе NDJSON (строка = запись, битая строка — ошибка только этой записи).
+    Битый JSON-массив дальше читать нельзя: close() вернёт одну ошибку и всё.
+    """
+
+    def __init__(self) -> None:
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._buf = ""
+        self._mode: Optional[str] = None  # "array" | "ndjson"
+        self._done = False
+
+    def feed(self, chunk: bytes | str) -> List[Any]:
+        text = chunk if isinstance(chunk, str) else self._utf8.decode(chunk)
+        self._buf += text
+        return self._drain(final=False)
+
+    def close(self) -> List[Any]:
+        self._buf += self._utf8.decode(b"", final=True)
+        return self._drain(final=True)
+
+    def _drain(self, *, final: bool) -> List[Any]:
+        if self._done:
+            return []
+        if self._mode is None:
+            stripped = self._buf.lstrip()
+            if not stripped:
+                return []
+            if stripped[0] == "[":
+                self._mode = "array"
+                self._buf = stripped[1:]
+            else:
+                self._mode = "ndjson"
+        if self._mode == "array":
+            return self._drain_array(final)
+        return self._drain_ndjson(final)
+
+    def _drain_ndjson(self, final: bool) -> List[Any]:
+        lines = self._buf.split("\n")
+        self._buf = "" if final else lines.pop()
+        out: List[Any] = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                out.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                out.append(_ParseError(f"invalid JSON: {e.msg}"))
+        return out
+
+    def _drain_array(self, final: bool) -> List[Any]:
+        out: List[Any] = []
+        buf = self._buf
+        pos = 0
+        n = len(buf)
+        while True:
+            while pos < n and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= n:
+                break
+            if buf[pos] == "]":
+                self._done = True
+                pos = n
+                break
+            try:
+                obj, pos = self._decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                if final:
+                    out.append(_ParseError(f"invalid JSON array: {e.msg}"))
+                    self._done = True
+                    pos = n
+                break  # иначе ждём следующий кусок
+            out.append(obj)
+        if final and not self._done:
+            out.append(_ParseError("invalid JSON array: missing ']'"))
+            self._done = True
+        self._buf = buf[pos:]
+        return out
+
+
+def creature_row(raw: Any) -> dict[str, Any]:
+    """
+    Запись импорта -> строка для INSERT в creatures.
+    Принимает {"name", "data"} (как POST /creatures) или плоский вариант,
+    где поля существа лежат рядом с "name".
+    """
+    if not isinstance(raw, dict):
+        raise ValueError("record must be a JSON object")
+    if "data" not in raw:
+        raw = {
+            "name": raw.get("name"),
+            "data": {k: v for k, v in raw.items() if k != "name"},
+        }
+    payload = CreatureCreate.model_validate(raw)
+    data_json = payload.data.model_dump(by_alias=True)
+    return {
+        "id": str(uuid.uuid4()),
+        "name": payload.name,
+        "data_json": data_json,
+        **creature_summary(data_json),
+    }
+
+
+def trait_rows(batch: List[dict[str, Any]]) -> List[dict[str, Any]]:
+    """Строки creature_traits для пачки (bulk insert мимо @validates модели)."""
+    return [
+        {"creature_id": row["id"], "kind": kind, "value": value}
+        for row in batch
+        for kind, value in creature_traits(row["data_json"])
+    ]
+
+
+class CreatureImporter:
+    """
+    Копит валидные строки в пачки по batch_size; ошибки записей — в report,
+    импорт при этом не прерывается. Сам в БД не пишет (см. import_creatures*).
+    """
+
+    def __init__(
+        self,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_errors: int = DEFAULT_MAX_ERRORS,
+    ) -> None:
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.report = ImportReport()
+        self._batch: List[dict[str, Any]] = []
+
+    def add(self, raw: Any) -> Optional[List[dict[str, Any]]]:
+        """Добавить запись; вернуть пачку, если она набралась."""
+        index = self.report.total
+        self.report.total += 1
+        try:
+            if isinstance(raw, _ParseError):
+                raise ValueError(raw.message)
+            self._batch.append(creature_row(raw))
+        except (ValidationError, ValueError) as e:
+            name = raw.get("name") if isinstance(raw, dict) else None
+            self._fail(index, e, name if isinstance(name, str) else None)
+            return None
+        if len(self._batch) >= self.batch_size:
+            return self.take()
+        return None
+
+    def add_many(self, raws: Iterable[Any]) -> List[List[dict[str, Any]]]:
+        """add() для нескольких записей: все набравшиеся пачки."""
+        return [batch for batch in map(self.add, raws) if batch]
+
+    def take(self) -> List[dict[str, Any]]:
+        batch, self._batch = self._batch, []
+        return batch
+
+    def inserted(self, n: int) -> None:
+        self.report.inserted += n
+
+    def _fail(self, index: int, exc: Exception, name: Optional[str]) -> None:
+        self.report.failed += 1
+        if len(self.report.errors) >= self.max_errors:
+            return
+        if isinstance(exc, ValidationError):
+            msg = "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}"
+                for err in exc.errors()
+            )
+        else:
+            msg = str(exc)
+        self.report.errors.append(RecordError(index=index, error=msg, name=name))
+
+
+def import_creatures(
+    db: Session,
+    records: Iterable[Any],
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_errors: int = DEFAULT_MAX_ERRORS,
+) -> ImportReport:
+    """Синхронный импорт: executemany + commit на каждую пачку."""
+    imp = CreatureImporter(batch_size=batch_size, max_errors=max_errors)
+
+    def flush(batch: List[dict[str, Any]]) -> None:
+        if batch:
+            db.execute(insert(Creature), batch)
+            traits = trait_rows(batch)
+            if traits:
+                db.execute(insert(CreatureTrait), traits)
+            db.commit()
+            imp.inserted(len(batch))
+
+    for raw in records:
+        batch = imp.add(raw)
+        if batch:
+            flush(batch)
+    flush(imp.take())
+    return imp.report
+
+
+def iter_file_records(path: str) -> Iterable[Any]:
+    """Записи из JSON/NDJSON файла, без чтения файла целиком."""
+    stream = JsonRecordStream()
+    with open(path, "rb") as f:
+        while chunk := f.read(_READ_SIZE):
+            yield from stream.feed(chunk)
+    yield from stream.close()
+
+
+async def import_creatures_async(
+    db: AsyncSession,
+    chunks: AsyncIterable[bytes],
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_errors: int = DEFAULT_MAX_ERRORS,
+) -> ImportReport:
+    """Импорт из потока байт (тело запроса): разбор по мере прихода данных."""
+    imp = CreatureImporter(batch_size=batch_size, max_errors=max_errors)
+    stream = JsonRecordStream()
+
+    async def flush(batch: List[dict[str, Any]]) -> None:
+        if batch:
+            await db.execute(insert(Creature), batch)
+            traits = trait_rows(batch)
+            if traits:
+                await db.execute(insert(CreatureTrait), traits)
+            await db.commit()
+            imp.inserted(len(batch))
+
+    def parse(chunk: Optional[bytes]) -> List[List[dict[str, Any]]]:
+        # json + CreatureCreate.model_validate + creature_summary — CPU на каждую
+        # запись; в threadpool, чтобы импорт на тысячи существ не держал event loop
+        raws = stream.feed(chunk) if chunk is not None else stream.close()
+        return imp.add_many(raws)
+
+    async for chunk in chunks:
+        for batch in await run_in_threadpool(parse, chunk):
+            await flush(batch)
+    for batch in await run_in_threadpool(parse, None):
+        await flush(batch)
+    await flush(imp.take())
+    return imp.report
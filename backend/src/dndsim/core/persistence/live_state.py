@@ -0,0 +1,371 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy import (
+    Text,
+    bindparam,
+    cast,
+    func,
+    literal,
+    select,
+    type_coerce,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from dndsim.db.models import Encounter, EncounterLiveState
+
+# Живое состояние encounter'а в encounter_live_state (см. модель).
+# Команда читает документ (а не EncounterSave) и на Postgres пишет один UPDATE с патчем:
+#   meta           = (meta - удалённые ключи) || изменённые ключи
+#   combatants     = jsonb_set(... (combatants - удалённые) || новые, {cid,поле}, значение)
+#   pending_events = pending_events || события команды
+# т.е. пишутся только изменённые поля изменённых комбатантов, а не весь state.
+# На других диалектах (SQLite) документ просто перезаписывается целиком.
+
+_MISSING = object()
+
+
+def split_state(state: Mapping[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """encounter_state_to_dict(...) -> (meta, combatants)."""
+    meta = {k: v for k, v in state.items() if k != "combatants"}
+    combatants = state.get("combatants") or {}
+    return meta, dict(combatants) if isinstance(combatants, Mapping) else {}
+
+
+@dataclass
+class StatePatch:
+    meta_set: Dict[str, Any] = field(default_factory=dict)
+    meta_removed: List[str] = field(default_factory=list)
+    # комбатанты целиком: новые или с изменившимся набором полей
+    combatants_put: Dict[str, Any] = field(default_factory=dict)
+    combatants_removed: List[str] = field(default_factory=list)
+    # cid -> {поле: новое значение}
+    combatant_fields: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    def is_empty(self) -> bool:
+        return not (
+            self.meta_set
+            or self.meta_removed
+            or self.combatants_put
+            or self.combatants_removed
+            or self.combatant_fields
+        )
+
+    def field_paths(self) -> int:
+        """Сколько путей меняет патч (для отчётов/бенчмарков)."""
+        return (
+            len(self.meta_set)
+            + len(self.meta_removed)
+            + len(self.combatants_put)
+            + len(self.combatants_removed)
+            + sum(len(f) for f in self.combatant_fields.values())
+        )
+
+    def payload_bytes(self) -> int:
+        """Объём значений в патче (JSON) — сколько реально уходит в БД."""
+        return len(
+            json.dumps(
+                [self.meta_set, self.combatants_put, self.combatant_fields], default=str
+            )
+        )
+
+
+@dataclass
+class LiveDoc:
+    """Документ encounter_live_state, из которого команда берёт state."""
+
+    save_id: int
+    version: int
+    state: Dict[str, Any]
+    pending_events: List[Dict[str, Any]]
+    pending_commands: int
+
+
+def live_doc_query(encounter_id: str):
+    """
+    Документ encounter'а, если он актуален (version == Encounter.state_version).
+    JSON-колонки читаются текстом: разбирает их decode_live_row, в threadpool.
+    """
+    t = EncounterLiveState
+    return (
+        select(
+            t.save_id,
+            t.version,
+            cast(t.meta, Text),
+            cast(t.combatants, Text),
+            cast(t.pending_events, Text),
+            t.pending_commands,
+        )
+        .join(Encounter, Encounter.id == t.encounter_id)
+        .where(t.encounter_id == encounter_id, t.version == Encounter.state_version)
+    )
+
+
+def decode_live_row(row: Any) -> Optional[LiveDoc]:
+    if row is None:
+        return None
+    save_id, version, meta, combatants, pending_events, pending_commands = row
+    state = dict(json.loads(meta) or {})
+    state["combatants"] = json.loads(combatants) or {}
+    return LiveDoc(
+        save_id=int(save_id),
+        version=int(version),
+        state=state,
+        pending_events=json.loads(pending_events or "[]") or [],
+        pending_commands=int(pending_commands or 0),
+    )
+
+
+def diff_state(prev: Mapping[str, Any], new: Mapping[str, Any]) -> StatePatch:
+    """Патч, превращающий документ prev в new (оба — encounter_state_to_dict)."""
+    meta_prev, c_prev = split_state(prev)
+    meta_new, c_new = split_state(new)
+
+    patch = StatePatch()
+    patch.meta_set = {
+        k: v for k, v in meta_new.items() if meta_prev.get(k, _MISSING) != v
+    }
+    patch.meta_removed = [k for k in meta_prev if k not in meta_new]
+
+    for cid, doc in c_new.items():
+        old = c_prev.get(cid)
+        if not isinstance(old, Mapping) or not isinstance(doc, Mapping):
+            if old != doc:
+                patch.combatants_put[cid] = doc
+            continue
+        if old.keys() != doc.keys():
+            patch.combatants_put[cid] = doc
+            continue
+        changed = {f: v for f, v in doc.items() if old[f] != v}
+        if changed:
+            patch.combatant_fields[cid] = changed
+    patch.combatants_removed = [cid for cid in c_prev if cid not in c_new]
+    return patch
+
+
+def _jsonb(value: Any):
+    return bindparam(None, value, type_=JSONB)
+
+
+def _text_array(items: List[str]):
+    return literal(items, ARRAY(Text))
+
+
+def _version_now(encounter_id: str):
+    # state_version уже поднят UPDATE'ом encounters в этой же транзакции
+    return (
+        select(Encounter.state_version)
+        .where(Encounter.id == encounter_id)
+        .scalar_subquery()
+    )
+
+
+def live_state_patch_stmt(
+    encounter_id: str,
+    prev_version: int,
+    save_id: int,
+    patch: StatePatch,
+    *,
+    append_events: Optional[List[Dict[str, Any]]] = None,
+):
+    """
+    UPDATE с jsonb-патчем (только Postgres). Сработает, лишь если в строке
+    документ версии prev_version — иначе rowcount == 0 и нужен полный upsert.
+    append_events=None — документ лёг на новый EncounterSave (save_id), pending
+    обнуляется; список — команда без снапшота, события дописываются в pending.
+    """
+    t = EncounterLiveState
+    values: Dict[str, Any] = {
+        "save_id": save_id,
+        "version": _version_now(encounter_id),
+    }
+
+    if patch.meta_set or patch.meta_removed:
+        meta = type_coerce(t.meta, JSONB)
+        if patch.meta_removed:
+            meta = meta.op("-")(_text_array(patch.meta_removed))
+        if patch.meta_set:
+            meta = meta.op("||")(_jsonb(patch.meta_set))
+        values["meta"] = meta
+
+    if patch.combatants_put or patch.combatants_removed or patch.combatant_fields:
+        comb = type_coerce(t.combatants, JSONB)
+        if patch.combatants_removed:
+            comb = comb.op("-")(_text_array(patch.combatants_removed))
+        if patch.combatants_put:
+            comb = comb.op("||")(_jsonb(patch.combatants_put))
+        for cid, fields in patch.combatant_fields.items():
+            for name, value in fields.items():
+                comb = func.jsonb_set(
+                    comb, _text_array([cid, name]), _jsonb(value), True, type_=JSONB
+                )
+        values["combatants"] = comb
+
+    if append_events is None:
+        values["pending_events"] = _jsonb([])
+        values["pending_commands"] = 0
+    else:
+        if append_events:
+            values["pending_events"] = type_coerce(t.pending_events, JSONB).op("||")(
+                _jsonb(append_events)
+            )
+        values["pending_commands"] = t.pending_commands + 1
+
+    return (
+        update(t)
+        .where(t.encounter_id == encounter_id, t.version == prev_version)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def live_state_upsert_stmt(
+    dialect: str,
+    encounter_id: str,
+    save_id: int,
+    state: Mapping[str, Any],
+    *,
+    pending_events: Sequence[Mapping[str, Any]] = (),
+    pending_commands: int = 0,
+):
+    """Полная запись документа (первая запись, рассинхрон, не-Postgres)."""
+    meta, combatants = split_state(state)
+    row = {
+        "encounter_id": encounter_id,
+        "save_id": save_id,
+        "version": _version_now(encounter_id),
+        "meta": meta,
+        "combatants": combatants,
+        "pending_events": list(pending_events),
+        "pending_commands": pending_commands,
+    }
+    make_insert = pg_insert if dialect == "postgresql" else sqlite_insert
+    stmt = make_insert(EncounterLiveState).values(**row)
+    return stmt.on_conflict_do_update(
+        index_elements=[EncounterLiveState.encounter_id],
+        set_={k: stmt.excluded[k] for k in row if k != "encounter_id"},
+    )
+
+
+def _dialect(db: Session | AsyncSession) -> str:
+    return db.get_bind().dialect.name
+
+
+def _write_plan(
+    dialect: str,
+    encounter_id: str,
+    save_id: int,
+    state: Mapping[str, Any],
+    prev: Optional[LiveDoc],
+    events: Sequence[Mapping[str, Any]],
+):
+    """(patch, patch_stmt | None, upsert_stmt) — общая часть sync/async записи."""
+    # save_id не сменился — EncounterSave не писали, события копятся в документе
+    appended = (
+        [dict(e) for e in events]
+        if prev is not None and save_id == prev.save_id
+        else None
+    )
+    patch = patch_stmt = None
+    if dialect == "postgresql" and prev is not None:
+        patch = diff_state(prev.state, state)
+        patch_stmt = live_state_patch_stmt(
+            encounter_id, prev.version, save_id, patch, append_events=appended
+        )
+    upsert = live_state_upsert_stmt(
+        dialect,
+        encounter_id,
+        save_id,
+        state,
+        pending_events=(prev.pending_events + appended) if appended is not None else (),
+        pending_commands=(prev.pending_commands + 1) if appended is not None else 0,
+    )
+    return patch, patch_stmt, upsert
+
+
+def write_live_state(
+    db: Session,
+    encounter_id: str,
+    save_id: int,
+    state: Mapping[str, Any],
+    *,
+    prev: Optional[LiveDoc] = None,
+    events: Sequence[Mapping[str, Any]] = (),
+) -> Optional[StatePatch]:
+    """
+    Пишет документ в транзакции вызывающего (commit — его дело), после
+    подъёма Encounter.state_version. prev — документ, из которого получен state:
+    если save_id тот же, events дописываются в pending_events.
+    Возвращает применённый патч или None, если документ записан целиком.
+    """
+    patch, patch_stmt, upsert = _write_plan(
+        _dialect(db), encounter_id, save_id, state, prev, events
+    )
+    if patch_stmt is not None and db.execute(patch_stmt).rowcount == 1:
+        return patch
+    db.execute(upsert)
+    return None
+
+
+async def write_live_state_async(
+    db: AsyncSession,
+    encounter_id: str,
+    save_id: int,
+    state: Mapping[str, Any],
+    *,
+    prev: Optional[LiveDoc] = None,
+    events: Sequence[Mapping[str, Any]] = (),
+) -> Optional[StatePatch]:
+    """Async-версия write_live_state."""
+    patch, patch_stmt, upsert = _write_plan(
+        _dialect(db), encounter_id, save_id, state, prev, events
+    )
+    if patch_stmt is not None and (await db.execute(patch_stmt)).rowcount == 1:
+        return patch
+    await db.execute(upsert)
+    return None
+
+
+def load_live_state(db: Session, encounter_id: str) -> Optional[LiveDoc]:
+    return decode_live_row(db.execute(live_doc_query(encounter_id)).first())
+
+
+async def load_live_state_async(
+    db: AsyncSession, encounter_id: str
+) -> Optional[LiveDoc]:
+    row = (await db.execute(live_doc_query(encounter_id))).first()
+    # json.loads документа — в threadpool, не в event loop
+    return await run_in_threadpool(decode_live_row, row)
+
+
+def encounters_with_condition(
+    db: Session, combatant_id: str, condition: str
+) -> List[str]:
+    """
+    id encounter'ов, где у комбатанта combatant_id есть condition
+    (например "unconscious"). На Postgres — @> по GIN-индексу;
+    на остальных диалектах — перебор документов в Python.
+    """
+    t = EncounterLiveState
+    if _dialect(db) == "postgresql":
+        probe = {combatant_id: {"conditions": [condition]}}
+        stmt = select(t.encounter_id).where(
+            type_coerce(t.combatants, JSONB).contains(probe)
+        )
+        return list(db.scalars(stmt).all())
+
+    out: List[str] = []
+    for encounter_id, combatants in db.execute(select(t.encounter_id, t.combatants)):
+        doc = (combatants or {}).get(combatant_id) or {}
+        if condition in (doc.get("conditions") or []):
+            out.append(encounter_id)
+    return out
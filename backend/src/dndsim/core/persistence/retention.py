@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from dndsim.db.models import EncounterSave
+
+log = logging.getLogger(__name__)
+
+# метки, которые runtime-роутер ставит сам (см. *Request.label в api/schemas.py);
+# всё остальное — сохранения, названные пользователем, их не трогаем
+AUTOSAVE_LABELS: FrozenSet[str] = frozenset({"init", "add", "add_bulk", "cmd", "batch"})
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """
+    Что остаётся после компакции снапшотов encounter'а:
+    - все сохранения с пользовательскими метками;
+    - последние keep_latest сохранений (любых) — последний снапшот не удаляется никогда;
+    - каждый keep_every_nth автосейв (по id, чтобы повторный прогон ничего не сдвигал).
+    """
+
+    keep_latest: int = 20
+    keep_every_nth: int = 50
+    autosave_labels: FrozenSet[str] = AUTOSAVE_LABELS
+
+    def __post_init__(self) -> None:
+        if self.keep_latest < 1:
+            raise ValueError("keep_latest must be >= 1")
+        if self.keep_every_nth < 1:
+            raise ValueError("keep_every_nth must be >= 1")
+
+    def is_removable(self, save_id: int, label: Optional[str]) -> bool:
+        """Только для сохранений старше последних keep_latest."""
+        return label in self.autosave_labels and save_id % self.keep_every_nth != 0
+
+
+@dataclass
+class CompactionReport:
+    encounters: int = 0
+    scanned: int = 0
+    deleted: int = 0
+    batches: int = 0
+    # сумма длин state_json + events_json удалённых строк (логический объём;
+    # файл SQLite отдаст место ОС только после VACUUM)
+    reclaimed_bytes: int = 0
+    per_encounter: Dict[str, int] = field(default_factory=dict)
+
+    def merge(self, other: "CompactionReport") -> None:
+        self.encounters += other.encounters
+        self.scanned += other.scanned
+        self.deleted += other.deleted
+        self.batches += other.batches
+        self.reclaimed_bytes += other.reclaimed_bytes
+        self.per_encounter.update(other.per_encounter)
+
+
+def _save_size():
+    # size_bytes пишется при сохранении; length() по blob'ам — только для старых
+    # строк без метаданных (COALESCE не вычисляет второй аргумент зря)
+    return func.coalesce(
+        EncounterSave.size_bytes,
+        func.coalesce(func.length(EncounterSave.state_json), 0)
+        + func.coalesce(func.length(EncounterSave.events_json), 0),
+    )
+
+
+def compact_encounter_saves(
+    db: Session,
+    encounter_id: str,
+    policy: RetentionPolicy,
+    *,
+    batch_size: int = 500,
+) -> CompactionReport:
+    """
+    Удаляет лишние автосейвы одного encounter'а. Идём от новых к старым
+    страницами по batch_size (keyset по id, в памяти — одна страница id/label/size),
+    удаление каждой страницы — своя короткая транзакция.
+    """
+    report = CompactionReport(encounters=1)
+    newest = db.scalars(
+        select(EncounterSave.id)
+        .where(EncounterSave.encounter_id == encounter_id)
+        .order_by(EncounterSave.id.desc())
+        .limit(policy.keep_latest)
+    ).all()
+    report.scanned = len(newest)
+    if len(newest) < policy.keep_latest:
+        report.per_encounter[encounter_id] = 0
+        return report
+
+    before = newest[-1]
+    while True:
+        rows = db.execute(
+            select(EncounterSave.id, EncounterSave.label, _save_size())
+            .where(
+                EncounterSave.encounter_id == encounter_id,
+                EncounterSave.id < before,
+            )
+            .order_by(EncounterSave.id.desc())
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        report.scanned += len(rows)
+        before = rows[-1][0]
+
+        victims = [
+            (int(sid), int(nbytes or 0))
+            for sid, label, nbytes in rows
+            if policy.is_removable(int(sid), label)
+        ]
+        if not victims:
+            continue
+        db.execute(
+            delete(EncounterSave).where(
+                EncounterSave.id.in_([sid for sid, _ in victims])
+            )
+        )
+        db.commit()
+        report.batches += 1
+        report.deleted += len(victims)
+        report.reclaimed_bytes += sum(nbytes for _, nbytes in victims)
+    report.per_encounter[encounter_id] = report.deleted
+    return report
+
+
+def compact_all_saves(
+    db: Session,
+    policy: RetentionPolicy,
+    *,
+    batch_size: int = 500,
+    max_encounters: Optional[int] = None,
+) -> CompactionReport:
+    """Компакция по всем encounter'ам, у которых сохранений больше keep_latest."""
+    stmt = (
+        select(EncounterSave.encounter_id)
+        .group_by(EncounterSave.encounter_id)
+        .having(func.count() > policy.keep_latest)
+    )
+    if max_encounters is not None:
+        stmt = stmt.limit(max_encounters)
+    report = CompactionReport()
+    for encounter_id in db.scalars(stmt).all():
+        report.merge(
+            compact_encounter_saves(db, encounter_id, policy, batch_size=batch_size)
+        )
+    return report
+
+
+class SnapshotCompactor:
+    """
+    Фоновая компакция: раз в interval_s прогоняет compact_all_saves в потоке
+    (sync Session), не блокируя event loop. Запускается из lifespan приложения.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        policy: RetentionPolicy,
+        *,
+        interval_s: float = 3600.0,
+        batch_size: int = 500,
+    ) -> None:
+        self.session_factory = session_factory
+        self.policy = policy
+        self.interval_s = interval_s
+        self.batch_size = batch_size
+        self.last_report: Optional[CompactionReport] = None
+
+    def run_once(self) -> CompactionReport:
+        with self.session_factory() as db:
+            report = compact_all_saves(db, self.policy, batch_size=self.batch_size)
+        self.last_report = report
+        if report.deleted:
+            log.info(
+                "snapshot compaction: deleted %d saves in %d encounters, ~%d bytes",
+                report.deleted,
+                report.encounters,
+                report.reclaimed_bytes,
+            )
+        return report
+
+    async def run_forever(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.run_once)
+            except Exception:
+                log.exception("snapshot compaction failed")
+            await asyncio.sleep(self.interval_s)
@@ -1,9 +1,19 @@
 from __future__ import annotations
 
+import copy
 import json
 import uuid
 from dataclasses import asdict, is_dataclass
-from typing import Any, Dict, List, Tuple, Optional
+from typing import Any, Dict, List, Mapping, Sequence, Tuple, Optional
+from dndsim.core.persistence.live_state import (
+    LiveDoc,
+    decode_live_row,
+    live_doc_query,
+    load_live_state,
+    write_live_state,
+    write_live_state_async,
+)
+from dndsim.core.persistence.retention import AUTOSAVE_LABELS
 from dndsim.core.persistence.state_codec import (
     encounter_state_to_dict,
     encounter_state_from_dict,
@@ -12,8 +22,10 @@ from dndsim.core.persistence.state_codec import (
 from dndsim.db.models import EncounterSave
 
 from fastapi import APIRouter, Depends, HTTPException
-from pydantic import TypeAdapter
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, undefer
 
 from dndsim.api.schemas import (  # type: ignore
     AddCombatantRequest,
@@ -23,31 +35,76 @@ from dndsim.api.schemas import (  # type: ignore
     GetEncounterStateResponse,
 )
 from dndsim.core.adapters.mapper import combatant_from_creature  # type: ignore
-from dndsim.core.engine.commands import Command
+from dndsim.core.engine.commands import parse_command
+from dndsim.core.engine.events import materialize_events
 from dndsim.core.engine.rules.apply import apply_command as engine_apply
 
 
 from dndsim.db.deps import get_db  # type: ignore
 from dndsim.db.models import Creature, Encounter  # type: ignore
+from dndsim.db.settings import get_db_settings
 
 router = APIRouter(prefix="/encounters", tags=["encounter-runtime"])
 
 
-def load_latest_snapshot(
-    db: Session, encounter_id: int
-) -> Tuple[Optional[int], Any, List[Dict[str, Any]]]:
+class SnapshotConflict(Exception):
     """
-    Загружает последний снимок состояния для encounter_id.
-    Возвращает (save_id, state_obj, events_list).
+    Снапшот encounter'а успели перезаписать между load и save
+    (state_version не совпал с ожидаемым). Нужно перечитать state и повторить.
     """
-    # Получение последнего сохранения из базы данных
-    row: EncounterSave = (
-        db.query(EncounterSave)
-        .filter(EncounterSave.encounter_id == encounter_id)
+
+    def __init__(self, encounter_id: str, expected_version: int) -> None:
+        super().__init__(
+            f"Encounter {encounter_id} changed concurrently "
+            f"(expected state_version={expected_version})"
+        )
+        self.encounter_id = encounter_id
+        self.expected_version = expected_version
+
+
+def _bump_version_stmt(
+    encounter_id: str, expected_version: Optional[int], latest_save_id: Optional[int]
+):
+    # версия и указатель на последний снапшот — одним UPDATE, в той же транзакции,
+    # что и INSERT снапшота: либо оба видны, либо ни одного.
+    # latest_save_id=None — команда без EncounterSave (live state), только версия
+    values: Dict[str, Any] = {"state_version": Encounter.state_version + 1}
+    if latest_save_id is not None:
+        values["latest_save_id"] = latest_save_id
+    stmt = update(Encounter).where(Encounter.id == encounter_id).values(**values)
+    if expected_version is not None:
+        stmt = stmt.where(Encounter.state_version == expected_version)
+    return stmt.execution_options(synchronize_session=False)
+
+
+def _latest_save_query(encounter_id: str):
+    """Горячий путь: Encounter.latest_save_id -> EncounterSave, два поиска по PK."""
+    return (
+        select(EncounterSave)
+        .join(Encounter, Encounter.latest_save_id == EncounterSave.id)
+        .where(Encounter.id == encounter_id)
+        # async-сессия не умеет лениво догружать deferred-колонки
+        .options(undefer(EncounterSave.state_json))
+    )
+
+
+def _latest_save_fallback_query(encounter_id: str):
+    """
+    Для encounter'ов без указателя (строки, записанные до latest_save_id):
+    последний по id, через ix_encounter_saves_listing (encounter_id, id, ...).
+    """
+    return (
+        select(EncounterSave)
+        .where(EncounterSave.encounter_id == encounter_id)
         .order_by(EncounterSave.id.desc())
-        .first()
+        .limit(1)
+        .options(undefer(EncounterSave.state_json))
     )
 
+
+def _decode_snapshot_row(
+    row: Optional[EncounterSave],
+) -> Tuple[Optional[int], Any, List[Dict[str, Any]]]:
     if not row:
         return None, None, []
 
@@ -62,37 +119,239 @@ def load_latest_snapshot(
     return row.id, state_obj, events
 
 
+def snapshot_meta(
+    state: Mapping[str, Any],
+    events: Sequence[Mapping[str, Any]],
+    *,
+    state_json: str,
+    events_json: str,
+    schema_version: int = 1,
+) -> Dict[str, Any]:
+    """
+    Колонки-метаданные EncounterSave, чтобы список сохранений не разбирал blob'ы.
+    json.dumps по умолчанию ensure_ascii, так что длина строки == размер в байтах.
+    """
+    seqs = [e["seq"] for e in events if isinstance(e.get("seq"), int)]
+    round_ = state.get("round") if isinstance(state, Mapping) else None
+    return {
+        "schema_version": int(schema_version),
+        "size_bytes": len(state_json) + len(events_json),
+        "seq_from": min(seqs, default=None),
+        "seq_to": max(seqs, default=None),
+        "round": round_ if isinstance(round_, int) else None,
+    }
+
+
+def live_state_enabled() -> bool:
+    return get_db_settings().live_state
+
+
+def _needs_history(label: str, live: Optional[LiveDoc]) -> bool:
+    """
+    Писать ли полный EncounterSave. С live state источник правды — документ,
+    а история — автосейв раз в live_state_history_every команд; снапшоты с
+    пользовательской меткой и первая запись (документа ещё нет) — всегда.
+    """
+    if live is None or label not in AUTOSAVE_LABELS:
+        return True
+    return live.pending_commands + 1 >= get_db_settings().live_state_history_every
+
+
+def _decode_live_snapshot(row: Any) -> Optional[Tuple[LiveDoc, Any]]:
+    doc = decode_live_row(row)
+    if doc is None:
+        return None
+    # документ разбираем один раз; encounter_state_from_dict забирает ключи и
+    # делит вложенные списки с dict'ом, а doc.state — это prev для патча
+    return doc, encounter_state_from_dict(copy.deepcopy(doc.state))
+
+
+def _encode_live(
+    state: Any, events_delta: Sequence[Mapping[str, Any]]
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    # события лягут в JSON-колонку pending_events: UUID -> str, как в events_json
+    events = json.loads(json.dumps(materialize_events(events_delta), default=str))
+    return encounter_state_to_dict(state), events
+
+
+def _encode_snapshot(
+    encounter_id: str,
+    label: str,
+    state: Any,
+    events_delta: Sequence[Mapping[str, Any]],
+    pending_events: Sequence[Mapping[str, Any]] = (),
+) -> Tuple[EncounterSave, Dict[str, Any]]:
+    # EventRecord из движка -> dict (json.dumps сам Mapping не умеет);
+    # pending_events — команды, прошедшие мимо истории (live state), идут первыми
+    events_delta = [*pending_events, *materialize_events(events_delta)]
+    state_dict = encounter_state_to_dict(state)
+    # Сериализация состояния и событий (default=str: event_id/roll_id — UUID)
+    raw_state = json.dumps({"state": state_dict, "events": events_delta}, default=str)
+    raw_events = json.dumps(events_delta, default=str)
+
+    save = EncounterSave(
+        encounter_id=encounter_id,
+        label=label,
+        state_json=raw_state,  # Сериализованное состояние
+        events_json=raw_events,  # Сериализованные события
+        **snapshot_meta(
+            state_dict, events_delta, state_json=raw_state, events_json=raw_events
+        ),
+    )
+    return save, state_dict
+
+
+def load_latest_snapshot(
+    db: Session, encounter_id: str
+) -> Tuple[Optional[int], Any, List[Dict[str, Any]]]:
+    """
+    Загружает последний снимок состояния для encounter_id.
+    Возвращает (save_id, state_obj, events_list).
+    С live state — из актуального документа encounter_live_state (save_id —
+    последний EncounterSave, events — ещё не попавшие в историю).
+    """
+    if live_state_enabled():
+        live = _decode_live_snapshot(db.execute(live_doc_query(encounter_id)).first())
+        if live is not None:
+            doc, state_obj = live
+            return doc.save_id, state_obj, doc.pending_events
+    row = db.execute(_latest_save_query(encounter_id)).scalars().first()
+    if row is None:
+        row = db.execute(_latest_save_fallback_query(encounter_id)).scalars().first()
+    return _decode_snapshot_row(row)
+
+
 def save_snapshot(
     db: Session,
-    encounter_id: int,
+    encounter_id: str,
     label: str,
     state: Any,
     events_delta: List[Dict[str, Any]],
+    expected_version: Optional[int] = None,
+    *,
+    live: Optional[LiveDoc] = None,
 ) -> EncounterSave:
     """
-    Сохраняет текущий снимок состояния в базе данных.
+    Сохраняет текущий снимок состояния в базе данных (всегда полный EncounterSave).
+    Если задан expected_version — compare-and-swap по Encounter.state_version:
+    при несовпадении ничего не пишем и бросаем SnapshotConflict.
+    С live state документ перезаписывается поверх нового снапшота, а его
+    pending_events уходят в events_json (live — документ, из которого получен
+    state; если не передан, читаем сами).
     """
-    # Сериализация состояния и событий
-    raw_state = json.dumps(
-        {"state": encounter_state_to_dict(state), "events": events_delta}
-    )
-
-    # Создание записи в таблице EncounterSave
-    save = EncounterSave(
-        encounter_id=encounter_id,
-        label=label,
-        state_json=raw_state,  # Сериализованное состояние
-        events_json=json.dumps(events_delta),  # Сериализованные события
+    enabled = live_state_enabled()
+    if enabled and live is None:
+        live = load_live_state(db, encounter_id)
+    save, state_dict = _encode_snapshot(
+        encounter_id,
+        label,
+        state,
+        events_delta,
+        live.pending_events if enabled and live is not None else (),
     )
 
-    # Добавление записи в базу данных
     db.add(save)
+    db.flush()  # нужен save.id для latest_save_id
+    res = db.execute(_bump_version_stmt(encounter_id, expected_version, save.id))
+    if expected_version is not None and res.rowcount == 0:
+        db.rollback()
+        raise SnapshotConflict(encounter_id, expected_version)
+
+    if enabled:
+        write_live_state(db, encounter_id, save.id, state_dict, prev=live)
     db.commit()
     db.refresh(save)
 
     return save
 
 
+async def _load_history_snapshot_async(
+    db: AsyncSession, encounter_id: str
+) -> Tuple[Optional[int], Any, List[Dict[str, Any]]]:
+    row = (await db.execute(_latest_save_query(encounter_id))).scalars().first()
+    if row is None:
+        row = (
+            (await db.execute(_latest_save_fallback_query(encounter_id)))
+            .scalars()
+            .first()
+        )
+    # json.loads + сборка EncounterState — в threadpool, не в event loop
+    return await run_in_threadpool(_decode_snapshot_row, row)
+
+
+async def load_live_snapshot_async(
+    db: AsyncSession, encounter_id: str
+) -> Optional[Tuple[LiveDoc, Any]]:
+    """(документ, state_obj) из encounter_live_state или None, если он не актуален."""
+    row = (await db.execute(live_doc_query(encounter_id))).first()
+    return await run_in_threadpool(_decode_live_snapshot, row)
+
+
+async def load_latest_snapshot_async(
+    db: AsyncSession, encounter_id: str
+) -> Tuple[Optional[int], Any, List[Dict[str, Any]]]:
+    """Async-версия load_latest_snapshot (для роутеров на AsyncSession)."""
+    if live_state_enabled():
+        live = await load_live_snapshot_async(db, encounter_id)
+        if live is not None:
+            doc, state_obj = live
+            return doc.save_id, state_obj, doc.pending_events
+    return await _load_history_snapshot_async(db, encounter_id)
+
+
+async def save_snapshot_async(
+    db: AsyncSession,
+    encounter_id: str,
+    label: str,
+    state: Any,
+    events_delta: List[Dict[str, Any]],
+    expected_version: Optional[int] = None,
+    *,
+    live: Optional[LiveDoc] = None,
+) -> Tuple[int, Dict[str, Any]]:
+    """
+    Async-версия save_snapshot (тот же compare-and-swap по expected_version).
+    С live state и live — документом, из которого получен state, — обычная
+    команда пишет только документ (патч) и версию, без EncounterSave;
+    когда писать историю, решает _needs_history.
+    Возвращает (save_id, encounter_state_to_dict(state)); save_id — последний
+    EncounterSave, на который лёг документ.
+    """
+    enabled = live_state_enabled()
+    events: List[Dict[str, Any]] = []
+    if enabled and not _needs_history(label, live):
+        assert live is not None
+        state_dict, events = await run_in_threadpool(_encode_live, state, events_delta)
+        save_id = live.save_id
+        res = await db.execute(_bump_version_stmt(encounter_id, expected_version, None))
+    else:
+        save, state_dict = await run_in_threadpool(
+            _encode_snapshot,
+            encounter_id,
+            label,
+            state,
+            events_delta,
+            live.pending_events if enabled and live is not None else (),
+        )
+        db.add(save)
+        await db.flush()
+        # id — первичный ключ, он уже есть после flush; created_at нам здесь не нужен
+        save_id = save.id
+        res = await db.execute(
+            _bump_version_stmt(encounter_id, expected_version, save_id)
+        )
+    if expected_version is not None and res.rowcount == 0:
+        await db.rollback()
+        raise SnapshotConflict(encounter_id, expected_version)
+
+    if enabled:
+        await write_live_state_async(
+            db, encounter_id, save_id, state_dict, prev=live, events=events
+        )
+    await db.commit()
+    return save_id, state_dict
+
+
 def _safe_dict(obj: Any) -> Dict[str, Any]:
     """
     Аккуратно превращает объект в dict (для событий/ORM fallback),
@@ -296,7 +555,7 @@ def apply_command(
         )
 
     try:
-        cmd_obj = TypeAdapter(Command).validate_python(req.command)
+        cmd_obj = parse_command(req.command)
         new_state, events_delta = engine_apply(state_obj, cmd_obj)
     except Exception as e:
         raise HTTPException(status_code=422, detail=f"Command apply failed: {e}")
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import inspect
+from random import Random
 from dataclasses import asdict, is_dataclass
 from types import SimpleNamespace
 from typing import Any, Dict, List, Mapping, Optional, Tuple, Type, TypeVar, cast
@@ -9,6 +10,7 @@ from dndsim.core.engine.state import (
     EncounterState,
     CombatantState,
     ReactionWindow,
+    EffectRef,
     Pos,
     # ниже классы могут существовать в вашем state.py; если вдруг их нет — код всё равно не упадёт
 )
@@ -140,6 +142,11 @@ def combatant_from_dict(d: dict[str, Any]) -> CombatantState:
     dd["spell_slots_current"] = _int_key_dict(dd.get("spell_slots_current"))
     dd["spell_slots_max"] = _int_key_dict(dd.get("spell_slots_max"))
 
+    # концентрация: движок читает .effect_name (в т.ч. при истечении эффектов)
+    conc = dd.get("concentration")
+    if isinstance(conc, dict):
+        dd["concentration"] = _build_model(EffectRef, conc)
+
     # attacks/multiattacks оставляем как dict-структуры — CombatantState сам примет/отфильтрует через _build_model
     return _build_model(CombatantState, dd)
 
@@ -165,6 +172,10 @@ def encounter_state_to_dict(state: EncounterState) -> dict[str, Any]:
     """
     base = cast(dict[str, Any], _jsonable(state))
 
+    # сам Random в JSON не нужен (fallback _jsonable выдаёт мусорный dict),
+    # восстанавливается из rng_state
+    base.pop("rng", None)
+
     # rng state (чтобы броски продолжались корректно)
     rng = getattr(state, "rng", None)
     if rng is not None:
@@ -219,18 +230,25 @@ def encounter_state_from_dict(d: dict[str, Any]) -> EncounterState:
 
     # initiative structures обычно простые dict/list — оставляем как есть
 
+    # старые снапшоты хранили "rng" как dict — в конструктор его не пускаем,
+    # иначе state.rng перестаёт быть Random
+    dd.pop("rng", None)
+    rng_state = dd.pop("rng_state", None)
+
     # build EncounterState
     st = _build_model(EncounterState, dd)
 
-    # restore rng state
-    rng_state = dd.get("rng_state")
-    rng = getattr(st, "rng", None)
-    if rng_state is not None and rng is not None:
-        setstate = getattr(rng, "setstate", None)
-        if callable(setstate):
-            try:
-                setstate(rng_state)
-            except Exception:
-                pass
+    # restore rng state: после JSON это списки, Random.setstate ждёт кортежи
+    if rng_state is not None:
+        try:
+            st.rng = Random()
+            st.rng.setstate(_rng_state_from_json(rng_state))
+        except (TypeError, ValueError):
+            st.rng = Random(st.rng_seed)
 
     return st
+
+
+def _rng_state_from_json(v: Any) -> tuple[Any, ...]:
+    version, internal, gauss_next = v
+    return (int(version), tuple(int(x) for x in internal), gauss_next)
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from functools import lru_cache
+
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from .settings import engine_kwargs, get_db_settings, to_async_url
+from .sqlite import configure_sqlite
+
+
+@lru_cache
+def get_async_engine() -> AsyncEngine:
+    # лениво: драйвер (aiosqlite / psycopg) импортируется только при первом обращении
+    settings = get_db_settings()
+    url = settings.async_url or to_async_url(settings.url)
+    engine = create_async_engine(url, **engine_kwargs(settings, url))
+    configure_sqlite(engine, settings, url)
+    return engine
+
+
+@lru_cache
+def get_async_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        bind=get_async_engine(), autoflush=False, expire_on_commit=False
+    )
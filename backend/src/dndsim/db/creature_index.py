@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import re
+from typing import Any, List, Optional, Tuple
+
+# Производные поля существа для поиска в SQL (колонки creatures + creature_traits).
+# Считаются из data_json при каждой записи; сам data_json остаётся источником правды.
+
+# эталон для рейтингов: "средний" противник 5e
+REF_AC = 15
+REF_TO_HIT = 5
+
+TRAIT_KINDS = {
+    "damage_immunities": "immunity",
+    "damage_resistances": "resistance",
+    "damage_vulnerabilities": "vulnerability",
+}
+
+_DICE_RE = re.compile(r"^\s*(\d+)\s*d\s*(\d+)\s*([+-]\s*\d+)?\s*$", re.IGNORECASE)
+
+
+def _int_or_none(v: Any) -> Optional[int]:
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _avg_damage(formula: Any) -> float:
+    m = _DICE_RE.match(str(formula or ""))
+    if not m:
+        return 0.0
+    n, d = int(m.group(1)), int(m.group(2))
+    k = int(m.group(3).replace(" ", "")) if m.group(3) else 0
+    return max(0.0, n * (d + 1) / 2 + k)
+
+
+def _p_hit(to_hit: int, ac: int) -> float:
+    # d20 + to_hit >= ac; nat 1 — всегда промах, nat 20 — всегда попадание
+    return min(0.95, max(0.05, (21 + to_hit - ac) / 20))
+
+
+def _attacks(d: dict) -> List[dict]:
+    # CreatureData хранит dict name -> attack, старые записи — список
+    raw = d.get("attacks") or {}
+    if isinstance(raw, dict):
+        raw = list(raw.values())
+    if not isinstance(raw, list):
+        return []
+    return [a for a in raw if isinstance(a, dict)]
+
+
+def _max_slot_level(d: dict) -> int:
+    sc = d.get("spellcasting")
+    if not isinstance(sc, dict):
+        return 0
+    slots = sc.get("spell_slots_max") or {}
+    levels = [
+        lvl
+        for lvl, cnt in ((_int_or_none(k), _int_or_none(v)) for k, v in slots.items())
+        if lvl is not None and cnt
+    ]
+    return max(levels, default=0)
+
+
+def creature_summary(data: Any) -> dict[str, Any]:
+    """
+    Колонки-сводка из data_json: по ним фильтруется и сортируется каталог,
+    не разбирая JSON. Пустые/кривые значения -> None.
+
+    offense_rating — ожидаемый урон за Attack action по AC 15,
+    defense_rating — сколько урона выдержит против атак с +5 (hp / шанс попадания).
+    """
+    d = data if isinstance(data, dict) else {}
+    ac = _int_or_none(d.get("ac"))
+    hp_max = _int_or_none(d.get("hp_max"))
+    attacks = _attacks(d)
+    per_action = _int_or_none(d.get("attacks_per_action")) or 1
+
+    best = max(
+        (
+            _avg_damage(a.get("damage_formula"))
+            * _p_hit(_int_or_none(a.get("to_hit_bonus")) or 0, REF_AC)
+            for a in attacks
+        ),
+        default=0.0,
+    )
+    defense = None
+    if hp_max is not None and ac is not None:
+        defense = round(hp_max / _p_hit(REF_TO_HIT, ac), 1)
+
+    return {
+        "ac": ac,
+        "hp_max": hp_max,
+        "is_player_character": bool(d.get("is_player_character", False)),
+        "speed_ft": _int_or_none(d.get("speed_ft")),
+        "max_slot_level": _max_slot_level(d),
+        "attack_count": len(attacks),
+        "offense_rating": round(best * per_action, 2),
+        "defense_rating": defense,
+    }
+
+
+def creature_traits(data: Any) -> List[Tuple[str, str]]:
+    """(kind, value) для creature_traits: immunity/resistance/vulnerability по типу урона."""
+    d = data if isinstance(data, dict) else {}
+    out: set[Tuple[str, str]] = set()
+    for key, kind in TRAIT_KINDS.items():
+        for v in d.get(key) or []:
+            if isinstance(v, str) and v.strip():
+                out.add((kind, v.strip().lower()))
+    return sorted(out)
@@ -3,19 +3,27 @@ from __future__ import annotations
 import uuid
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, String, func
-from sqlalchemy.orm import Mapped, mapped_column
+from typing import Any, Optional
+
+from sqlalchemy import Boolean, DateTime, Float, ForeignKey, Index, String, func
+from sqlalchemy.orm import Mapped, deferred, mapped_column, validates
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.types import JSON
 
 from sqlalchemy import Column, Integer, Text
 from sqlalchemy.orm import relationship
 from .base import Base
+from .creature_index import creature_summary, creature_traits
 
 
 def _uuid() -> str:
     return str(uuid.uuid4())
 
 
+# JSONB на Postgres (GIN, jsonb_set), обычный JSON везде ещё
+JSONDoc = JSON().with_variant(JSONB(), "postgresql")
+
+
 class Creature(Base):
     __tablename__ = "creatures"
 
@@ -25,6 +33,31 @@ class Creature(Base):
     # всё содержимое существа (ac/hp/attacks/spellcasting/...) кладём сюда
     data_json: Mapped[dict] = mapped_column(JSON, nullable=False)
 
+    # сводка из data_json (см. creature_summary), обновляется при присваивании data_json
+    ac: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, index=True)
+    hp_max: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, index=True)
+    is_player_character: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=False, server_default="0", index=True
+    )
+    speed_ft: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, index=True)
+    max_slot_level: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0", index=True
+    )
+    attack_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    offense_rating: Mapped[float] = mapped_column(
+        Float, nullable=False, default=0.0, server_default="0", index=True
+    )
+    defense_rating: Mapped[Optional[float]] = mapped_column(
+        Float, nullable=True, index=True
+    )
+
+    # иммунитеты/сопротивления/уязвимости — строками, чтобы искать по индексу
+    traits = relationship(
+        "CreatureTrait", cascade="all, delete-orphan", passive_deletes=True
+    )
+
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
@@ -35,6 +68,29 @@ class Creature(Base):
         nullable=False,
     )
 
+    @validates("data_json")
+    def _sync_summary(self, _key: str, value: Any) -> Any:
+        for k, v in creature_summary(value).items():
+            setattr(self, k, v)
+        self.traits = [
+            CreatureTrait(kind=kind, value=v) for kind, v in creature_traits(value)
+        ]
+        return value
+
+
+class CreatureTrait(Base):
+    """Производная от Creature.data_json: одна строка на (kind, тип урона)."""
+
+    __tablename__ = "creature_traits"
+
+    creature_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("creatures.id", ondelete="CASCADE"), primary_key=True
+    )
+    kind: Mapped[str] = mapped_column(String(16), primary_key=True)
+    value: Mapped[str] = mapped_column(String(64), primary_key=True)
+
+    __table_args__ = (Index("ix_creature_traits_kind_value", "kind", "value"),)
+
 
 class Encounter(Base):
     __tablename__ = "encounters"
@@ -42,6 +98,15 @@ class Encounter(Base):
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=_uuid)
     name: Mapped[str] = mapped_column(String(200), nullable=False, index=True)
 
+    # растёт на каждый runtime-снапшот; save_snapshot делает compare-and-swap по нему
+    state_version: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    # id последнего EncounterSave; пишется в одной транзакции со снапшотом.
+    # Без FK: иначе encounters <-> encounter_saves ссылаются друг на друга.
+    # NULL — снапшотов нет или они старше этой колонки (тогда ищем по индексу).
+    latest_save_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
@@ -52,15 +117,79 @@ class Encounter(Base):
         nullable=False,
     )
 
+    saves = relationship("EncounterSave", back_populates="encounter")
+
 
 class EncounterSave(Base):
     __tablename__ = "encounter_saves"
 
     id = Column(Integer, primary_key=True)
-    encounter_id = Column(Integer, ForeignKey("encounter.id"))
+    encounter_id = Column(String(36), ForeignKey("encounters.id"))
     label = Column(String, nullable=True)
-    state_json = Column(Text, nullable=False)  # хранение сериализованного состояния
-    events_json = Column(Text, nullable=False)  # хранение списка событий
+    # blob'ы грузятся только по явному undefer(): списки/компакция их не читают
+    state_json = deferred(Column(Text, nullable=False))  # сериализованное состояние
+    events_json = deferred(Column(Text, nullable=False))  # список событий
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # метаданные снапшота, считаются при записи (runtime_store.snapshot_meta)
+    schema_version = Column(Integer, nullable=False, default=1, server_default="1")
+    size_bytes = Column(Integer, nullable=True)  # len(state_json) + len(events_json)
+    seq_from = Column(Integer, nullable=True)  # диапазон seq событий этого снапшота
+    seq_to = Column(Integer, nullable=True)
+    round = Column(Integer, nullable=True)
+
     encounter = relationship("Encounter", back_populates="saves")
+
+    # покрывающий индекс для списка сохранений: всё, что отдаёт GET .../saves,
+    # лежит в индексе, таблицу с blob'ами читать не нужно
+    __table_args__ = (
+        Index(
+            "ix_encounter_saves_listing",
+            "encounter_id",
+            "id",
+            "label",
+            "schema_version",
+            "size_bytes",
+            "seq_from",
+            "seq_to",
+            "round",
+            "created_at",
+        ),
+    )
+
+
+class EncounterLiveState(Base):
+    """
+    Текущее состояние encounter'а документом: combatants — по поддокументу на
+    комбатанта, meta — всё остальное из encounter_state_to_dict.
+    При включённом live state это источник правды для runtime: команды читают
+    документ и пишут сюда патч (на Postgres — jsonb_set только изменённых полей,
+    см. core/persistence/live_state.py), а полный EncounterSave — раз в
+    live_state_history_every команд.
+    """
+
+    __tablename__ = "encounter_live_state"
+
+    encounter_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("encounters.id", ondelete="CASCADE"), primary_key=True
+    )
+    # последний исторический EncounterSave; документ новее его на pending_commands команд
+    save_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Encounter.state_version на момент записи: документ читается, только пока
+    # версия совпадает (иначе его обошла запись мимо live state, например POST /saves)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    meta: Mapped[dict] = mapped_column(JSONDoc, nullable=False, default=dict)
+    combatants: Mapped[dict] = mapped_column(JSONDoc, nullable=False, default=dict)
+    # события команд после save_id — уйдут в events_json следующего EncounterSave
+    pending_events: Mapped[list] = mapped_column(JSONDoc, nullable=False, default=list)
+    pending_commands: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # "где комбатант X без сознания": combatants @> '{"X": {"conditions": [...]}}'
+    __table_args__ = (
+        Index(
+            "ix_encounter_live_state_combatants",
+            "combatants",
+            postgresql_using="gin",
+            postgresql_ops={"combatants": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
@@ -3,13 +3,18 @@ from __future__ import annotations
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
-# MVP: SQLite файл рядом с проектом; потом вынесем в env
-DATABASE_URL = "sqlite:///./dndsim.sqlite3"
+from .settings import engine_kwargs, get_db_settings
+from .sqlite import configure_sqlite
+
+_settings = get_db_settings()
+
+DATABASE_URL = _settings.url
 
 engine = create_engine(
     DATABASE_URL,
-    echo=False,
     future=True,
+    **engine_kwargs(_settings, DATABASE_URL),
 )
+configure_sqlite(engine, _settings, DATABASE_URL)
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
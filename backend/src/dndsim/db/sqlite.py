@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from typing import Any, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .settings import DatabaseSettings, is_sqlite_memory
+
+
+def sqlite_pragmas(settings: DatabaseSettings, url: str) -> List[str]:
+    """PRAGMA для нового соединения по профилю settings.sqlite_profile."""
+    if not url.startswith("sqlite") or settings.sqlite_profile == "default":
+        return []
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(settings.sqlite_busy_timeout_ms)}",
+        f"PRAGMA synchronous = {settings.sqlite_synchronous.upper()}",
+        # отрицательное значение — размер в KiB, а не в страницах
+        f"PRAGMA cache_size = -{int(settings.sqlite_cache_size_kib)}",
+    ]
+    if not is_sqlite_memory(url):
+        # у :memory: нет файла: ни WAL, ни mmap
+        pragmas.insert(
+            0, f"PRAGMA journal_mode = {settings.sqlite_journal_mode.upper()}"
+        )
+        pragmas.append(f"PRAGMA mmap_size = {int(settings.sqlite_mmap_size)}")
+    return pragmas
+
+
+def configure_sqlite(
+    engine: Engine | AsyncEngine, settings: DatabaseSettings, url: str
+) -> None:
+    """Вешает PRAGMA на connect-событие (и для sync, и для aiosqlite-движка)."""
+    pragmas = sqlite_pragmas(settings, url)
+    if not pragmas:
+        return
+    target = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+
+    @event.listens_for(target, "connect")
+    def _set_pragmas(dbapi_conn: Any, _record: Any) -> None:
+        cur = dbapi_conn.cursor()
+        try:
+            for pragma in pragmas:
+                cur.execute(pragma)
+        finally:
+            cur.close()
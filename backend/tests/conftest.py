@@ -3,28 +3,41 @@ from __future__ import annotations
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 
 from dndsim.api.main import app
 from dndsim.db.base import Base
 import dndsim.db.session as db_session
 import dndsim.db.init_db as db_init
-from dndsim.db.deps import get_db
+from dndsim.db.deps import get_db, get_async_db
 
 
 @pytest.fixture(scope="session")
-def engine():
-    # SQLite in-memory (один коннект на всю сессию тестов)
+def db_path(tmp_path_factory):
+    # SQLite файл во временной папке: его видят и sync, и async (aiosqlite) движки
+    return tmp_path_factory.mktemp("db") / "test.sqlite3"
+
+
+@pytest.fixture(scope="session")
+def engine(db_path):
     eng = create_engine(
-        "sqlite+pysqlite:///:memory:",
+        f"sqlite+pysqlite:///{db_path}",
         connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
         future=True,
     )
     return eng
 
 
+@pytest.fixture(scope="session")
+def TestingAsyncSessionLocal(db_path):
+    # NullPool: каждый TestClient живёт в своём event loop,
+    # соединения aiosqlite нельзя переносить между loop'ами
+    eng = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
+    return async_sessionmaker(bind=eng, autoflush=False, expire_on_commit=False)
+
+
 @pytest.fixture(scope="session")
 def TestingSessionLocal(engine):
     return sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
@@ -43,8 +56,18 @@ def _patch_db(engine, TestingSessionLocal):
     Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(autouse=True)
+def _clean_tables(engine):
+    # БД общая на сессию: чистим строки после каждого теста, чтобы
+    # списки (/creatures, /encounters, saves) не зависели от порядка тестов
+    yield
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+
+
 @pytest.fixture()
-def client(TestingSessionLocal):
+def client(TestingSessionLocal, TestingAsyncSessionLocal):
     def override_get_db():
         db = TestingSessionLocal()
         try:
@@ -52,7 +75,12 @@ def client(TestingSessionLocal):
         finally:
             db.close()
 
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
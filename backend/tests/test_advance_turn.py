@@ -0,0 +1,121 @@
+from dndsim.core.engine.commands import (
+    AdvanceTurn,
+    EndTurn,
+    FinalizeInitiative,
+    SetInitiative,
+    StartCombat,
+)
+from dndsim.core.engine.rules.apply import apply_command
+from dndsim.core.engine.state import CombatantState, EncounterState
+
+
+def _horde(*, skip_unconscious_npcs: bool = False) -> EncounterState:
+    state = EncounterState().with_seed(1)
+    state.skip_unconscious_npcs = skip_unconscious_npcs
+    state.combatants["hero"] = CombatantState(
+        id="hero",
+        name="Hero",
+        side="party",
+        ac=15,
+        hp_current=20,
+        hp_max=20,
+        is_player_character=True,
+    )
+    for cid, hp in (("g1", 7), ("g2", 7), ("g3", 0)):
+        state.combatants[cid] = CombatantState(
+            id=cid, name=cid, side="enemies", ac=10, hp_current=hp, hp_max=7
+        )
+    cmds = [StartCombat()]
+    for cid, ini in (("hero", 20), ("g2", 15), ("g3", 10), ("g1", 5)):
+        cmds.append(SetInitiative(combatant_id=cid, initiative=ini))
+    cmds.append(FinalizeInitiative())
+    for cmd in cmds:
+        state, _ = apply_command(state, cmd)
+    return state
+
+
+def _types(ev):
+    return [e["type"] for e in ev]
+
+
+def test_advance_turn_begins_first_turn_then_skips_dead():
+    state = _horde()
+    state.combatants["g2"].is_dead = True
+
+    state, ev = apply_command(state, AdvanceTurn())
+    assert _types(ev) == ["TurnStarted", "TurnResourcesReset"]
+    assert state.phase == "in_turn"
+    assert state.turn_owner_id == "hero"
+
+    state, ev = apply_command(state, AdvanceTurn(combatant_id="hero"))
+    assert _types(ev) == [
+        "TurnEnded",
+        "TurnSkipped",
+        "TurnStarted",
+        "TurnResourcesReset",
+    ]
+    assert ev[1]["payload"] == {"combatant_id": "g2", "reason": "dead"}
+    # NPC на 0 hp по умолчанию не пропускается
+    assert state.turn_owner_id == "g3"
+    assert state.turn_index == 2
+
+
+def test_skip_unconscious_npcs_and_round_wrap():
+    state = _horde(skip_unconscious_npcs=True)
+    state.combatants["g2"].is_dead = True
+
+    state, _ = apply_command(state, AdvanceTurn())
+    state, ev = apply_command(state, AdvanceTurn())
+    assert [e["payload"]["reason"] for e in ev if e["type"] == "TurnSkipped"] == [
+        "dead",
+        "unconscious",
+    ]
+    assert state.turn_owner_id == "g1"
+    assert state.round == 1
+
+    state, ev = apply_command(state, AdvanceTurn())
+    assert state.turn_owner_id == "hero"
+    assert state.turn_index == 0
+    assert state.round == 2
+
+
+def test_end_turn_skips_removed_combatant():
+    state = _horde()
+    state, _ = apply_command(state, AdvanceTurn())
+    del state.combatants["g2"]
+
+    state, ev = apply_command(state, EndTurn(combatant_id="hero"))
+    assert _types(ev) == ["TurnEnded", "TurnSkipped"]
+    assert ev[1]["payload"]["reason"] == "removed"
+    assert state.turn_owner_id == "g3"
+    assert state.phase == "idle"
+
+
+def test_advance_turn_skips_owner_who_died_between_turns():
+    state = _horde()
+    state.combatants["hero"].is_dead = True
+
+    state, ev = apply_command(state, AdvanceTurn())
+    assert _types(ev)[:2] == ["TurnSkipped", "TurnStarted"]
+    assert state.turn_owner_id == "g2"
+
+
+def test_turn_position_recovers_from_external_owner_change():
+    state = _horde()
+    # turn_owner_id выставлен мимо движка — указатель догоняет его
+    state.turn_owner_id = "g3"
+    assert state.turn_position() == 2
+    assert state.turn_index == 2
+
+
+def test_advance_turn_validation():
+    state = EncounterState()
+    state.combatants["a"] = CombatantState(
+        id="a", name="A", ac=10, hp_current=5, hp_max=5
+    )
+    state, ev = apply_command(state, AdvanceTurn())
+    assert ev[0]["payload"]["code"] == "INITIATIVE_NOT_FINALIZED"
+
+    state = _horde()
+    state, ev = apply_command(state, AdvanceTurn(combatant_id="g1"))
+    assert ev[0]["payload"]["code"] == "NOT_YOUR_TURN"
@@ -0,0 +1,104 @@
+def _creature(client, name, **data):
+    r = client.post("/creatures", json={"name": name, "data": data})
+    assert r.status_code == 200, r.text
+    return r.json()["id"]
+
+
+def test_add_bulk_stamps_combatants_in_one_save(client):
+    eid = client.post("/encounters", json={"name": "Horde"}).json()["id"]
+    init = client.post(f"/encounters/{eid}/state:init", json={"label": "init"}).json()
+    goblin = _creature(client, "Goblin", ac=15, hp_max=7)
+    ogre = _creature(client, "Ogre", ac=11, hp_max=59)
+
+    r = client.post(
+        f"/encounters/{eid}/combatants:add_bulk",
+        json={
+            "groups": [
+                {
+                    "creature_id": goblin,
+                    "count": 5,
+                    "side": "enemies",
+                    "id_prefix": "gob",
+                    "positions": [{"x": 1, "y": 1}, {"x": 2, "y": 1}],
+                },
+                {"creature_id": ogre, "count": 1, "side": "enemies"},
+            ]
+        },
+    )
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["save_id"] == init["save_id"] + 1
+
+    combatants = body["state"]["combatants"]
+    assert len(combatants) == 6
+    assert [combatants[f"gob{i}"]["hp_current"] for i in range(1, 6)] == [7] * 5
+    assert combatants["gob1"]["position"] == [1, 1]
+    assert combatants["gob2"]["position"] == [2, 1]
+    assert combatants["gob5"]["position"] == [0, 0]
+    [ogre_id] = [cid for cid in combatants if cid.startswith(f"{ogre}-")]
+    assert combatants[ogre_id]["hp_max"] == 59
+
+    assert [e["type"] for e in body["events_delta"]] == ["CombatantAdded"] * 6
+
+    # копии независимы: conditions не общие
+    client.post(
+        f"/encounters/{eid}/commands:apply",
+        json={
+            "command": {
+                "type": "ApplyCondition",
+                "target_id": "gob1",
+                "condition": "prone",
+            }
+        },
+    )
+    state = client.get(f"/encounters/{eid}/state").json()["state"]
+    assert state["combatants"]["gob1"]["conditions"] == ["prone"]
+    assert state["combatants"]["gob2"]["conditions"] == []
+
+    # повторное добавление продолжает нумерацию, а не перетирает
+    r = client.post(
+        f"/encounters/{eid}/combatants:add_bulk",
+        json={
+            "groups": [
+                {
+                    "creature_id": goblin,
+                    "count": 2,
+                    "side": "enemies",
+                    "id_prefix": "gob",
+                }
+            ]
+        },
+    )
+    assert r.status_code == 200, r.text
+    assert {"gob6", "gob7"} <= set(r.json()["state"]["combatants"])
+
+
+def test_add_bulk_errors(client):
+    eid = client.post("/encounters", json={"name": "Bad bulk"}).json()["id"]
+    client.post(f"/encounters/{eid}/state:init", json={"label": "init"})
+    goblin = _creature(client, "Goblin", ac=15, hp_max=7)
+
+    r = client.post(
+        f"/encounters/{eid}/combatants:add_bulk",
+        json={"groups": [{"creature_id": "nope", "side": "enemies"}]},
+    )
+    assert r.status_code == 404
+    assert r.json()["detail"]["ids"] == ["nope"]
+
+    r = client.post(
+        f"/encounters/{eid}/combatants:add_bulk",
+        json={
+            "groups": [
+                {
+                    "creature_id": goblin,
+                    "count": 1,
+                    "side": "enemies",
+                    "positions": [{"x": 0, "y": 0}, {"x": 1, "y": 0}],
+                }
+            ]
+        },
+    )
+    assert r.status_code == 422
+
+    r = client.post(f"/encounters/{eid}/combatants:add_bulk", json={"groups": []})
+    assert r.status_code == 422
@@ -0,0 +1,86 @@
+from sqlalchemy import select
+
+from dndsim.db.models import Creature
+
+
+def _mk(client, name, ac, hp, **extra):
+    r = client.post(
+        "/creatures", json={"name": name, "data": {"ac": ac, "hp_max": hp, **extra}}
+    )
+    assert r.status_code == 200, r.text
+    return r.json()["id"]
+
+
+def test_creature_page_keyset_and_summary(client):
+    for i, name in enumerate(["Orc", "Goblin", "Bugbear", "Goblin Boss", "Ogre"]):
+        _mk(client, name, 10 + i, 5 + 10 * i)
+
+    seen = []
+    after = None
+    while True:
+        params = {"limit": 2}
+        if after:
+            params["after"] = after
+        r = client.get("/creatures:page", params=params)
+        assert r.status_code == 200, r.text
+        page = r.json()
+        assert len(page["items"]) <= 2
+        seen += page["items"]
+        after = page["next_cursor"]
+        if after is None:
+            break
+
+    assert [c["name"] for c in seen] == [
+        "Bugbear",
+        "Goblin",
+        "Goblin Boss",
+        "Ogre",
+        "Orc",
+    ]
+    # summary: без data_json
+    assert set(seen[0]) == {
+        "id",
+        "name",
+        "ac",
+        "hp_max",
+        "is_player_character",
+        "speed_ft",
+        "max_slot_level",
+        "attack_count",
+        "offense_rating",
+        "defense_rating",
+        "updated_at",
+    }
+    assert seen[0]["ac"] == 12
+
+
+def test_creature_page_filters_and_full_view(client):
+    _mk(client, "Goblin", 15, 7)
+    _mk(client, "Goblin Boss", 17, 21)
+    _mk(client, "Hero", 18, 40, is_player_character=True)
+    _mk(client, "Ogre", 11, 59)
+
+    r = client.get("/creatures:page", params={"name": "Gob", "min_ac": 16})
+    assert [c["name"] for c in r.json()["items"]] == ["Goblin Boss"]
+
+    r = client.get(
+        "/creatures:page", params={"max_hp": 40, "is_player_character": False}
+    )
+    assert [c["name"] for c in r.json()["items"]] == ["Goblin", "Goblin Boss"]
+
+    r = client.get("/creatures:page", params={"view": "full", "min_hp": 50})
+    [ogre] = r.json()["items"]
+    assert ogre["data"]["hp_max"] == 59
+
+    assert client.get("/creatures:page", params={"after": "%%%"}).status_code == 422
+
+
+def test_summary_columns_follow_data_json(client, TestingSessionLocal):
+    cid = _mk(client, "Goblin", 15, 7)
+    client.patch(f"/creatures/{cid}", json={"data": {"ac": 13, "hp_max": 12}})
+
+    with TestingSessionLocal() as db:
+        row = db.execute(
+            select(Creature.ac, Creature.hp_max).where(Creature.id == cid)
+        ).one()
+    assert tuple(row) == (13, 12)
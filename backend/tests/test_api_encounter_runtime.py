@@ -0,0 +1,42 @@
+def test_runtime_init_add_combatant_apply_and_get_state(client):
+    r = client.post("/encounters", json={"name": "Runtime Encounter"})
+    assert r.status_code == 200, r.text
+    eid = r.json()["id"]
+
+    r = client.post(f"/encounters/{eid}/state:init", json={"label": "init"})
+    assert r.status_code == 200, r.text
+    init = r.json()
+    assert init["encounter_id"] == eid
+    assert init["state"]["combatants"] == {}
+
+    r = client.post(
+        "/creatures", json={"name": "Goblin", "data": {"ac": 15, "hp_max": 7}}
+    )
+    assert r.status_code == 200, r.text
+    creature_id = r.json()["id"]
+
+    r = client.post(
+        f"/encounters/{eid}/combatants:add",
+        json={"creature_id": creature_id, "side": "enemies", "combatant_id": "g1"},
+    )
+    assert r.status_code == 200, r.text
+    added = r.json()
+    assert added["save_id"] > init["save_id"]
+    assert added["events_delta"][0]["type"] == "CombatantAdded"
+
+    r = client.post(
+        f"/encounters/{eid}/commands:apply", json={"command": {"type": "StartCombat"}}
+    )
+    assert r.status_code == 200, r.text
+    assert [e["type"] for e in r.json()["events_delta"]] == ["CombatStarted"]
+
+    r = client.get(f"/encounters/{eid}/state")
+    assert r.status_code == 200, r.text
+    state = r.json()["state"]
+    assert state["phase"] == "setup_initiative"
+    assert state["combatants"]["g1"]["hp_current"] == 7
+
+
+def test_runtime_unknown_encounter_is_404(client):
+    r = client.get("/encounters/does-not-exist/state")
+    assert r.status_code == 404
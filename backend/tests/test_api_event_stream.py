@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+import httpx
+
+from dndsim.api.main import app
+
+
+async def _open_stream(path: str):
+    """
+    GET на SSE-ручку напрямую через ASGI: httpx/TestClient буферизуют тело
+    целиком, а поток бесконечный. Возвращает (очередь кусков тела, стоп, задачу).
+    """
+    chunks: asyncio.Queue = asyncio.Queue()
+    disconnect = asyncio.Event()
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            await chunks.put(("status", message["status"]))
+        elif message["type"] == "http.response.body" and message.get("body"):
+            await chunks.put(("body", message["body"].decode()))
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [(b"host", b"test")],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+    task = asyncio.create_task(app(scope, receive, send))
+    return chunks, disconnect, task
+
+
+async def _next_frame(chunks: asyncio.Queue, task: asyncio.Task, event: str) -> dict:
+    buf = ""
+    while True:
+        getter = asyncio.ensure_future(chunks.get())
+        done, _ = await asyncio.wait(
+            {getter, task}, timeout=5, return_when="FIRST_COMPLETED"
+        )
+        if getter not in done:
+            getter.cancel()
+            raise AssertionError(f"stream ended without {event!r} frame: {task!r}")
+        kind, value = getter.result()
+        if kind != "body":
+            continue
+        buf += value
+        while "\n\n" in buf:
+            frame, buf = buf.split("\n\n", 1)
+            fields = dict(
+                line.split(": ", 1) for line in frame.splitlines() if ": " in line
+            )
+            if fields.get("event") == event:
+                return json.loads(fields["data"])
+
+
+def test_stream_delivers_engine_events_with_uuids(client):
+    eid = client.post("/encounters", json={"name": "Stream"}).json()["id"]
+    client.post(f"/encounters/{eid}/state:init", json={"label": "init"})
+    goblin = client.post(
+        "/creatures", json={"name": "Goblin", "data": {"ac": 15, "hp_max": 7}}
+    ).json()["id"]
+    client.post(
+        f"/encounters/{eid}/combatants:add",
+        json={"creature_id": goblin, "side": "enemies", "combatant_id": "g1"},
+    )
+
+    async def scenario():
+        chunks, disconnect, task = await _open_stream(
+            f"/encounters/{eid}/events:stream"
+        )
+        assert await asyncio.wait_for(chunks.get(), timeout=5) == ("status", 200)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as cl:
+            r = await cl.post(
+                f"/encounters/{eid}/commands:apply",
+                json={"command": {"type": "StartCombat"}},
+            )
+            assert r.status_code == 200, r.text
+
+        msg = await _next_frame(chunks, task, "events")
+        disconnect.set()
+        await asyncio.wait_for(task, timeout=5)
+        return r.json(), msg
+
+    applied, msg = asyncio.run(scenario())
+    assert msg["save_id"] == applied["save_id"]
+    assert [e["type"] for e in msg["events"]] == ["CombatStarted"]
+    assert msg["events"][0]["event_id"] == applied["events_delta"][0]["event_id"]
+
+
+def test_stream_unknown_encounter_is_404(client):
+    assert client.get("/encounters/nope/events:stream").status_code == 404
@@ -0,0 +1,95 @@
+from dndsim.core.engine.state import EncounterState, CombatantState, AttackProfile
+from dndsim.core.engine.commands import BeginTurn, EndTurn, Move, Attack
+from dndsim.core.engine.rules.apply import apply_commands
+
+
+def _duel_state() -> EncounterState:
+    state = EncounterState().with_seed(1234)
+    state.combatants["A"] = CombatantState(
+        id="A",
+        name="A",
+        ac=13,
+        hp_current=20,
+        hp_max=20,
+        position=(0, 0),
+        attacks_per_action=2,
+        attacks={
+            "sword": AttackProfile(name="sword", to_hit_bonus=5, damage_formula="1d8+3")
+        },
+    )
+    state.combatants["B"] = CombatantState(
+        id="B",
+        name="B",
+        ac=13,
+        hp_current=50,
+        hp_max=50,
+        position=(1, 0),
+        attacks={
+            "claw": AttackProfile(name="claw", to_hit_bonus=5, damage_formula="1d8+3")
+        },
+    )
+    state.initiative_order = ["A", "B"]
+    state.turn_owner_id = "A"
+    return state
+
+
+def test_batch_runs_full_turn():
+    state = _duel_state()
+
+    state, ev, applied = apply_commands(
+        state,
+        [
+            BeginTurn(combatant_id="A"),
+            Attack(attacker_id="A", target_id="B", attack_name="sword"),
+            Attack(attacker_id="A", target_id="B", attack_name="sword"),
+            EndTurn(combatant_id="A"),
+        ],
+    )
+
+    assert applied == 4
+    types = [e["type"] for e in ev]
+    assert types[0] == "TurnStarted"
+    assert types.count("AttackRolled") == 2
+    assert types[-1] == "TurnEnded"
+    assert "CommandRejected" not in types
+    assert state.turn_owner_id == "B"
+    # seq монотонен по всей пачке
+    assert [e["seq"] for e in ev] == sorted(e["seq"] for e in ev)
+
+
+def test_batch_stops_at_first_rejection():
+    state = _duel_state()
+
+    state, ev, applied = apply_commands(
+        state,
+        [
+            BeginTurn(combatant_id="A"),
+            Attack(attacker_id="A", target_id="B", attack_name="nope"),
+            EndTurn(combatant_id="A"),
+        ],
+    )
+
+    assert applied == 1
+    assert ev[-1]["type"] == "CommandRejected"
+    assert ev[-1]["payload"]["code"] == "UNKNOWN_ATTACK"
+    # EndTurn не применялся
+    assert state.phase == "in_turn"
+    assert state.turn_owner_id == "A"
+
+
+def test_batch_stops_when_reaction_window_opens():
+    state = _duel_state()
+
+    state, ev, applied = apply_commands(
+        state,
+        [
+            BeginTurn(combatant_id="A"),
+            Move(mover_id="A", path=[(-1, 0), (-2, 0)]),
+            EndTurn(combatant_id="A"),
+        ],
+    )
+
+    assert applied == 2
+    assert ev[-1]["type"] == "MovementStopped"
+    assert state.reaction_window is not None
+    assert state.phase == "reaction_window"
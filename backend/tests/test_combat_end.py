@@ -0,0 +1,129 @@
+from dndsim.core.engine.commands import (
+    ApplyCondition,
+    Attack,
+    BeginTurn,
+    FinalizeInitiative,
+    Heal,
+    RollDeathSave,
+    SetInitiative,
+    Stabilize,
+    StartCombat,
+)
+from dndsim.core.engine.rules.apply import apply_command
+from dndsim.core.engine.state import AttackProfile, CombatantState, EncounterState
+
+
+def _fight(goblin_hp: int = 1, dying: tuple[str, ...] = ()) -> EncounterState:
+    state = EncounterState().with_seed(3)
+    for cid in dying:
+        state.combatants[cid] = CombatantState(
+            id=cid,
+            name=cid,
+            side="party",
+            ac=12,
+            hp_current=0,
+            hp_max=10,
+            is_player_character=True,
+            conditions={"unconscious"},
+            position=(0, 1),
+        )
+    state.combatants["hero"] = CombatantState(
+        id="hero",
+        name="Hero",
+        side="party",
+        ac=15,
+        hp_current=20,
+        hp_max=20,
+        is_player_character=True,
+        position=(0, 0),
+        attacks={
+            "axe": AttackProfile(name="axe", to_hit_bonus=50, damage_formula="1d1+9")
+        },
+    )
+    state.combatants["gob"] = CombatantState(
+        id="gob",
+        name="Goblin",
+        side="enemies",
+        ac=10,
+        hp_current=goblin_hp,
+        hp_max=7,
+        position=(1, 0),
+    )
+    for cmd in (
+        StartCombat(),
+        SetInitiative(combatant_id="hero", initiative=20),
+        SetInitiative(combatant_id="gob", initiative=5),
+        *(SetInitiative(combatant_id=cid, initiative=1) for cid in dying),
+        FinalizeInitiative(),
+        BeginTurn(combatant_id="hero"),
+    ):
+        state, _ = apply_command(state, cmd)
+    return state
+
+
+def test_killing_last_enemy_ends_combat():
+    state = _fight()
+    stats = state.side_stats()
+    assert stats["enemies"].conscious == 1
+    assert stats["party"].hp_total == 20
+
+    state, ev = apply_command(
+        state, Attack(attacker_id="hero", target_id="gob", attack_name="axe")
+    )
+
+    assert ev[-1]["type"] == "CombatEnded"
+    payload = ev[-1]["payload"]
+    assert payload["winner_side"] == "party"
+    assert payload["sides"]["enemies"] == {"alive": 0, "conscious": 0, "hp_total": 0}
+    assert state.phase == "finished"
+
+    # инкрементальные счётчики совпадают с полным пересчётом
+    incremental = {k: vars(v).copy() for k, v in state.side_stats().items()}
+    state.rebuild_side_stats()
+    assert incremental == {k: vars(v) for k, v in state.side_stats().items()}
+
+    state, ev = apply_command(state, BeginTurn(combatant_id="gob"))
+    assert ev[0]["payload"]["code"] == "COMBAT_FINISHED"
+
+
+def test_combat_goes_on_while_enemy_survives():
+    state = _fight(goblin_hp=50)
+    state, ev = apply_command(
+        state, Attack(attacker_id="hero", target_id="gob", attack_name="axe")
+    )
+    assert "CombatEnded" not in [e["type"] for e in ev]
+    assert state.side_stats()["enemies"].hp_total == 40
+
+
+def test_winners_tend_dying_allies_after_combat():
+    state = _fight(dying=("cleric", "bard"))
+    state, ev = apply_command(
+        state, Attack(attacker_id="hero", target_id="gob", attack_name="axe")
+    )
+    assert ev[-1]["type"] == "CombatEnded"
+
+    # ходов больше нет, но раненых ещё можно поднять
+    state, ev = apply_command(state, Stabilize(healer_id="hero", target_id="cleric"))
+    assert [e["type"] for e in ev] == ["Stabilized"]
+    state, ev = apply_command(
+        state, Heal(healer_id="hero", target_id="cleric", amount=4)
+    )
+    assert [e["type"] for e in ev] == ["Healed"]
+    assert state.combatants["cleric"].hp_current == 4
+    assert "unconscious" not in state.combatants["cleric"].conditions
+
+    state, ev = apply_command(state, RollDeathSave(combatant_id="bard"))
+    assert ev[0]["type"] == "DeathSaveRolled"
+    state, ev = apply_command(
+        state, ApplyCondition(target_id="hero", condition="prone")
+    )
+    assert ev[0]["type"] != "CommandRejected"
+
+    # бой при этом не возобновляется
+    assert state.phase == "finished"
+    for cmd in (
+        BeginTurn(combatant_id="cleric"),
+        Attack(attacker_id="cleric", target_id="gob", attack_name="axe"),
+    ):
+        state, ev = apply_command(state, cmd)
+        assert ev[0]["payload"]["code"] == "COMBAT_FINISHED"
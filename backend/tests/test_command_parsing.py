@@ -0,0 +1,44 @@
+import pytest
+from pydantic import ValidationError
+
+from dndsim.core.engine.commands import (
+    Attack,
+    CastSpell,
+    StartCombat,
+    parse_command,
+    parse_commands,
+)
+
+
+def test_parse_command_picks_model_by_type():
+    cmd = parse_command({"type": "CastSpell", "caster_id": "A", "spell_name": "bless"})
+    assert isinstance(cmd, CastSpell)
+    assert cmd.slot_level == 1
+
+
+def test_parse_command_unknown_type_is_single_clear_error():
+    with pytest.raises(ValidationError) as ei:
+        parse_command({"type": "Teleport", "who": "A"})
+    errors = ei.value.errors()
+    # дискриминатор: одна ошибка про тег, а не по ошибке на каждый из 21 вариантов
+    assert len(errors) == 1
+    assert errors[0]["type"] == "union_tag_invalid"
+
+
+def test_parse_commands_bulk_reports_index():
+    cmds = parse_commands(
+        [
+            {"type": "StartCombat"},
+            {
+                "type": "Attack",
+                "attacker_id": "A",
+                "target_id": "B",
+                "attack_name": "x",
+            },
+        ]
+    )
+    assert [type(c) for c in cmds] == [StartCombat, Attack]
+
+    with pytest.raises(ValidationError) as ei:
+        parse_commands([{"type": "StartCombat"}, {"type": "Attack"}])
+    assert all(e["loc"][0] == 1 for e in ei.value.errors())
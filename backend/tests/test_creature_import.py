@@ -0,0 +1,128 @@
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+from sqlalchemy import select
+
+import dndsim.core.persistence.creature_import as creature_import
+from dndsim.api.main import app
+from dndsim.core.persistence.creature_import import (
+    JsonRecordStream,
+    import_creatures,
+)
+from dndsim.db.models import Creature
+
+
+def _records(n):
+    return [
+        {"name": f"Гоблин {i}", "data": {"ac": 10 + i, "hp_max": 7}} for i in range(n)
+    ]
+
+
+def _feed_by(stream, data: bytes, step: int):
+    out = []
+    for i in range(0, len(data), step):
+        out += stream.feed(data[i : i + step])
+    return out + stream.close()
+
+
+def test_stream_parses_json_array_across_chunk_boundaries():
+    recs = _records(4)
+    data = json.dumps(recs, ensure_ascii=False, indent=2).encode()
+    # кусками по 7 байт: рвём и объекты, и многобайтные символы
+    assert _feed_by(JsonRecordStream(), data, 7) == recs
+
+
+def test_stream_ndjson_bad_line_is_isolated():
+    data = b'{"name": "a"}\n{oops\n\n{"name": "b"}'
+    out = _feed_by(JsonRecordStream(), data, 5)
+    assert out[0] == {"name": "a"} and out[2] == {"name": "b"}
+    assert "invalid JSON" in out[1].message
+
+
+def test_stream_truncated_array_reports_error():
+    out = _feed_by(JsonRecordStream(), b'[{"name": "a"}, {"name": ', 4)
+    assert out[0] == {"name": "a"}
+    assert len(out) == 2 and "invalid JSON array" in out[1].message
+
+
+def test_import_creatures_in_batches(TestingSessionLocal):
+    recs = _records(5) + [
+        {"name": "Flat Ogre", "ac": 11, "hp_max": 59},
+        {"name": "Broken", "data": {"ac": "high"}},
+        "not an object",
+    ]
+    with TestingSessionLocal() as db:
+        report = import_creatures(db, recs, batch_size=2)
+        rows = db.execute(
+            select(Creature.name, Creature.ac, Creature.hp_max).order_by(Creature.name)
+        ).all()
+
+    assert (report.total, report.inserted, report.failed) == (8, 6, 2)
+    assert [e.index for e in report.errors] == [6, 7]
+    assert report.errors[0].name == "Broken"
+    assert "data.ac" in report.errors[0].error
+    assert ("Flat Ogre", 11, 59) in [tuple(r) for r in rows]
+    assert len(rows) == 6
+
+
+def test_import_endpoint_streams_ndjson(client):
+    lines = [json.dumps(r, ensure_ascii=False) for r in _records(3)]
+    lines.insert(1, '{"name": "no data"}')
+    body = "\n".join(lines).encode()
+
+    r = client.post(
+        "/creatures:import",
+        content=body,
+        params={"batch_size": 2, "max_errors": 5},
+        headers={"content-type": "application/x-ndjson"},
+    )
+    assert r.status_code == 200, r.text
+    report = r.json()
+    assert report["total"] == 4
+    assert report["inserted"] == 3
+    assert report["errors"][0]["index"] == 1
+
+    page = client.get("/creatures:page").json()
+    assert len(page["items"]) == 3
+
+
+def test_import_validation_runs_off_event_loop(client, monkeypatch):
+    original = creature_import.creature_row
+    seen = {}
+
+    def slow_row(raw):
+        seen["thread"] = threading.get_ident()
+        time.sleep(0.1)
+        return original(raw)
+
+    monkeypatch.setattr(creature_import, "creature_row", slow_row)
+    body = "\n".join(json.dumps(r) for r in _records(4)).encode()
+
+    async def scenario():
+        seen["loop_thread"] = threading.get_ident()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as ac:
+            slow = asyncio.create_task(
+                ac.post(
+                    "/creatures:import",
+                    content=body,
+                    headers={"content-type": "application/x-ndjson"},
+                )
+            )
+            await asyncio.sleep(0.05)
+            # пока записи валидируются, loop обслуживает другие запросы
+            t0 = time.perf_counter()
+            r = await ac.get("/encounters")
+            fast_s = time.perf_counter() - t0
+            assert r.status_code == 200
+            assert not slow.done()
+            report = (await slow).json()
+        return fast_s, report
+
+    fast_s, report = asyncio.run(scenario())
+    assert report["inserted"] == 4
+    assert seen["thread"] != seen["loop_thread"]
+    assert fast_s < 0.2
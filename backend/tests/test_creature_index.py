@@ -0,0 +1,100 @@
+from sqlalchemy import select
+
+from dndsim.core.persistence.creature_import import import_creatures
+from dndsim.db.creature_index import creature_summary, creature_traits
+from dndsim.db.models import Creature, CreatureTrait
+
+SCIMITAR = {"name": "Scimitar", "to_hit_bonus": 4, "damage_formula": "1d6+2"}
+
+
+def test_creature_summary_derives_ratings():
+    s = creature_summary(
+        {
+            "ac": 15,
+            "hp_max": 20,
+            "speed_ft": 40,
+            "attacks_per_action": 2,
+            "attacks": {"scimitar": SCIMITAR, "bite": {"damage_formula": "bad"}},
+            "spellcasting": {"spell_slots_max": {"1": 4, "3": 2, "4": 0}},
+        }
+    )
+    assert s["speed_ft"] == 40
+    assert s["attack_count"] == 2
+    assert s["max_slot_level"] == 3
+    # 5.5 среднего урона * 0.5 шанса по AC 15 * 2 атаки
+    assert s["offense_rating"] == 5.5
+    # 20 hp / 0.55 шанса попасть с +5 по AC 15
+    assert s["defense_rating"] == 36.4
+
+    assert creature_summary({})["max_slot_level"] == 0
+    assert creature_traits(
+        {"damage_immunities": ["Fire", "poison"], "damage_resistances": ["cold"]}
+    ) == [("immunity", "fire"), ("immunity", "poison"), ("resistance", "cold")]
+
+
+def _mk(client, name, **data):
+    r = client.post("/creatures", json={"name": name, "data": data})
+    assert r.status_code == 200, r.text
+    return r.json()["id"]
+
+
+def test_page_filters_by_traits_and_derived_columns(client, TestingSessionLocal):
+    _mk(
+        client,
+        "Fire Elemental",
+        ac=13,
+        hp_max=102,
+        damage_immunities=["fire", "poison"],
+    )
+    _mk(client, "Red Dragon Wyrmling", ac=17, hp_max=75, damage_immunities=["fire"])
+    mage = _mk(
+        client,
+        "Mage",
+        ac=12,
+        hp_max=40,
+        spellcasting={"spell_slots_max": {"1": 4, "3": 3}},
+    )
+    _mk(client, "Goblin", ac=15, hp_max=7, attacks={"scimitar": SCIMITAR})
+
+    def names(**params):
+        r = client.get("/creatures:page", params=params)
+        assert r.status_code == 200, r.text
+        return [c["name"] for c in r.json()["items"]]
+
+    assert names(immune_to="fire") == ["Fire Elemental", "Red Dragon Wyrmling"]
+    assert names(immune_to=["fire", "poison"]) == ["Fire Elemental"]
+    assert names(immune_to="FIRE", min_ac=15) == ["Red Dragon Wyrmling"]
+    assert names(min_slot_level=3) == ["Mage"]
+    assert names(min_attacks=1, min_offense=1) == ["Goblin"]
+    assert names(max_defense=20) == ["Goblin"]
+
+    # update пересчитывает и колонки, и traits
+    client.put(
+        f"/creatures/{mage}",
+        json={"data": {"ac": 12, "hp_max": 40, "damage_resistances": ["psychic"]}},
+    )
+    assert names(min_slot_level=3) == []
+    assert names(resistant_to="psychic") == ["Mage"]
+    with TestingSessionLocal() as db:
+        kinds = db.scalars(
+            select(CreatureTrait.kind).where(CreatureTrait.creature_id == mage)
+        ).all()
+    assert kinds == ["resistance"]
+
+
+def test_bulk_import_fills_traits(TestingSessionLocal):
+    recs = [
+        {
+            "name": "Imp",
+            "data": {"ac": 13, "hp_max": 10, "damage_immunities": ["fire"]},
+        },
+        {"name": "Rat", "data": {"ac": 10, "hp_max": 1}},
+    ]
+    with TestingSessionLocal() as db:
+        import_creatures(db, recs)
+        rows = db.execute(
+            select(Creature.name)
+            .join(CreatureTrait, CreatureTrait.creature_id == Creature.id)
+            .where(CreatureTrait.kind == "immunity", CreatureTrait.value == "fire")
+        ).all()
+    assert [r.name for r in rows] == ["Imp"]
@@ -0,0 +1,99 @@
+from dataclasses import asdict
+
+from dndsim.core.adapters.mapper import (
+    CombatantOverrides,
+    combatant_from_creature,
+    instantiate_combatant,
+)
+from dndsim.core.adapters.templates import CreatureTemplateCache
+
+GOBLIN = {
+    "name": "Goblin",
+    "ac": 15,
+    "hp_max": 7,
+    "resources": {"nimble_escape": 1},
+    "attacks": [{"name": "Scimitar", "to_hit": 4, "damage": "1d6+2"}],
+    "resistances": ["poison"],
+    "save_bonuses": {"dex": 2},
+}
+
+
+def test_cache_builds_prototype_once_per_version():
+    cache = CreatureTemplateCache()
+    loads = []
+
+    def load():
+        loads.append(1)
+        return GOBLIN
+
+    p1 = cache.get("gob", "v1", load)
+    p2 = cache.get("gob", "v1", load)
+    assert p1 is p2
+    assert (cache.hits, cache.misses, len(loads)) == (1, 1, 1)
+
+    # новая версия существа вытесняет старую
+    p3 = cache.get("gob", "v2", load)
+    assert p3 is not p1
+    assert len(cache) == 1
+
+    cache.invalidate("gob")
+    cache.get("gob", "v2", load)
+    assert len(loads) == 3
+
+
+def test_cache_evicts_least_recently_used():
+    cache = CreatureTemplateCache(maxsize=2)
+    cache.get("a", 1, lambda: GOBLIN)
+    cache.get("b", 1, lambda: GOBLIN)
+    cache.get("a", 1, lambda: GOBLIN)
+    cache.get("c", 1, lambda: GOBLIN)
+    assert cache.get("a", 1, lambda: GOBLIN) is not None
+    assert cache.misses == 3  # b вытеснен, a остался
+
+
+def test_instantiate_matches_full_mapping_and_keeps_prototype_intact():
+    cache = CreatureTemplateCache()
+    proto = cache.get("gob", 1, lambda: GOBLIN)
+    ov = CombatantOverrides(hp_current=3, initiative_bonus=5)
+
+    fast = instantiate_combatant(
+        proto, combatant_id="g1", side="enemies", position=(2, 3), overrides=ov
+    )
+    slow = combatant_from_creature(
+        GOBLIN, combatant_id="g1", side="enemies", position=(2, 3), overrides=ov
+    )
+    assert asdict(fast) == asdict(slow)
+
+    fast.conditions.add("prone")
+    fast.damage_resistances.add("fire")
+    fast.resources_current["nimble_escape"] = 0
+    fast.attacks["Scimitar"]["to_hit"] = 99
+
+    again = instantiate_combatant(proto, combatant_id="g2", side="enemies")
+    assert again.conditions == set()
+    assert again.damage_resistances == {"poison"}
+    assert again.resources_current == {"nimble_escape": 1}
+    assert again.attacks["Scimitar"]["to_hit"] == 4
+    assert again.hp_current == 7
+
+
+def test_creature_update_invalidates_template(client):
+    cid = client.post(
+        "/creatures", json={"name": "Ogre", "data": {"ac": 11, "hp_max": 59}}
+    ).json()["id"]
+    eid = client.post("/encounters", json={"name": "Tpl"}).json()["id"]
+    client.post(f"/encounters/{eid}/state:init", json={"label": "init"})
+
+    def add(combatant_id):
+        r = client.post(
+            f"/encounters/{eid}/combatants:add",
+            json={"creature_id": cid, "side": "enemies", "combatant_id": combatant_id},
+        )
+        assert r.status_code == 200, r.text
+        return r.json()["state"]["combatants"][combatant_id]
+
+    assert add("o1")["hp_max"] == 59
+
+    r = client.patch(f"/creatures/{cid}", json={"data": {"ac": 11, "hp_max": 80}})
+    assert r.status_code == 200, r.text
+    assert add("o2")["hp_max"] == 80
@@ -0,0 +1,108 @@
+from dndsim.core.engine.commands import BeginTurn, EndTurn
+from dndsim.core.engine.rules.apply import apply_command
+from dndsim.core.engine.state import (
+    ActiveEffect,
+    CombatantState,
+    EffectRef,
+    EncounterState,
+)
+from dndsim.core.persistence.state_codec import (
+    encounter_state_from_dict,
+    encounter_state_to_dict,
+)
+
+
+def _state() -> EncounterState:
+    state = EncounterState().with_seed(1)
+    for cid in ("C", "T"):
+        state.combatants[cid] = CombatantState(
+            id=cid, name=cid, ac=10, hp_current=10, hp_max=10
+        )
+    state.initiative_order = ["C", "T"]
+    state.turn_owner_id = "C"
+    return state
+
+
+def _full_round(state, collected):
+    for cid in list(state.initiative_order):
+        state, ev = apply_command(state, BeginTurn(combatant_id=cid))
+        collected.extend(ev)
+        state, ev = apply_command(state, EndTurn(combatant_id=cid))
+        collected.extend(ev)
+    return state
+
+
+def test_effect_expires_at_start_of_source_turn_and_ends_concentration():
+    state = _state()
+    state.combatants["C"].concentration = EffectRef(
+        effect_name="hold_person", source_id="C", started_round=1
+    )
+    state.combatants["T"].conditions.add("paralyzed")
+    state.add_effect(
+        ActiveEffect(
+            id="E1",
+            name="hold_person",
+            source_id="C",
+            target_id="T",
+            started_round=1,
+            duration_rounds=2,
+            concentration_owner_id="C",
+            concentration_effect_name="hold_person",
+            applies_conditions={"paralyzed"},
+        )
+    )
+
+    events = []
+    state = _full_round(state, events)  # раунд 1
+    state = encounter_state_from_dict(encounter_state_to_dict(state))
+    state = _full_round(state, events)  # раунд 2
+    assert "E1" in state.effects
+    assert not [e for e in events if e["type"] == "EffectEnded"]
+
+    state, ev = apply_command(state, BeginTurn(combatant_id="C"))  # раунд 3
+    types = [e["type"] for e in ev]
+    assert types[:3] == ["ConditionRemoved", "EffectEnded", "ConcentrationEnded"]
+    assert ev[1]["payload"]["reason"] == "expired"
+    assert "E1" not in state.effects
+    assert "paralyzed" not in state.combatants["T"].conditions
+    assert state.combatants["C"].concentration is None
+    assert state.effect_timers == []
+
+
+def test_removed_effect_timer_is_skipped_and_turn_end_timing():
+    state = _state()
+    state.add_effect(
+        ActiveEffect(
+            id="E1",
+            name="x",
+            source_id="C",
+            target_id="T",
+            started_round=1,
+            duration_rounds=1,
+        )
+    )
+    state.add_effect(
+        ActiveEffect(
+            id="E2",
+            name="y",
+            source_id="T",
+            target_id="C",
+            started_round=1,
+            duration_rounds=0,
+            expires_on="turn_end",
+        )
+    )
+    state.effects.pop("E1")
+
+    events = []
+    state, ev = apply_command(state, BeginTurn(combatant_id="C"))
+    state, ev = apply_command(state, EndTurn(combatant_id="C"))
+    assert "E2" in state.effects
+    state, ev = apply_command(state, BeginTurn(combatant_id="T"))
+    state, ev = apply_command(state, EndTurn(combatant_id="T"))
+    assert [e["type"] for e in ev] == ["EffectEnded", "TurnEnded"]
+    assert "E2" not in state.effects
+
+    state = _full_round(state, events)
+    assert not [e for e in events if e["type"] == "EffectEnded"]
+    assert state.effect_timers == []
@@ -0,0 +1,57 @@
+import copy
+
+from dndsim.core.engine.state import ActiveEffect, EffectStore, EncounterState
+from dndsim.core.persistence.state_codec import (
+    encounter_state_from_dict,
+    encounter_state_to_dict,
+)
+
+
+def _eff(eid, name, target, owner=None):
+    return ActiveEffect(
+        id=eid,
+        name=name,
+        source_id=owner or "src",
+        target_id=target,
+        started_round=1,
+        concentration_owner_id=owner,
+        concentration_effect_name=name if owner else None,
+    )
+
+
+def test_effect_indexes_follow_dict_mutations():
+    state = EncounterState()
+    state.effects["E1"] = _eff("E1", "bless", "A", owner="C")
+    state.effects["E2"] = _eff("E2", "bless", "B", owner="C")
+    state.effects["E3"] = _eff("E3", "hold_person", "A", owner="D")
+
+    assert state.effects.has("A", "bless")
+    assert {e.id for e in state.effects.for_target("A")} == {"E1", "E3"}
+    assert {e.id for e in state.effects.by_concentration_owner("C")} == {"E1", "E2"}
+
+    state.effects.pop("E1")
+    del state.effects["E3"]
+    assert not state.effects.has("A", "bless")
+    assert state.effects.for_target("A") == []
+    assert [e.id for e in state.effects.by_concentration_owner("C")] == ["E2"]
+
+    # перезапись по тому же id переносит эффект между корзинами
+    state.effects["E2"] = _eff("E2", "bane", "A")
+    assert state.effects.has("A", "bane")
+    assert not state.effects.has("B", "bless")
+    assert state.effects.by_concentration_owner("C") == []
+
+
+def test_effect_store_survives_codec_and_copy():
+    state = EncounterState()
+    state.effects["E1"] = _eff("E1", "bless", "A", owner="C")
+
+    restored = encounter_state_from_dict(encounter_state_to_dict(state))
+    assert isinstance(restored.effects, EffectStore)
+    assert restored.effects.has("A", "bless")
+    assert [e.id for e in restored.effects.by_concentration_owner("C")] == ["E1"]
+
+    cloned = copy.deepcopy(state.effects)
+    cloned.pop("E1")
+    assert state.effects.has("A", "bless")
+    assert not cloned.has("A", "bless")
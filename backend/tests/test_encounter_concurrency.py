@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from dndsim.api.encounter_locks import EncounterLocks
+from dndsim.api.main import app
+from dndsim.core.engine.state import EncounterState
+from dndsim.core.persistence.runtime_store import (
+    SnapshotConflict,
+    load_latest_snapshot,
+    save_snapshot,
+)
+from dndsim.db.models import Encounter, EncounterSave
+
+
+def test_save_snapshot_compare_and_swap(TestingSessionLocal):
+    with TestingSessionLocal() as db:
+        enc = Encounter(name="CAS")
+        db.add(enc)
+        db.commit()
+        eid = enc.id
+        assert enc.state_version == 0
+
+        first = save_snapshot(db, eid, "v0", EncounterState(), [], expected_version=0)
+
+        # второй писатель тоже прочитал версию 0 — его запись должна отклониться
+        with pytest.raises(SnapshotConflict):
+            save_snapshot(db, eid, "stale", EncounterState(), [], expected_version=0)
+
+        saves = db.query(EncounterSave).filter(EncounterSave.encounter_id == eid)
+        assert [s.id for s in saves] == [first.id]
+        save_id, _state, _events = load_latest_snapshot(db, eid)
+        assert save_id == first.id
+
+        save_snapshot(db, eid, "v1", EncounterState(), [], expected_version=1)
+        db.refresh(enc)
+        assert enc.state_version == 2
+
+
+def test_encounter_locks_serialize_same_encounter_only():
+    async def scenario():
+        locks = EncounterLocks()
+        trace = []
+
+        async def writer(eid, tag):
+            async with locks.hold(eid):
+                trace.append(("start", tag))
+                await asyncio.sleep(0.01)
+                trace.append(("end", tag))
+
+        await asyncio.gather(writer("e1", "a"), writer("e1", "b"), writer("e2", "c"))
+
+        # a и b не пересекаются
+        a_end = trace.index(("end", "a"))
+        b_start = trace.index(("start", "b"))
+        assert a_end < b_start
+        # c (другой encounter) стартует, не дожидаясь a
+        assert trace.index(("start", "c")) < a_end
+        assert locks.active_count() == 0
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_adds_do_not_lose_updates(client):
+    eid = client.post("/encounters", json={"name": "Race"}).json()["id"]
+    client.post(f"/encounters/{eid}/state:init", json={"label": "init"})
+    cid = client.post(
+        "/creatures", json={"name": "Goblin", "data": {"ac": 15, "hp_max": 7}}
+    ).json()["id"]
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as ac:
+            rs = await asyncio.gather(
+                *(
+                    ac.post(
+                        f"/encounters/{eid}/combatants:add",
+                        json={
+                            "creature_id": cid,
+                            "side": "enemies",
+                            "combatant_id": f"g{i}",
+                        },
+                    )
+                    for i in range(6)
+                )
+            )
+        assert all(r.status_code == 200 for r in rs), [r.text for r in rs]
+
+    asyncio.run(scenario())
+
+    state = client.get(f"/encounters/{eid}/state").json()["state"]
+    assert sorted(state["combatants"]) == [f"g{i}" for i in range(6)]
+
+
+def test_engine_step_runs_off_event_loop(client, monkeypatch):
+    import dndsim.api.routers.encounter_runtime as runtime
+
+    eid = client.post("/encounters", json={"name": "Offload"}).json()["id"]
+    client.post(f"/encounters/{eid}/state:init", json={"label": "init"})
+
+    original = runtime.engine_apply
+    seen = {}
+
+    def slow_apply(state, cmd):
+        seen["thread"] = threading.get_ident()
+        time.sleep(0.3)
+        return original(state, cmd)
+
+    monkeypatch.setattr(runtime, "engine_apply", slow_apply)
+
+    async def scenario():
+        seen["loop_thread"] = threading.get_ident()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as ac:
+            slow = asyncio.create_task(
+                ac.post(
+                    f"/encounters/{eid}/commands:apply",
+                    json={"command": {"type": "StartCombat"}},
+                )
+            )
+            await asyncio.sleep(0.05)
+            # пока движок считает, loop свободен: другой запрос успевает раньше
+            t0 = time.perf_counter()
+            r = await ac.get("/encounters")
+            fast_s = time.perf_counter() - t0
+            assert r.status_code == 200
+            assert not slow.done()
+            assert (await slow).status_code == 200
+        return fast_s
+
+    fast_s = asyncio.run(scenario())
+    assert seen["thread"] != seen["loop_thread"]
+    assert fast_s < 0.25
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+
+from dndsim.api.event_hub import EncounterEventHub
+
+
+def test_event_hub_delivers_to_all_subscribers_from_worker_thread():
+    async def scenario():
+        hub = EncounterEventHub()
+        s1 = hub.subscribe("enc-1")
+        s2 = hub.subscribe("enc-1")
+        other = hub.subscribe("enc-2")
+
+        # sync-роутеры публикуют из threadpool
+        th = threading.Thread(
+            target=hub.publish,
+            args=("enc-1",),
+            kwargs={"save_id": 7, "events": [{"type": "TurnStarted"}]},
+        )
+        th.start()
+        th.join()
+
+        m1 = await asyncio.wait_for(s1.queue.get(), timeout=1)
+        m2 = await asyncio.wait_for(s2.queue.get(), timeout=1)
+        assert m1 == m2
+        assert m1 == {
+            "encounter_id": "enc-1",
+            "save_id": 7,
+            "events": [{"type": "TurnStarted"}],
+        }
+        assert other.queue.empty()
+
+        hub.unsubscribe(s1)
+        hub.unsubscribe(s2)
+        assert hub.subscriber_count("enc-1") == 0
+
+    asyncio.run(scenario())
+
+
+def test_event_hub_bounded_queue_drops_oldest():
+    async def scenario():
+        hub = EncounterEventHub(queue_size=2)
+        sub = hub.subscribe(1)
+
+        for i in range(5):
+            hub.publish(1, save_id=i, events=[{"seq": i}])
+        await asyncio.sleep(0)  # дать loop'у выполнить call_soon_threadsafe
+
+        assert sub.queue.qsize() == 2
+        assert sub.take_dropped() == 3
+        assert sub.take_dropped() == 0
+        assert (await sub.queue.get())["save_id"] == 3
+        assert (await sub.queue.get())["save_id"] == 4
+
+    asyncio.run(scenario())
@@ -0,0 +1,68 @@
+import json
+
+from dndsim.core.engine.commands import Attack, BeginTurn, EndTurn
+from dndsim.core.engine.rules.apply import apply_commands
+from dndsim.core.engine.state import AttackProfile, CombatantState, EncounterState
+
+
+def _run(strategy: str, scope: str = "enc-1"):
+    state = EncounterState().with_seed(42)
+    state.id_strategy = strategy
+    state.id_scope = scope
+    for cid, pos in (("A", (0, 0)), ("B", (1, 0))):
+        state.combatants[cid] = CombatantState(
+            id=cid,
+            name=cid,
+            ac=10,
+            hp_current=40,
+            hp_max=40,
+            position=pos,
+            attacks={
+                "sword": AttackProfile(
+                    name="sword", to_hit_bonus=5, damage_formula="1d8+3"
+                )
+            },
+        )
+    state.initiative_order = ["A", "B"]
+    state.turn_owner_id = "A"
+    _state, events, _ = apply_commands(
+        state,
+        [
+            BeginTurn(combatant_id="A"),
+            Attack(attacker_id="A", target_id="B", attack_name="sword"),
+            EndTurn(combatant_id="A"),
+        ],
+    )
+    return events
+
+
+def _roll_ids(events):
+    return [e["payload"]["roll"]["roll_id"] for e in events if "roll" in e["payload"]]
+
+
+def test_deterministic_ids_make_replays_identical():
+    a = _run("deterministic")
+    b = _run("deterministic")
+    assert json.dumps(a, default=str) == json.dumps(b, default=str)
+    assert _roll_ids(a)
+
+    other_scope = _run("deterministic", scope="enc-2")
+    assert a[0]["event_id"] != other_scope[0]["event_id"]
+
+
+def test_monotonic_ids_follow_seq_and_do_not_collide():
+    events = _run("monotonic")
+    ids = [e["event_id"] for e in events]
+    assert [i.int & 0xFFFFFFFF for i in ids] == [e["seq"] for e in events]
+    # префикс общий для encounter'а
+    assert len({i.int >> 64 for i in ids}) == 1
+
+    roll_ids = _roll_ids(events)
+    assert len(set(roll_ids) | set(ids)) == len(roll_ids) + len(ids)
+
+
+def test_uuid4_is_default_and_random():
+    a = _run("uuid4")
+    b = _run("uuid4")
+    assert a[0]["event_id"] != b[0]["event_id"]
+    assert a[0]["event_id"].version == 4
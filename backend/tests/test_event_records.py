@@ -0,0 +1,94 @@
+import json
+
+from dndsim.core.engine.commands import BeginTurn, Multiattack
+from dndsim.core.engine.events import (
+    EventEnvelope,
+    EventRecord,
+    Roll,
+    RollRecord,
+    materialize_events,
+    roll_payload,
+)
+from dndsim.core.engine.rules.apply import apply_command
+from dndsim.core.engine.state import (
+    AttackProfile,
+    CombatantState,
+    EncounterState,
+    MultiattackProfile,
+)
+
+
+def _multiattack_events():
+    state = EncounterState().with_seed(5)
+    attacks = {
+        "bite": AttackProfile(name="bite", to_hit_bonus=5, damage_formula="1d8+3"),
+        "claw": AttackProfile(name="claw", to_hit_bonus=5, damage_formula="1d6+3"),
+    }
+    state.combatants["M"] = CombatantState(
+        id="M",
+        name="M",
+        ac=12,
+        hp_current=30,
+        hp_max=30,
+        attacks=attacks,
+        multiattacks={"mm": MultiattackProfile(name="mm", attacks=["bite", "claw"])},
+    )
+    state.combatants["T"] = CombatantState(
+        id="T", name="T", ac=10, hp_current=30, hp_max=30
+    )
+    state.initiative_order = ["M", "T"]
+    state.turn_owner_id = "M"
+    state, _ = apply_command(state, BeginTurn(combatant_id="M"))
+    _state, events = apply_command(
+        state, Multiattack(attacker_id="M", target_id="T", multiattack_name="mm")
+    )
+    return events
+
+
+def test_engine_events_are_records_readable_as_dicts():
+    events = _multiattack_events()
+    assert all(isinstance(e, EventRecord) for e in events)
+
+    first = events[0]
+    assert first["type"] == first.raw[0] == "MultiattackDeclared"
+    assert first.get("missing") is None
+    assert set(first) == set(EventEnvelope.model_fields)
+    # event_id выдаётся лениво, но один раз
+    assert first["event_id"] == first.to_dict()["event_id"]
+
+
+def test_materialize_events_matches_envelope_schema():
+    events = _multiattack_events()
+    dicts = materialize_events(events)
+
+    assert all(type(d) is dict for d in dicts)
+    for rec, d in zip(events, dicts):
+        assert rec.to_envelope().model_dump() == d
+        assert rec == d
+    json.dumps(dicts, default=str)
+
+
+def test_roll_payload_accepts_public_roll():
+    roll = Roll(kind="d20", formula="1d20", dice=[4], kept=[4], total=4, nat=4)
+    assert roll_payload(roll) == roll.model_dump()
+
+
+def test_rolls_materialize_only_on_serialization():
+    events = _multiattack_events()
+    rolled = [e for e in events if "roll" in e["payload"]]
+    assert rolled
+
+    roll = rolled[0]["payload"]["roll"]
+    # в payload — сам бросок, без dict'а и без uuid4
+    assert isinstance(roll, RollRecord) and roll._roll_id is None
+    assert set(roll) == set(Roll.model_fields)
+    assert roll["total"] == roll.total
+
+    out = rolled[0].to_dict()["payload"]["roll"]
+    assert type(out) is dict
+    assert out == Roll(**out).model_dump()
+    assert (
+        out["roll_id"]
+        == roll["roll_id"]
+        == rolled[0].to_dict()["payload"]["roll"]["roll_id"]
+    )
@@ -0,0 +1,127 @@
+from dndsim.core.engine.commands import RollAllInitiative, SetInitiative, StartCombat
+from dndsim.core.engine.rules.apply import apply_command
+from dndsim.core.engine.state import CombatantState, EncounterState
+
+
+def _setup(n_goblins: int = 4) -> EncounterState:
+    st = EncounterState().with_seed(11)
+    st.combatants["hero"] = CombatantState(
+        id="hero",
+        name="Hero",
+        side="party",
+        ac=15,
+        hp_current=20,
+        hp_max=20,
+        is_player_character=True,
+        initiative_bonus=3,
+    )
+    for i in range(n_goblins):
+        cid = f"g{i}"
+        st.combatants[cid] = CombatantState(
+            id=cid,
+            name="Goblin",
+            side="enemies",
+            ac=15,
+            hp_current=7,
+            hp_max=7,
+            initiative_bonus=2,
+        )
+    st.combatants["boss"] = CombatantState(
+        id="boss", name="Hobgoblin", side="enemies", ac=18, hp_current=11, hp_max=11
+    )
+    st, _ = apply_command(st, StartCombat())
+    return st
+
+
+def test_roll_all_uses_bonus_precedence():
+    st = _setup(n_goblins=2)
+    st, ev = apply_command(
+        st, RollAllInitiative(bonuses={"boss": 7}, side_bonuses={"enemies": -1})
+    )
+
+    rolled = {e["payload"]["combatant_id"]: e["payload"] for e in ev}
+    assert [e["type"] for e in ev] == ["InitiativeRolled"] * 4
+    assert rolled["hero"]["bonus"] == 3  # CombatantState.initiative_bonus
+    assert rolled["g0"]["bonus"] == -1  # side_bonuses
+    assert rolled["boss"]["bonus"] == 7  # bonuses перекрывает side_bonuses
+    for cid, p in rolled.items():
+        assert st.initiatives[cid] == p["initiative"] == p["roll"]["total"]
+
+
+def test_roll_all_groups_identical_monsters_and_finalizes():
+    st = _setup()
+    st, _ = apply_command(st, SetInitiative(combatant_id="hero", initiative=30))
+
+    st, ev = apply_command(st, RollAllInitiative(group_identical=True, finalize=True))
+    types = [e["type"] for e in ev]
+
+    # hero уже с инициативой; гоблины — один бросок на группу, boss — свой
+    assert types.count("InitiativeRolled") == 2
+    assert types.count("InitiativeSet") == 3
+    assert types[-2:] == ["InitiativeOrderFinalized", "RoundStarted"]
+    assert st.initiatives["hero"] == 30
+    assert len({st.initiatives[f"g{i}"] for i in range(4)}) == 1
+    assert st.initiative_finalized
+    assert st.turn_owner_id == "hero"
+
+
+def test_roll_all_validation():
+    st = EncounterState()
+    st.combatants["a"] = CombatantState(id="a", name="A", ac=10, hp_current=5, hp_max=5)
+    st, ev = apply_command(st, RollAllInitiative())
+    assert ev[0]["payload"]["code"] == "COMBAT_NOT_STARTED"
+
+    st = _setup()
+    st, ev = apply_command(st, RollAllInitiative(bonuses={"ghost": 1}))
+    assert ev[0]["payload"]["code"] == "UNKNOWN_COMBATANT"
+    assert st.initiatives == {}
+
+
+def _seeded_encounter(client, seed):
+    eid = client.post("/encounters", json={"name": f"Seed {seed}"}).json()["id"]
+    client.post(f"/encounters/{eid}/state:init", json={"rng_seed": seed})
+    goblin = client.post(
+        "/creatures", json={"name": "Goblin", "data": {"ac": 15, "hp_max": 7}}
+    ).json()["id"]
+    r = client.post(
+        f"/encounters/{eid}/combatants:add_bulk",
+        json={
+            "groups": [
+                {"creature_id": goblin, "count": 2, "side": "party", "id_prefix": "p"},
+                {
+                    "creature_id": goblin,
+                    "count": 3,
+                    "side": "enemies",
+                    "id_prefix": "g",
+                },
+            ]
+        },
+    )
+    assert r.status_code == 200, r.text
+    return eid
+
+
+def test_roll_all_through_api_after_reload_is_seeded(client):
+    rolls = []
+    for _ in range(2):
+        eid = _seeded_encounter(client, seed=1234)
+        r = client.post(
+            f"/encounters/{eid}/commands:apply",
+            json={"command": {"type": "StartCombat"}},
+        )
+        assert r.status_code == 200, r.text
+
+        # отдельный запрос: state перечитан из снапшота, rng должен пережить reload
+        r = client.post(
+            f"/encounters/{eid}/commands:apply_batch",
+            json={"commands": [{"type": "RollAllInitiative", "finalize": True}]},
+        )
+        assert r.status_code == 200, r.text
+        body = r.json()
+        assert body["applied"] == 1
+        assert "rng" not in body["state"]
+        assert body["state"]["rng_state"]
+        rolls.append(body["state"]["initiatives"])
+
+    assert len(rolls[0]) == 5
+    assert rolls[0] == rolls[1]
@@ -0,0 +1,104 @@
+import json
+
+import pytest
+from sqlalchemy import text
+
+from dndsim.core.engine.state import EncounterState
+from dndsim.core.persistence.runtime_store import (
+    SnapshotConflict,
+    _latest_save_query,
+    load_latest_snapshot,
+    save_snapshot,
+)
+from dndsim.db.models import Encounter, EncounterSave
+
+
+def test_save_snapshot_moves_latest_pointer(TestingSessionLocal):
+    with TestingSessionLocal() as db:
+        enc = Encounter(name="Pointer")
+        db.add(enc)
+        db.commit()
+        eid = enc.id
+        assert enc.latest_save_id is None
+
+        first = save_snapshot(db, eid, "v0", EncounterState(), [], expected_version=0)
+        db.refresh(enc)
+        assert enc.latest_save_id == first.id
+
+        # отклонённая запись не двигает указатель
+        with pytest.raises(SnapshotConflict):
+            save_snapshot(db, eid, "stale", EncounterState(), [], expected_version=0)
+        db.refresh(enc)
+        assert enc.latest_save_id == first.id
+
+        second = save_snapshot(db, eid, "v1", EncounterState(), [])
+        db.refresh(enc)
+        assert enc.latest_save_id == second.id
+        assert load_latest_snapshot(db, eid)[0] == second.id
+
+
+def test_load_latest_falls_back_without_pointer(TestingSessionLocal):
+    with TestingSessionLocal() as db:
+        enc = Encounter(name="Legacy")
+        db.add(enc)
+        db.commit()
+        blob = json.dumps({"state": {"round": 3}, "events": []})
+        rows = [
+            EncounterSave(
+                encounter_id=enc.id, label="old", state_json=blob, events_json="[]"
+            )
+            for _ in range(3)
+        ]
+        db.add_all(rows)
+        db.commit()
+
+        save_id, state, _events = load_latest_snapshot(db, enc.id)
+        assert save_id == rows[-1].id
+        assert state.round == 3
+
+
+def test_manual_save_becomes_latest(client):
+    eid = client.post("/encounters", json={"name": "Manual"}).json()["id"]
+    client.post(f"/encounters/{eid}/state:init", json={"label": "init"})
+    sid = client.post(
+        f"/encounters/{eid}/saves",
+        json={"label": "checkpoint", "state": {"round": 4, "combatants": {}}},
+    ).json()["id"]
+
+    r = client.get(f"/encounters/{eid}/state")
+    assert r.json()["save_id"] == sid
+    assert r.json()["state"]["round"] == 4
+
+
+def test_manual_save_bumps_state_version(client, TestingSessionLocal):
+    eid = client.post("/encounters", json={"name": "Manual CAS"}).json()["id"]
+    client.post(f"/encounters/{eid}/state:init", json={"label": "init"})
+    with TestingSessionLocal() as db:
+        before = db.get(Encounter, eid).state_version
+
+    sid = client.post(
+        f"/encounters/{eid}/saves",
+        json={"label": "checkpoint", "state": {"round": 4, "combatants": {}}},
+    ).json()["id"]
+
+    with TestingSessionLocal() as db:
+        enc = db.get(Encounter, eid)
+        assert enc.state_version == before + 1
+        assert enc.latest_save_id == sid
+        # команда, прочитавшая состояние до ручного сохранения, не перетрёт его
+        with pytest.raises(SnapshotConflict):
+            save_snapshot(db, eid, "cmd", EncounterState(), [], expected_version=before)
+        assert load_latest_snapshot(db, eid)[0] == sid
+
+
+def test_latest_lookup_uses_primary_keys(engine):
+    sql = str(
+        _latest_save_query("e").compile(engine, compile_kwargs={"literal_binds": True})
+    )
+    with engine.connect() as conn:
+        plan = [row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql))]
+    assert any("SEARCH encounters" in step for step in plan)
+    assert any(
+        "SEARCH encounter_saves USING INTEGER PRIMARY KEY" in step for step in plan
+    )
+    assert not any("SCAN" in step for step in plan)
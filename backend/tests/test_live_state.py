@@ -0,0 +1,259 @@
+import json
+
+from sqlalchemy import inspect
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+import dndsim.core.persistence.runtime_store as runtime_store
+from dndsim.core.persistence.live_state import (
+    diff_state,
+    encounters_with_condition,
+    live_doc_query,
+    live_state_patch_stmt,
+)
+from dndsim.core.persistence.runtime_store import load_latest_snapshot
+from dndsim.db.models import Encounter, EncounterLiveState, EncounterSave
+from dndsim.db.settings import get_db_settings
+
+
+def _live_encounter(client, monkeypatch, history_every):
+    settings = get_db_settings()
+    monkeypatch.setattr(settings, "live_state", True)
+    monkeypatch.setattr(settings, "live_state_history_every", history_every)
+
+    eid = client.post("/encounters", json={"name": "Live"}).json()["id"]
+    client.post(f"/encounters/{eid}/state:init", json={"label": "init"})
+    goblin = client.post(
+        "/creatures", json={"name": "Goblin", "data": {"ac": 15, "hp_max": 7}}
+    ).json()["id"]
+    return eid, goblin
+
+
+def _condition(client, eid, condition, label="cmd"):
+    r = client.post(
+        f"/encounters/{eid}/commands:apply",
+        json={
+            "label": label,
+            "command": {
+                "type": "ApplyCondition",
+                "target_id": "g1",
+                "condition": condition,
+            },
+        },
+    )
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _saves(db, eid):
+    return (
+        db.query(EncounterSave)
+        .filter_by(encounter_id=eid)
+        .order_by(EncounterSave.id)
+        .all()
+    )
+
+
+def _doc(**hp):
+    return {
+        "round": 1,
+        "phase": "in_combat",
+        "combatants": {
+            cid: {"hp_current": v, "conditions": [], "position": [0, 0]}
+            for cid, v in hp.items()
+        },
+    }
+
+
+def test_diff_touches_only_changed_fields():
+    prev = _doc(a=10, b=7, c=3)
+    new = _doc(a=10, b=2, d=9)
+    new["round"] = 2
+    new["combatants"]["b"]["conditions"] = ["prone"]
+
+    patch = diff_state(prev, new)
+    assert patch.meta_set == {"round": 2}
+    assert patch.meta_removed == []
+    assert patch.combatant_fields == {"b": {"hp_current": 2, "conditions": ["prone"]}}
+    assert list(patch.combatants_put) == ["d"]
+    assert patch.combatants_removed == ["c"]
+    assert patch.field_paths() == 5
+    assert diff_state(new, new).is_empty()
+
+
+def test_patch_compiles_to_jsonb_set_on_postgres():
+    prev = _doc(a=10, b=7)
+    new = _doc(a=10, b=2)
+    stmt = live_state_patch_stmt(
+        "enc", 4, 5, diff_state(prev, new), append_events=[{"type": "Hit"}]
+    )
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assignments = sql.split("SET", 1)[1].rsplit("WHERE", 1)[0]
+
+    assert sql.count("jsonb_set(") == 1
+    assert "meta=" not in assignments.replace(" ", "")
+    assert "pending_events || " in assignments
+    assert "encounter_live_state.version = " in sql.rsplit("WHERE", 1)[1]
+
+
+def test_gin_index_is_postgres_only(engine):
+    [index] = EncounterLiveState.__table__.indexes
+    ddl = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+    assert "USING gin" in ddl and "jsonb_path_ops" in ddl
+    names = {ix["name"] for ix in inspect(engine).get_indexes("encounter_live_state")}
+    assert index.name not in names
+
+
+def test_runtime_mirrors_live_state_when_enabled(
+    client, monkeypatch, TestingSessionLocal
+):
+    monkeypatch.setattr(get_db_settings(), "live_state", True)
+
+    eid = client.post("/encounters", json={"name": "Live"}).json()["id"]
+    client.post(f"/encounters/{eid}/state:init", json={"label": "init"})
+    goblin = client.post(
+        "/creatures", json={"name": "Goblin", "data": {"ac": 15, "hp_max": 7}}
+    ).json()["id"]
+    client.post(
+        f"/encounters/{eid}/combatants:add",
+        json={"creature_id": goblin, "side": "enemies", "combatant_id": "g1"},
+    )
+    r = client.post(
+        f"/encounters/{eid}/commands:apply",
+        json={
+            "command": {
+                "type": "ApplyCondition",
+                "target_id": "g1",
+                "condition": "prone",
+            }
+        },
+    )
+    assert r.status_code == 200, r.text
+
+    with TestingSessionLocal() as db:
+        row = db.get(EncounterLiveState, eid)
+        assert row.save_id == r.json()["save_id"]
+        assert row.combatants["g1"]["conditions"] == ["prone"]
+        assert "combatants" not in row.meta
+        assert encounters_with_condition(db, "g1", "prone") == [eid]
+        assert encounters_with_condition(db, "g1", "unconscious") == []
+
+
+def test_live_document_is_source_of_truth_between_history_saves(
+    client, monkeypatch, TestingSessionLocal
+):
+    eid, goblin = _live_encounter(client, monkeypatch, history_every=3)
+    added = client.post(
+        f"/encounters/{eid}/combatants:add",
+        json={"creature_id": goblin, "side": "enemies", "combatant_id": "g1"},
+    ).json()
+    prone = _condition(client, eid, "prone")
+
+    with TestingSessionLocal() as db:
+        [init] = _saves(db, eid)
+        # две команды прошли мимо истории: только документ и версия
+        assert added["save_id"] == prone["save_id"] == init.id
+        live = db.get(EncounterLiveState, eid)
+        assert live.pending_commands == 2
+        assert live.version == db.get(Encounter, eid).state_version == 3
+        _sid, state, pending = load_latest_snapshot(db, eid)
+        assert state.combatants["g1"].conditions == {"prone"}
+        assert [e["type"] for e in pending] == [
+            e["type"] for e in added["events_delta"] + prone["events_delta"]
+        ]
+
+    r = client.get(f"/encounters/{eid}/state")
+    assert r.json()["save_id"] == init.id
+    assert r.json()["state"]["combatants"]["g1"]["conditions"] == ["prone"]
+
+    # третья команда — исторический снапшот со всеми накопленными событиями
+    restrained = _condition(client, eid, "restrained")
+    with TestingSessionLocal() as db:
+        saves = _saves(db, eid)
+        assert [s.id for s in saves] == [init.id, restrained["save_id"]]
+        history = json.loads(saves[-1].events_json)
+        sent = (
+            added["events_delta"] + prone["events_delta"] + restrained["events_delta"]
+        )
+        assert [(e["type"], e.get("event_id")) for e in history] == [
+            (e["type"], e.get("event_id")) for e in sent
+        ]
+        live = db.get(EncounterLiveState, eid)
+        assert (live.save_id, live.pending_commands, live.pending_events) == (
+            restrained["save_id"],
+            0,
+            [],
+        )
+        assert db.get(Encounter, eid).latest_save_id == restrained["save_id"]
+
+
+def test_user_label_always_writes_history(client, monkeypatch, TestingSessionLocal):
+    eid, goblin = _live_encounter(client, monkeypatch, history_every=100)
+    client.post(
+        f"/encounters/{eid}/combatants:add",
+        json={"creature_id": goblin, "side": "enemies", "combatant_id": "g1"},
+    )
+    out = _condition(client, eid, "prone", label="before boss")
+
+    with TestingSessionLocal() as db:
+        saves = _saves(db, eid)
+        assert [s.label for s in saves] == ["init", "before boss"]
+        assert saves[-1].id == out["save_id"]
+        # событие add (без снапшота) ушло в историю вместе с командой
+        assert [e["type"] for e in json.loads(saves[-1].events_json)][0] == (
+            "CombatantAdded"
+        )
+
+
+def test_manual_save_supersedes_live_document(client, monkeypatch, TestingSessionLocal):
+    eid, goblin = _live_encounter(client, monkeypatch, history_every=100)
+    client.post(
+        f"/encounters/{eid}/combatants:add",
+        json={"creature_id": goblin, "side": "enemies", "combatant_id": "g1"},
+    )
+    sid = client.post(
+        f"/encounters/{eid}/saves",
+        json={"label": "checkpoint", "state": {"round": 4, "combatants": {}}},
+    ).json()["id"]
+
+    # версия ушла вперёд мимо документа — читаем EncounterSave
+    r = client.get(f"/encounters/{eid}/state")
+    assert r.json()["save_id"] == sid
+    assert r.json()["state"]["combatants"] == {}
+
+    out = client.post(
+        f"/encounters/{eid}/combatants:add",
+        json={"creature_id": goblin, "side": "enemies", "combatant_id": "g2"},
+    ).json()
+    assert out["save_id"] > sid
+    assert list(out["state"]["combatants"]) == ["g2"]
+    with TestingSessionLocal() as db:
+        live = db.get(EncounterLiveState, eid)
+        assert live.save_id == out["save_id"]
+        assert live.version == db.get(Encounter, eid).state_version
+
+
+def test_live_snapshot_decodes_document_once(client, monkeypatch, TestingSessionLocal):
+    eid, goblin = _live_encounter(client, monkeypatch, history_every=100)
+    client.post(
+        f"/encounters/{eid}/combatants:add",
+        json={"creature_id": goblin, "side": "enemies", "combatant_id": "g1"},
+    )
+    calls = []
+    original = runtime_store.decode_live_row
+    monkeypatch.setattr(
+        runtime_store,
+        "decode_live_row",
+        lambda row: calls.append(row) or original(row),
+    )
+
+    with TestingSessionLocal() as db:
+        row = db.execute(live_doc_query(eid)).first()
+    doc, state = runtime_store._decode_live_snapshot(row)
+    assert len(calls) == 1
+
+    # state не делит данные с документом: prev для патча остаётся нетронутым
+    state.combatants["g1"].conditions.add("prone")
+    state.round = 7
+    assert doc.state["combatants"]["g1"]["conditions"] == []
+    assert doc.state["round"] != 7
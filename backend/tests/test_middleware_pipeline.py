@@ -0,0 +1,95 @@
+from dndsim.core.engine.events import RollModRecord
+from dndsim.core.engine.rules.middleware import (
+    BlessMiddleware,
+    MiddlewareList,
+    MiddlewarePipeline,
+)
+from dndsim.core.engine.state import ActiveEffect, CombatantState, EncounterState
+
+
+class RageMiddleware:
+    effect_names = frozenset()
+    feature_names = frozenset({"rage"})
+    hooks = frozenset({"damage"})
+
+    def before_damage_roll(self, state, source, target, ctx, roll):
+        return [RollModRecord("rage", 2)]
+
+
+class AlwaysOn:
+    effect_names = frozenset()
+    feature_names = frozenset()
+    hooks = frozenset({"attack"})
+
+
+def _state():
+    state = EncounterState()
+    state.combatants["A"] = CombatantState(
+        id="A", name="A", ac=10, hp_current=10, hp_max=10
+    )
+    return state
+
+
+def test_pipeline_activates_middleware_by_effects_per_combatant():
+    bless, always = BlessMiddleware(), AlwaysOn()
+    pipeline = MiddlewarePipeline([bless, always])
+    state = _state()
+    a = state.combatants["A"]
+
+    assert pipeline.active(state, a, "attack") == (always,)
+    assert pipeline.active(state, a, "save") == ()
+
+    state.effects["E1"] = ActiveEffect(
+        id="E1", name="bless", source_id="X", target_id="A", started_round=1
+    )
+    assert pipeline.active(state, a, "attack") == (bless, always)
+    assert pipeline.active(state, a, "save") == (bless,)
+    # damage-хук Bless не объявлял
+    assert pipeline.active(state, a, "damage") == ()
+
+    state.effects.pop("E1")
+    assert pipeline.active(state, a, "save") == ()
+
+
+def test_pipeline_features_and_source_list_changes():
+    rage = RageMiddleware()
+    mws = [rage]
+    pipeline = MiddlewarePipeline(mws)
+    state = _state()
+    a = state.combatants["A"]
+
+    assert pipeline.active(state, a, "damage") == ()
+    a.resources_max["rage"] = 2
+    assert pipeline.active(state, a, "damage") == (rage,)
+
+    always = AlwaysOn()
+    mws.append(always)
+    assert pipeline.active(state, a, "attack") == (always,)
+
+
+def test_pipeline_rebuilds_only_on_version_changes(monkeypatch):
+    rage, always = RageMiddleware(), AlwaysOn()
+    mws = MiddlewareList([rage])
+    pipeline = MiddlewarePipeline(mws)
+    state = _state()
+    a = state.combatants["A"]
+    # mapper может присвоить обычный dict — pipeline обернёт его один раз
+    a.resources_max = {"rage": 2}
+
+    builds = []
+    real_build = pipeline._build
+    monkeypatch.setattr(
+        pipeline, "_build", lambda *args: builds.append(1) or real_build(*args)
+    )
+
+    for _ in range(5):
+        assert pipeline.active(state, a, "damage") == (rage,)
+    assert len(builds) == 1
+
+    del a.resources_max["rage"]
+    assert pipeline.active(state, a, "damage") == ()
+    # замену на месте (та же длина) видно по MiddlewareList.version
+    mws[0] = always
+    assert pipeline.active(state, a, "attack") == (always,)
+    assert pipeline.active(state, a, "attack") == (always,)
+    assert len(builds) == 3
@@ -0,0 +1,32 @@
+from dndsim.core.engine.events import Roll, RollModRecord, RollRecord
+from dndsim.core.engine.rules.apply import _roll_d20, _roll_damage
+from dndsim.core.engine.rules.middleware import apply_roll_mods
+from dndsim.core.engine.state import EncounterState
+
+
+def test_roll_record_payload_matches_public_roll():
+    state = EncounterState().with_seed(7)
+    rec = _roll_d20(state, 5, "advantage")
+    rec = apply_roll_mods(rec, [RollModRecord("bless", 3)])
+
+    assert isinstance(rec, RollRecord)
+    assert not hasattr(rec, "__dict__")
+
+    payload = rec.to_payload()
+    public = rec.to_roll()
+    assert isinstance(public, Roll)
+
+    dumped = public.model_dump()
+    dumped.pop("roll_id")
+    assert payload.pop("roll_id") is not None
+    assert payload == dumped
+    assert payload["total"] == rec.kept[0] + 5 + 3
+    assert payload["mods"][-1] == {"name": "bless", "value": 3}
+
+
+def test_damage_roll_record_crit_doubles_dice():
+    state = EncounterState().with_seed(1)
+    rec = _roll_damage(state, "2d6+3", crit=True)
+    assert len(rec.dice) == 4
+    assert rec.total == sum(rec.dice) + 3
+    assert rec.to_payload()["is_critical"] is True
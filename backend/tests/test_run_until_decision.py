@@ -0,0 +1,128 @@
+from dndsim.core.engine.commands import (
+    BeginTurn,
+    EndTurn,
+    FinalizeInitiative,
+    RollDeathSave,
+    RunUntilDecision,
+    SetInitiative,
+    StartCombat,
+)
+from dndsim.core.engine.rules.apply import apply_command, run_until_decision
+from dndsim.core.engine.state import CombatantState, EncounterState
+
+
+def _pc(cid: str, hp: int) -> CombatantState:
+    return CombatantState(
+        id=cid,
+        name=cid,
+        side="party",
+        ac=15,
+        hp_current=hp,
+        hp_max=20,
+        is_player_character=True,
+    )
+
+
+def _npc(cid: str, **kw) -> CombatantState:
+    return CombatantState(
+        id=cid, name=cid, side="enemies", ac=10, hp_current=7, hp_max=7, **kw
+    )
+
+
+def _fight() -> EncounterState:
+    state = EncounterState().with_seed(2)
+    state.combatants["hero"] = _pc("hero", 20)
+    state.combatants["cleric"] = _pc("cleric", 0)  # dying
+    state.combatants["g1"] = _npc("g1", conditions={"paralyzed"})
+    state.combatants["g2"] = _npc("g2", is_dead=True)
+    state.combatants["g3"] = _npc("g3")
+    cmds = [StartCombat()]
+    for cid, ini in (("hero", 20), ("cleric", 15), ("g1", 12), ("g2", 10), ("g3", 5)):
+        cmds.append(SetInitiative(combatant_id=cid, initiative=ini))
+    cmds.append(FinalizeInitiative())
+    for cmd in cmds:
+        state, _ = apply_command(state, cmd)
+    return state
+
+
+def _types(ev):
+    return [e["type"] for e in ev]
+
+
+def test_run_until_decision_stops_at_actionable_pc():
+    state = _fight()
+    state, ev, reason = run_until_decision(state)
+    assert reason == "turn_action"
+    assert state.turn_owner_id == "hero"
+    assert state.phase == "in_turn"
+    assert _types(ev) == ["TurnStarted", "TurnResourcesReset", "DecisionRequired"]
+    assert ev[-1]["payload"] == {"reason": "turn_action", "steps": 1}
+
+
+def test_run_until_decision_resolves_bookkeeping_turns():
+    state = _fight()
+    for cmd in (BeginTurn(combatant_id="hero"), EndTurn(combatant_id="hero")):
+        state, _ = apply_command(state, cmd)
+
+    state, ev = apply_command(state, RunUntilDecision())
+    types = _types(ev)
+
+    # cleric: death save и конец хода; g1 парализован; g2 мёртв; ходит g3
+    assert types.count("DeathSaveRolled") == 1
+    assert [e["payload"]["combatant_id"] for e in ev if e["type"] == "TurnEnded"] == [
+        "cleric",
+        "g1",
+    ]
+    assert [e["payload"]["combatant_id"] for e in ev if e["type"] == "TurnSkipped"] == [
+        "g2"
+    ]
+    assert state.turn_owner_id == "g3"
+    assert state.phase == "in_turn"
+    assert ev[-1]["payload"]["reason"] == "turn_action"
+    # seq сквозной: одна запись снапшота на весь прогон
+    assert [e["seq"] for e in ev] == sorted(e["seq"] for e in ev)
+
+
+def test_death_save_is_not_rolled_twice_in_one_turn():
+    state = _fight()
+    state.turn_owner_id = "cleric"
+    for cmd in (BeginTurn(combatant_id="cleric"), RollDeathSave(combatant_id="cleric")):
+        state, _ = apply_command(state, cmd)
+
+    state, ev, _reason = run_until_decision(state)
+    assert "DeathSaveRolled" not in _types(ev)
+    assert _types(ev)[0] == "TurnEnded"
+
+
+def test_policy_plays_npc_turns():
+    state = _fight()
+
+    def end_npc_turns(st, c):
+        if c.is_player_character:
+            return None
+        return [EndTurn(combatant_id=c.id)]
+
+    state, _ = apply_command(state, BeginTurn(combatant_id="hero"))
+    state, _ = apply_command(state, EndTurn(combatant_id="hero"))
+    state, ev, reason = run_until_decision(state, policy=end_npc_turns)
+
+    assert reason == "turn_action"
+    assert state.round == 2
+    assert state.turn_owner_id == "hero"
+
+
+def test_max_steps_and_validation():
+    state = _fight()
+    state, ev = apply_command(state, RunUntilDecision(max_steps=0))
+    assert ev[0]["payload"]["code"] == "BAD_MAX_STEPS"
+
+    state, _ = apply_command(state, BeginTurn(combatant_id="hero"))
+    state, _ = apply_command(state, EndTurn(combatant_id="hero"))
+    state, ev, reason = run_until_decision(state, max_steps=1)
+    assert reason == "max_steps"
+    assert state.turn_owner_id == "cleric"
+
+    fresh = EncounterState()
+    fresh.combatants["a"] = _pc("a", 5)
+    fresh, ev = apply_command(fresh, RunUntilDecision())
+    assert ev[0]["payload"]["code"] == "INITIATIVE_NOT_FINALIZED"
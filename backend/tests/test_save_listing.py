@@ -0,0 +1,74 @@
+from sqlalchemy import select, text
+
+from dndsim.db.models import EncounterSave
+
+
+def test_save_metadata_columns_and_pagination(client):
+    eid = client.post("/encounters", json={"name": "Paged"}).json()["id"]
+    events = [{"type": "TurnStarted", "seq": 4}, {"type": "TurnEnded", "seq": 7}]
+    ids = []
+    for i in range(5):
+        r = client.post(
+            f"/encounters/{eid}/saves",
+            json={
+                "label": f"s{i}",
+                "schema_version": 2,
+                "state": {"round": i + 1, "combatants": {}},
+                "events": events,
+            },
+        )
+        assert r.status_code == 200, r.text
+        ids.append(r.json()["id"])
+
+    first = client.get(f"/encounters/{eid}/saves", params={"limit": 2}).json()
+    assert [s["id"] for s in first] == ids[:2:-1]
+    top = first[0]
+    assert top["label"] == "s4"
+    assert top["schema_version"] == 2
+    assert top["round"] == 5
+    assert (top["seq_from"], top["seq_to"]) == (4, 7)
+    assert top["size_bytes"] > 0
+
+    rest = client.get(
+        f"/encounters/{eid}/saves", params={"limit": 10, "before_id": first[-1]["id"]}
+    ).json()
+    assert [s["id"] for s in rest] == ids[2::-1]
+
+    full = client.get(f"/encounters/{eid}/saves/{ids[0]}").json()
+    assert full["schema_version"] == 2
+    assert full["state"]["round"] == 1
+    assert full["events"] == events
+
+
+def test_runtime_snapshots_fill_metadata(client):
+    eid = client.post("/encounters", json={"name": "Meta"}).json()["id"]
+    init = client.post(f"/encounters/{eid}/state:init", json={"label": "init"}).json()
+    [row] = client.get(f"/encounters/{eid}/saves").json()
+    assert row["id"] == init["save_id"]
+    assert row["label"] == "init"
+    assert row["schema_version"] == 1
+    assert row["size_bytes"] > 0
+
+
+def test_listing_is_index_only(engine):
+    stmt = (
+        select(
+            EncounterSave.id,
+            EncounterSave.label,
+            EncounterSave.schema_version,
+            EncounterSave.created_at,
+            EncounterSave.size_bytes,
+            EncounterSave.seq_from,
+            EncounterSave.seq_to,
+            EncounterSave.round,
+        )
+        .where(EncounterSave.encounter_id == "e")
+        .order_by(EncounterSave.id.desc())
+        .limit(100)
+    )
+    sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        plan = " ".join(
+            row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql))
+        )
+    assert "COVERING INDEX ix_encounter_saves_listing" in plan
@@ -0,0 +1,135 @@
+import json
+
+import pytest
+
+from dndsim.core.persistence.retention import (
+    RetentionPolicy,
+    SnapshotCompactor,
+    compact_all_saves,
+    compact_encounter_saves,
+)
+from dndsim.db.models import Encounter, EncounterSave
+
+
+def _seed(db, encounter_id, labels):
+    db.add(Encounter(id=encounter_id, name=encounter_id))
+    blob = json.dumps({"state": {"round": 1}, "events": []})
+    rows = [
+        EncounterSave(
+            encounter_id=encounter_id, label=label, state_json=blob, events_json="[]"
+        )
+        for label in labels
+    ]
+    db.add_all(rows)
+    db.commit()
+    return [r.id for r in rows], len(blob) + 2
+
+
+def _ids(db, encounter_id):
+    return [
+        s.id
+        for s in db.query(EncounterSave)
+        .filter_by(encounter_id=encounter_id)
+        .order_by(EncounterSave.id)
+    ]
+
+
+def test_policy_keeps_user_saves_every_nth_and_latest(TestingSessionLocal):
+    labels = ["cmd"] * 30
+    labels[3] = "before boss"
+    with TestingSessionLocal() as db:
+        ids, row_bytes = _seed(db, "enc-r", labels)
+        policy = RetentionPolicy(keep_latest=5, keep_every_nth=10)
+        report = compact_encounter_saves(db, "enc-r", policy, batch_size=4)
+
+        kept = set(ids[-5:]) | {ids[3]} | {i for i in ids if i % 10 == 0}
+        assert _ids(db, "enc-r") == sorted(kept)
+        assert report.scanned == 30
+        assert report.deleted == 30 - len(kept)
+        # страницы по 4 id от новых к старым; транзакция — на страницу с удалениями
+        older = sorted(ids[:-5], reverse=True)
+        pages = [older[i : i + 4] for i in range(0, len(older), 4)]
+        assert report.batches == sum(1 for p in pages if set(p) - kept)
+        assert report.reclaimed_bytes == report.deleted * row_bytes
+
+        # идемпотентно: второй прогон ничего не находит
+        again = compact_encounter_saves(db, "enc-r", policy)
+        assert again.deleted == 0
+        assert _ids(db, "enc-r") == sorted(kept)
+
+
+def test_reclaimed_bytes_prefer_size_bytes_column(TestingSessionLocal):
+    with TestingSessionLocal() as db:
+        ids, row_bytes = _seed(db, "enc-sz", ["cmd"] * 6)
+        # у новых строк size_bytes заполнен при сохранении, у старых — NULL
+        for sid in ids[:2]:
+            db.get(EncounterSave, sid).size_bytes = 1000
+        db.commit()
+        policy = RetentionPolicy(keep_latest=1, keep_every_nth=1000)
+        report = compact_encounter_saves(db, "enc-sz", policy, batch_size=2)
+
+        assert _ids(db, "enc-sz") == ids[-1:]
+        assert report.deleted == 5
+        assert report.reclaimed_bytes == 2 * 1000 + 3 * row_bytes
+
+
+def test_compact_all_skips_small_encounters(TestingSessionLocal):
+    with TestingSessionLocal() as db:
+        _seed(db, "enc-big", ["batch"] * 12)
+        small, _ = _seed(db, "enc-small", ["cmd"] * 3)
+        report = compact_all_saves(
+            db, RetentionPolicy(keep_latest=3, keep_every_nth=100)
+        )
+
+        assert report.encounters == 1
+        assert report.deleted == 9
+        assert report.per_encounter == {"enc-big": 9}
+        assert len(_ids(db, "enc-big")) == 3
+        assert _ids(db, "enc-small") == small
+
+
+def test_compactor_run_once_uses_session_factory(TestingSessionLocal):
+    with TestingSessionLocal() as db:
+        _seed(db, "enc-bg", ["cmd"] * 8)
+    compactor = SnapshotCompactor(
+        TestingSessionLocal, RetentionPolicy(keep_latest=2, keep_every_nth=1000)
+    )
+    report = compactor.run_once()
+    assert report.deleted == 6
+    assert compactor.last_report is report
+
+
+def test_policy_validation():
+    with pytest.raises(ValueError):
+        RetentionPolicy(keep_latest=0)
+    with pytest.raises(ValueError):
+        RetentionPolicy(keep_every_nth=0)
+
+
+def test_compact_endpoint_reports_reclaimed_space(client):
+    eid = client.post("/encounters", json={"name": "Long fight"}).json()["id"]
+    client.post(f"/encounters/{eid}/state:init", json={"label": "init"})
+    goblin = client.post(
+        "/creatures", json={"name": "Goblin", "data": {"ac": 15, "hp_max": 7}}
+    ).json()["id"]
+    for i in range(6):
+        r = client.post(
+            f"/encounters/{eid}/combatants:add",
+            json={"creature_id": goblin, "side": "enemies", "combatant_id": f"g{i}"},
+        )
+        assert r.status_code == 200, r.text
+    latest = client.get(f"/encounters/{eid}/state").json()
+
+    r = client.post(
+        f"/encounters/{eid}/saves:compact",
+        json={"keep_latest": 2, "keep_every_nth": 1000},
+    )
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["remaining"] == body["scanned"] - body["deleted"] == 2
+    assert body["deleted"] > 0 and body["reclaimed_bytes"] > 0
+
+    # последний снапшот на месте
+    assert client.get(f"/encounters/{eid}/state").json()["save_id"] == latest["save_id"]
+
+    assert client.post("/encounters/nope/saves:compact", json={}).status_code == 404
@@ -0,0 +1,71 @@
+import asyncio
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from dndsim.db.settings import DatabaseSettings, engine_kwargs, to_async_url
+from dndsim.db.sqlite import configure_sqlite, sqlite_pragmas
+
+
+def _pragmas(conn):
+    return {
+        name: conn.execute(text(f"PRAGMA {name}")).scalar()
+        for name in ("journal_mode", "synchronous", "busy_timeout", "cache_size")
+    }
+
+
+def _engine(url, settings):
+    eng = create_engine(url, **engine_kwargs(settings, url))
+    configure_sqlite(eng, settings, url)
+    return eng
+
+
+def test_tuned_profile_sets_pragmas_on_every_connection(tmp_path):
+    settings = DatabaseSettings(sqlite_busy_timeout_ms=1234, sqlite_cache_size_kib=2048)
+    eng = _engine(f"sqlite:///{tmp_path / 'tuned.sqlite3'}", settings)
+    with eng.connect() as c1, eng.connect() as c2:
+        for conn in (c1, c2):
+            assert _pragmas(conn) == {
+                "journal_mode": "wal",
+                "synchronous": 1,  # NORMAL
+                "busy_timeout": 1234,
+                "cache_size": -2048,
+            }
+            assert conn.execute(text("PRAGMA mmap_size")).scalar() > 0
+    # файловой SQLite отдаём настройки пула
+    assert eng.pool.size() == settings.pool_size
+    eng.dispose()
+
+
+def test_default_profile_leaves_sqlite_alone(tmp_path):
+    settings = DatabaseSettings(sqlite_profile="default")
+    eng = _engine(f"sqlite:///{tmp_path / 'plain.sqlite3'}", settings)
+    with eng.connect() as conn:
+        pragmas = _pragmas(conn)
+    assert pragmas["journal_mode"] == "delete"
+    assert pragmas["synchronous"] == 2  # FULL
+    eng.dispose()
+
+
+def test_memory_and_non_sqlite_urls():
+    settings = DatabaseSettings()
+    mem = sqlite_pragmas(settings, "sqlite://")
+    assert mem and not any("journal_mode" in p or "mmap" in p for p in mem)
+    assert "pool_size" not in engine_kwargs(settings, "sqlite:///:memory:")
+    assert sqlite_pragmas(settings, "postgresql+psycopg://u:p@h/db") == []
+
+
+def test_async_engine_gets_same_pragmas(tmp_path):
+    settings = DatabaseSettings()
+    url = to_async_url(f"sqlite:///{tmp_path / 'async.sqlite3'}")
+    eng = create_async_engine(url, **engine_kwargs(settings, url))
+    configure_sqlite(eng, settings, url)
+
+    async def run():
+        async with eng.connect() as conn:
+            mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+            sync = (await conn.execute(text("PRAGMA synchronous"))).scalar()
+        await eng.dispose()
+        return mode, sync
+
+    assert asyncio.run(run()) == ("wal", 1)